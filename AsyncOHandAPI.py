@@ -0,0 +1,256 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import can
+
+from HandSettle import SETTLE_TIMEOUT, SETTLE_TOLERANCE, _Settle
+from OHandSerialAPI import (
+    HAND_CMD_GET_FINGER_ANGLE_ALL,
+    HAND_CMD_GET_FINGER_POS_ALL,
+    HAND_PROTOCOL_UART,
+    HAND_RESP_DATA_INVALID,
+    HAND_RESP_HAND_ERROR,
+    HAND_RESP_INVALID_OUT_BUFFER_SIZE,
+    HAND_RESP_SUCCESS,
+    HAND_RESP_TIMEOUT,
+    COMMAND_METHODS,
+    LOCAL_METHODS,
+    OHandSerialAPI,
+    response_frames,
+)
+from can_interface import delay_milli_seconds_impl, get_micro_seconds_impl, get_milli_seconds_impl, send_data_impl
+
+# Local settings of the underlying OHandSerialAPI available on AsyncOHandAPI, they don't talk to a hand.
+# Other synchronous methods (batch(), snapshot(), restore(), discover_nodes(), HAND_SubmitCmd, ...) would block the event loop.
+ASYNC_LOCAL_METHODS = frozenset(
+    {
+        "HAND_SetTimerFunction",
+        "HAND_GetTick",
+        "HAND_GetTickUs",
+        "HAND_ProtocolLRC",
+        "HAND_SetCommandTimeOut",
+        "HAND_EnableAdaptiveTimeout",
+        "HAND_GetCommandTimeOut",
+        "HAND_SetRetryPolicy",
+        "HAND_EnableResponseCache",
+        "HAND_ClearResponseCache",
+        "HAND_EnableParamShadow",
+        "HAND_ClearParamShadow",
+        "HAND_EnableMetrics",
+        "get_private_data",
+    }
+)
+
+class _TransactionPending(Exception):
+    """Raised by a HAND_* method at a transaction not awaited yet, args are (hand_id, cmd, data, out size, force)"""
+
+
+class _StepOHandAPI(OHandSerialAPI):
+    """
+    Runs the HAND_* methods with the results of the transactions already awaited by AsyncOHandAPI.
+    A method stops with _TransactionPending at its first transaction without a result, AsyncOHandAPI awaits it
+    with OHandSerialAPI.transaction() and runs the method again. The transactions, with their cache, shadow,
+    retries and counters, run once, only the request packing before them runs again.
+    """
+
+    def __init__(self, private_data, protocol, address_master, send_data_impl):
+        super().__init__(private_data, protocol, address_master, send_data_impl, None)
+        self._done = None  # [(err, response data, remote errors)] of the running method, None outside of run()
+        self._step = 0
+
+    def run(self, name, args, kwargs, done):
+        self._done = done
+        self._step = 0
+        try:
+            return getattr(self, name)(*args, **kwargs)
+        finally:
+            self._done = None
+
+    def _transact(self, hand_id, cmd, data, out, remote_err, force=False):
+        if self._done is None:
+            return super()._transact(hand_id, cmd, data, out, remote_err, force)
+
+        step = self._step
+        self._step += 1
+        if step == len(self._done):
+            raise _TransactionPending(hand_id, cmd, data, len(out) if out is not None else None, force)
+        err, resp_bytes, errors = self._done[step]
+        if out is not None:
+            out[:] = resp_bytes
+        if remote_err is not None:
+            remote_err.extend(errors)
+        return err
+
+
+class _BusTurns:
+    """The bus turns of OHandSerialAPI in the event loop: shared for responses of one frame, exclusive for longer ones"""
+
+    def __init__(self):
+        self._cond = asyncio.Condition()
+        self._shared = 0
+        self._exclusive = False
+        self._waiting = 0  # Coroutines waiting for an exclusive turn, they go first
+
+    @asynccontextmanager
+    async def turn(self, exclusive):
+        async with self._cond:
+            if exclusive:
+                self._waiting += 1
+                try:
+                    await self._cond.wait_for(lambda: not self._exclusive and not self._shared)
+                finally:
+                    self._waiting -= 1
+                self._exclusive = True
+            else:
+                await self._cond.wait_for(lambda: not self._exclusive and not self._waiting)
+                self._shared += 1
+        try:
+            yield
+        finally:
+            async with self._cond:
+                if exclusive:
+                    self._exclusive = False
+                else:
+                    self._shared -= 1
+                self._cond.notify_all()
+
+
+class AsyncOHandAPI:
+    """
+    asyncio version of OHandSerialAPI, every HAND_* command, read_state(), control_step() and wait_until_settled() is a coroutine taking the same arguments.
+    Frames are received through python-can's AsyncBufferedReader inside the event loop,
+    commands to different hands run concurrently, commands to the same hand are serialized and a response
+    of several frames has the bus alone. The transactions are awaited with OHandSerialAPI.transaction().
+    Only the local settings in ASYNC_LOCAL_METHODS are available besides, setpoints aren't coalesced
+    and there is no batch(), snapshot(), restore() or discover_nodes().
+
+        async with AsyncOHandAPI(bus) as api:
+            err, major, minor = await api.HAND_GetProtocolVersion(0x02, [0], [0], [])
+    """
+
+    def __init__(self, bus, address_master=0x01, protocol=HAND_PROTOCOL_UART, send_data_impl=send_data_impl):
+        self.bus = bus
+        self.address_master = address_master
+        self._api = _StepOHandAPI(bus, protocol, address_master, send_data_impl)
+        self._api.HAND_SetTimerFunction(get_milli_seconds_impl, delay_milli_seconds_impl, get_micro_seconds_impl)
+        self._hand_locks = {}
+        self._bus_turns = _BusTurns()
+        self._reader = None
+        self._notifier = None
+        self._rx_task = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self._reader = can.AsyncBufferedReader()
+        self._notifier = can.Notifier(self.bus, [self._reader], loop=loop)
+        self._rx_task = loop.create_task(self._rx_loop())
+
+    async def stop(self):
+        if self._notifier:
+            self._notifier.stop()
+            self._notifier = None
+        if self._rx_task:
+            self._rx_task.cancel()
+            try:
+                await self._rx_task
+            except asyncio.CancelledError:
+                pass
+            self._rx_task = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    async def _rx_loop(self):
+        async for msg in self._reader:
+            if msg.arbitration_id == self.address_master:
+                self._api.HAND_OnDataBytes(msg.data)
+
+    def __getattr__(self, name):
+        # Local settings, e.g. HAND_SetCommandTimeOut, and counters go straight to the underlying API
+        value = getattr(self._api, name)
+        if callable(value) and name not in ASYNC_LOCAL_METHODS:
+            raise AttributeError(f"AsyncOHandAPI has no {name}(), the synchronous OHandSerialAPI method would block the event loop")
+        return value
+
+    async def _call(self, name, args, kwargs):
+        hand_id = args[0] if args else kwargs["hand_id"]
+        hand_lock = self._hand_locks.setdefault(hand_id, asyncio.Lock())
+        async with hand_lock:
+            done = []
+            while True:
+                try:
+                    return self._api.run(name, args, kwargs, done)
+                except _TransactionPending as pending:
+                    done.append(await self._transact(*pending.args))
+
+    async def _transact(self, hand_id, cmd, data, out_size, force):
+        """Await the attempts of a transaction of OHandSerialAPI.transaction(), returns (err, response data, remote errors)"""
+        out = bytearray(out_size) if out_size is not None else None
+        remote_err = []
+        steps = self._api.transaction(hand_id, cmd, data, out, remote_err, force)
+        try:
+            delay, time_out = next(steps)
+            nb_data = len(data) if data is not None else 0
+            exclusive = response_frames(cmd) > 1
+            while True:
+                if delay > 0:
+                    await asyncio.sleep(delay / 1000.0)
+                async with self._bus_turns.turn(exclusive):
+                    start = self._api.HAND_GetTickUs()
+                    future = self._api.HAND_SubmitCmd(hand_id, cmd, data, nb_data, time_out)
+                    try:
+                        err, resp_bytes = await asyncio.wait_for(asyncio.wrap_future(future), time_out / 1000.0)
+                    except asyncio.TimeoutError:
+                        self._api.HAND_CancelCmd(future)
+                        err, resp_bytes = HAND_RESP_TIMEOUT, b""
+                    latency = self._api.HAND_GetTickUs() - start
+
+                if err == HAND_RESP_HAND_ERROR:
+                    remote_err.append(resp_bytes[0])
+                elif err == HAND_RESP_SUCCESS and out:
+                    if len(resp_bytes) > len(out):
+                        err = HAND_RESP_INVALID_OUT_BUFFER_SIZE
+                    else:
+                        out[:] = resp_bytes
+                delay, time_out = steps.send((err, latency))
+        except StopIteration as result:
+            return result.value, bytes(out) if out is not None else b"", remote_err
+
+    async def wait_until_settled(
+        self, hand_id, fingers=None, tolerance=SETTLE_TOLERANCE, timeout=SETTLE_TIMEOUT, angle=False, remote_err=None
+    ):
+        """Coroutine version of OHandSerialAPI.wait_until_settled, sleeps in the event loop between polls"""
+        settle = _Settle(fingers, tolerance, timeout, self._api.HAND_GetTickUs())
+        if settle.fingers is None:
+            return HAND_RESP_DATA_INVALID, 0, None
+
+        cmd = HAND_CMD_GET_FINGER_ANGLE_ALL if angle else HAND_CMD_GET_FINGER_POS_ALL
+        while True:
+            err, values = await self.HAND_Command(hand_id, cmd, (), remote_err)
+            result, interval = settle.update(err, values, self._api.HAND_GetTickUs())
+            if result is not None:
+                return result
+            await asyncio.sleep(interval / 1000.0)
+
+
+def _make_command(name):
+    async def command(self, *args, **kwargs):
+        return await self._call(name, args, kwargs)
+
+    command.__name__ = name
+    command.__qualname__ = f"AsyncOHandAPI.{name}"
+    command.__doc__ = f"Coroutine version of OHandSerialAPI.{name}"
+    return command
+
+
+for _name in dir(OHandSerialAPI):
+    if _name in AsyncOHandAPI.__dict__:
+        continue  # Own coroutine, not a step by step run of the synchronous method
+    if _name == "HAND_FlushSetpoints":
+        continue  # Nothing to flush, setpoints aren't coalesced
+    if (_name.startswith("HAND_") and _name not in LOCAL_METHODS) or _name in COMMAND_METHODS:
+        setattr(AsyncOHandAPI, _name, _make_command(_name))
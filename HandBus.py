@@ -0,0 +1,154 @@
+from OHandSerialAPI import (
+    COMMAND_METHODS,
+    DISCOVERY_HAND_IDS,
+    DISCOVERY_TIMEOUT,
+    HAND_CMD_LAYOUTS,
+    HAND_PROTOCOL_UART,
+    HAND_RESP_SUCCESS,
+    LOCAL_METHODS,
+    RX_QUEUE_SIZE,
+    OHandSerialAPI,
+    response_frames,
+)
+from can_interface import (
+    CAN_StartReceiver,
+    CAN_StopReceiver,
+    delay_milli_seconds_impl,
+    get_micro_seconds_impl,
+    get_milli_seconds_impl,
+    recv_data_impl,
+    send_data_impl,
+)
+
+
+class HandNode:
+    """
+    Handle of one hand on a HandBus: the HAND_* commands, read_state() and control_step()
+    of the shared OHandSerialAPI, without the hand_id argument. Nodes can be used from different threads,
+    the API serializes the commands to the same hand and gives the bus to a response of several frames
+    alone, see OHandSerialAPI.lock_hands().
+
+        err, major, minor = bus.node(0x02).HAND_GetProtocolVersion([0], [0], [])
+    """
+
+    def __init__(self, hand_bus, hand_id):
+        self.hand_bus = hand_bus
+        self.hand_id = hand_id
+
+    def __getattr__(self, name):
+        method = getattr(self.hand_bus.api, name)
+        if not ((name.startswith("HAND_") and name not in LOCAL_METHODS) or name in COMMAND_METHODS):
+            return method
+
+        def command(*args, **kwargs):
+            return method(self.hand_id, *args, **kwargs)
+
+        command.__name__ = name
+        return command
+
+    def __repr__(self):
+        return f"HandNode(0x{self.hand_id:02X})"
+
+
+class HandBus:
+    """
+    Several hands on one CAN channel. The bus is owned by a single OHandSerialAPI, its frames are
+    decoded once by a background receiver and each packet is routed by its source address, to the
+    HAND_* call or pipelined request waiting for that hand.
+
+        with HandBus(CAN_Init("1", 1000000), [0x02, 0x03]) as hands:
+            hands.node(0x02).HAND_Beep(100, [])
+            results = hands.poll(HAND_CMD_GET_FINGER_POS_ALL)  # All hands in parallel
+
+    All hands answer with the master CAN id, a response longer than one frame must not overlap other responses
+    on the bus: the API gives it the bus alone. poll() sends to all hands at once only when the response
+    fits in one frame, otherwise to one hand at a time, see its window argument.
+    """
+
+    def __init__(self, bus, hand_ids=(), address_master=0x01, protocol=HAND_PROTOCOL_UART):
+        self.bus = bus
+        self.api = OHandSerialAPI(bus, protocol, address_master, send_data_impl, recv_data_impl)
+        self.api.HAND_SetTimerFunction(get_milli_seconds_impl, delay_milli_seconds_impl, get_micro_seconds_impl)
+        self.nodes = {}
+        self._notifier = None
+        for hand_id in hand_ids:
+            self.add_node(hand_id)
+
+    def start(self):
+        """Start the background receiver, shared by all nodes"""
+        if self._notifier is None:
+            self._notifier = CAN_StartReceiver(self.bus, self.api)
+
+    def stop(self):
+        if self._notifier is not None:
+            CAN_StopReceiver(self._notifier, self.api)
+            self._notifier = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def add_node(self, hand_id):
+        node = self.nodes.get(hand_id)
+        if node is None:
+            node = self.nodes[hand_id] = HandNode(self, hand_id)
+            # Room for a response of every hand waiting to be routed
+            self.api.rx_queue_size = max(RX_QUEUE_SIZE, 2 * len(self.nodes))
+        return node
+
+    def remove_node(self, hand_id):
+        self.nodes.pop(hand_id, None)
+
+    def node(self, hand_id):
+        return self.nodes[hand_id]
+
+    def __getitem__(self, hand_id):
+        return self.nodes[hand_id]
+
+    def __iter__(self):
+        return iter(self.nodes.values())
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def discover(self, hand_ids=DISCOVERY_HAND_IDS, time_out=DISCOVERY_TIMEOUT, window=None):
+        """
+        Scan hand_ids with OHandSerialAPI.discover_nodes() and add a node for every hand found.
+        Returns [(hand_id, (protocol major, minor), (fw major, minor, revision))]
+        """
+        nodes = self.api.discover_nodes(hand_ids, time_out, window)
+        for hand_id, _, _ in nodes:
+            self.add_node(hand_id)
+        return nodes
+
+    def poll(self, cmd, values=(), hand_ids=None, time_out=None, window=None):
+        """
+        Send cmd (with request values) to all nodes, or hand_ids, and gather the responses,
+        at most window requests in flight: by default all of them when the response fits in one CAN frame,
+        else one. The commands of the hands polled wait meanwhile, the pipelined requests would take their responses.
+        Returns {hand_id: (err, result)}, result is the response unpacked with HAND_CMD_LAYOUTS,
+        or the raw bytes for content dependent layouts, or the remote error code when err is HAND_RESP_HAND_ERROR.
+        """
+        hand_ids = list(self.nodes) if hand_ids is None else list(hand_ids)
+        request, response = HAND_CMD_LAYOUTS[cmd]
+        data = request.pack(*values) if request is not None else b""
+        if not window:
+            window = len(hand_ids) if response_frames(cmd) == 1 else 1
+        window = max(window, 1)
+
+        results = {}
+        for start in range(0, len(hand_ids), window):
+            batch = hand_ids[start : start + window]
+            with self.api.lock_hands(batch, [cmd]):
+                futures = [self.api.HAND_SubmitCmd(hand_id, cmd, data, len(data), time_out) for hand_id in batch]
+                replies = self.api.HAND_WaitCmds(futures)
+
+            for hand_id, (err, resp_bytes) in zip(batch, replies):
+                result = resp_bytes
+                if err == HAND_RESP_SUCCESS and response is not None and len(resp_bytes) == response.size:
+                    result = response.unpack(resp_bytes)
+                results[hand_id] = (err, result)
+        return results
@@ -0,0 +1,161 @@
+from OHandProtocol import (
+    HAND_CMD_CALIBRATE,
+    HAND_CMD_GET_CALI_DATA,
+    HAND_CMD_GET_FINGER_CURRENT_LIMIT,
+    HAND_CMD_GET_FINGER_FORCE_PID,
+    HAND_CMD_GET_FINGER_FORCE_TARGET,
+    HAND_CMD_GET_FINGER_PID,
+    HAND_CMD_GET_FINGER_POS_LIMIT,
+    HAND_CMD_GET_FINGER_STOP_PARAMS,
+    HAND_CMD_GET_FW_VERSION,
+    HAND_CMD_GET_HW_VERSION,
+    HAND_CMD_GET_MANUFACTURE_DATA,
+    HAND_CMD_GET_PROTOCOL_VERSION,
+    HAND_CMD_GET_SPEED_CTRL_PARAMS,
+    HAND_CMD_GET_UID,
+    HAND_CMD_LAYOUTS,
+    HAND_CMD_RESET,
+    HAND_CMD_SET_CALI_DATA,
+    HAND_CMD_SET_FINGER_CURRENT_LIMIT,
+    HAND_CMD_SET_FINGER_FORCE_PID,
+    HAND_CMD_SET_FINGER_FORCE_TARGET,
+    HAND_CMD_SET_FINGER_PID,
+    HAND_CMD_SET_FINGER_POS_LIMIT,
+    HAND_CMD_SET_FINGER_STOP_PARAMS,
+    HAND_CMD_SET_MANUFACTURE_DATA,
+    HAND_CMD_SET_NODE_ID,
+    HAND_CMD_SET_SPEED_CTRL_PARAMS,
+    HAND_RESP_INVALID_OUT_BUFFER_SIZE,
+    HAND_RESP_SUCCESS,
+)
+
+# Static info, cached per hand once HAND_EnableResponseCache() is called
+HAND_CACHED_CMDS = frozenset(
+    {
+        HAND_CMD_GET_PROTOCOL_VERSION,
+        HAND_CMD_GET_FW_VERSION,
+        HAND_CMD_GET_HW_VERSION,
+        HAND_CMD_GET_UID,
+        HAND_CMD_GET_MANUFACTURE_DATA,
+        HAND_CMD_GET_CALI_DATA,
+    }
+)
+# Commands after which the cached responses of the hand are dropped
+HAND_CACHE_INVALIDATE_CMDS = frozenset(
+    {
+        HAND_CMD_RESET,
+        HAND_CMD_SET_NODE_ID,
+        HAND_CMD_CALIBRATE,
+        HAND_CMD_SET_CALI_DATA,
+        HAND_CMD_SET_MANUFACTURE_DATA,
+    }
+)
+
+# Parameters shadowed per hand once HAND_EnableParamShadow() is called,
+# set command -> (get command, size of the key leading the data: finger_id or nothing).
+# The get responses have the layout of the set requests.
+HAND_SHADOW_PARAMS = {
+    HAND_CMD_SET_FINGER_PID: (HAND_CMD_GET_FINGER_PID, 1),
+    HAND_CMD_SET_FINGER_CURRENT_LIMIT: (HAND_CMD_GET_FINGER_CURRENT_LIMIT, 1),
+    HAND_CMD_SET_FINGER_FORCE_TARGET: (HAND_CMD_GET_FINGER_FORCE_TARGET, 1),
+    HAND_CMD_SET_FINGER_POS_LIMIT: (HAND_CMD_GET_FINGER_POS_LIMIT, 1),
+    HAND_CMD_SET_FINGER_STOP_PARAMS: (HAND_CMD_GET_FINGER_STOP_PARAMS, 1),
+    HAND_CMD_SET_FINGER_FORCE_PID: (HAND_CMD_GET_FINGER_FORCE_PID, 1),
+    HAND_CMD_SET_SPEED_CTRL_PARAMS: (HAND_CMD_GET_SPEED_CTRL_PARAMS, 0),
+}
+_SHADOW_GET_CMDS = {get_cmd: set_cmd for set_cmd, (get_cmd, _) in HAND_SHADOW_PARAMS.items()}
+
+
+class HandCache:
+    """Response cache and parameter shadow of OHandSerialAPI"""
+
+    def HAND_EnableResponseCache(self, enable=True):
+        """Cache the responses of HAND_CACHED_CMDS per hand until one of HAND_CACHE_INVALIDATE_CMDS"""
+        if not enable:
+            self._response_cache = None
+        elif self._response_cache is None:
+            self._response_cache = {}
+
+    def HAND_ClearResponseCache(self, hand_id=0xFF):
+        """Drop the cached responses of hand_id, 0xFF for all hands"""
+        cache = self._response_cache
+        if not cache:
+            return
+        if hand_id == 0xFF:
+            cache.clear()
+            return
+        for key in [key for key in cache if key[0] == hand_id]:
+            del cache[key]
+
+    def HAND_EnableParamShadow(self, enable=True):
+        """Skip the HAND_SHADOW_PARAMS writes the hand already has, unless called with force=True"""
+        if not enable:
+            self._shadow = None
+        elif self._shadow is None:
+            self._shadow = {}
+
+    def HAND_ClearParamShadow(self, hand_id=0xFF):
+        """Forget the shadowed parameters of hand_id, 0xFF for all hands"""
+        shadow = self._shadow
+        if not shadow:
+            return
+        if hand_id == 0xFF:
+            shadow.clear()
+            return
+        for key in [key for key in shadow if key[0] == hand_id]:
+            del shadow[key]
+
+    def _update_shadow(self, hand_id, cmd, data, out, err):
+        if cmd in HAND_SHADOW_PARAMS:
+            key = (hand_id, cmd, bytes(data[: HAND_SHADOW_PARAMS[cmd][1]]))
+            if err == HAND_RESP_SUCCESS:
+                self._shadow[key] = bytes(data)
+            else:
+                self._shadow.pop(key, None)  # The hand may have applied it before the response was lost
+        elif cmd in _SHADOW_GET_CMDS and err == HAND_RESP_SUCCESS:
+            set_cmd = _SHADOW_GET_CMDS[cmd]
+            size = HAND_CMD_LAYOUTS[set_cmd][0].size
+            if len(out) >= size:
+                self._shadow[(hand_id, set_cmd, bytes(out[: HAND_SHADOW_PARAMS[set_cmd][1]]))] = bytes(out[:size])
+        elif cmd in HAND_CACHE_INVALIDATE_CMDS:
+            self.HAND_ClearParamShadow(hand_id)
+            if cmd == HAND_CMD_SET_NODE_ID and data:
+                self.HAND_ClearParamShadow(data[0])
+
+    def _answer_locally(self, hand_id, cmd, data, out, force):
+        """(err, cache key): err is None unless shadowed or cached, the key stores the response when not None"""
+        shadow = self._shadow
+        if shadow is not None and not force and cmd in HAND_SHADOW_PARAMS:
+            if shadow.get((hand_id, cmd, bytes(data[: HAND_SHADOW_PARAMS[cmd][1]]))) == data:
+                self.shadow_skips += 1
+                return HAND_RESP_SUCCESS, None
+
+        cache = self._response_cache
+        if cache is None or cmd not in HAND_CACHED_CMDS:
+            return None, None
+        key = (hand_id, cmd, bytes(data) if data is not None else b"")
+        payload = cache.get(key)
+        if payload is None:
+            self.cache_misses += 1
+            return None, key
+        self.cache_hits += 1
+        if out is not None:
+            if len(payload) > len(out):
+                return HAND_RESP_INVALID_OUT_BUFFER_SIZE, None
+            out[:] = payload
+        return HAND_RESP_SUCCESS, None
+
+    def _update_cache(self, hand_id, cmd, data, out, err, key):
+        if self._shadow is not None:
+            self._update_shadow(hand_id, cmd, data, out, err)
+
+        cache = self._response_cache
+        if cache is None:
+            return
+        if key is not None and err == HAND_RESP_SUCCESS:
+            cache[key] = bytes(out) if out is not None else b""
+        elif cmd in HAND_CACHE_INVALIDATE_CMDS:
+            # Also when failed, the hand may have applied the command before the response was lost
+            self.HAND_ClearResponseCache(hand_id)
+            if cmd == HAND_CMD_SET_NODE_ID and data:
+                self.HAND_ClearResponseCache(data[0])
@@ -0,0 +1,266 @@
+import json
+import math
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HISTOGRAM_SUB_BUCKET_BITS = 4  # 16 linear sub-buckets per power of two, values kept within 1/16
+HISTOGRAM_MAX_BITS = 33  # Values up to 2**33 us (2.4 hours), larger ones land in the last bucket
+METRICS_QUANTILES = (0.5, 0.9, 0.99, 0.999)
+METRICS_FRAME_SIZE = 8  # Bytes per frame counted in tx_frames, a CAN frame payload
+METRICS_PORT = 9464
+
+_SUB_BUCKETS = 1 << HISTOGRAM_SUB_BUCKET_BITS
+_LINEAR = 2 * _SUB_BUCKETS  # Values below are counted exactly
+_BUCKETS = (HISTOGRAM_MAX_BITS - HISTOGRAM_SUB_BUCKET_BITS) << HISTOGRAM_SUB_BUCKET_BITS
+
+
+def _bucket_range(index):
+    """Lowest and highest value counted in bucket index"""
+    if index < _LINEAR:
+        return index, index
+    shift = (index >> HISTOGRAM_SUB_BUCKET_BITS) - 1
+    low = (index - (shift << HISTOGRAM_SUB_BUCKET_BITS)) << shift
+    return low, low + (1 << shift) - 1
+
+
+class LatencyHistogram:
+    """
+    HDR-style histogram of integer values (latencies in us): exact below 32, above that 16 linear
+    sub-buckets per power of two, so every value is known within 6%. Recording is a few integer operations
+    into a fixed list of counts, no allocation.
+    """
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def record(self, value):
+        if value < _LINEAR:
+            index = value if value > 0 else 0
+        else:
+            shift = value.bit_length() - HISTOGRAM_SUB_BUCKET_BITS - 1
+            index = (shift << HISTOGRAM_SUB_BUCKET_BITS) + (value >> shift)
+            if index >= _BUCKETS:
+                index = _BUCKETS - 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, p):
+        """Value below which p percent of the recorded values are, the highest value of its bucket"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(p / 100.0 * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(_bucket_range(index)[1], self.max)
+        return self.max
+
+    def buckets(self):
+        """[(highest value of the bucket, count)] of the non-empty buckets"""
+        return [(_bucket_range(index)[1], count) for index, count in enumerate(self.counts) if count]
+
+    def to_dict(self):
+        values = {"count": self.count, "sum": self.total, "min": self.min, "max": self.max}
+        for quantile in METRICS_QUANTILES:
+            values[f"p{quantile * 100:g}"] = self.percentile(quantile * 100)
+        values["buckets"] = self.buckets()
+        return values
+
+
+class HandMetrics:
+    """
+    Counters of an OHandSerialAPI, see OHandSerialAPI.HAND_EnableMetrics():
+    latency histograms per (hand_id, cmd) of the send (send_data_impl call) and of the response
+    (end of the send to the decoded response, bus and device time), errors per (hand_id, cmd, error),
+    and the bytes, frames and packets sent and received.
+
+        api.HAND_EnableMetrics()
+        ...
+        api.metrics.dump("ohand.prom", "prometheus")  # e.g. for the node_exporter textfile collector
+        api.metrics.serve(9464)  # http://127.0.0.1:9464/metrics and /metrics.json
+    """
+
+    def __init__(self, error_names=None, counters=None, frame_size=METRICS_FRAME_SIZE):
+        self.error_names = error_names or {}  # error code -> label
+        self.counters = counters  # Callable returning {name: value} of counters kept elsewhere
+        self.frame_size = frame_size
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._lock.acquire()
+        try:
+            self.send_latency = {}  # (hand_id, cmd) -> LatencyHistogram in us
+            self.response_latency = {}  # (hand_id, cmd) -> LatencyHistogram in us
+            self.errors = {}  # (hand_id, cmd, error label) -> count
+            self.tx_bytes = 0
+            self.tx_frames = 0
+            self.tx_packets = 0
+            self.rx_bytes = 0  # Bytes fed to the decoder by HAND_OnDataBytes, HAND_OnData isn't counted
+            self.rx_frames = 0  # Chunks fed to HAND_OnDataBytes, one per CAN frame
+            self.rx_packets = 0
+        finally:
+            self._lock.release()
+
+    def record_send(self, hand_id, cmd, nb_bytes, latency, err):
+        self._lock.acquire()
+        try:
+            self.tx_bytes += nb_bytes
+            self.tx_frames += -(-nb_bytes // self.frame_size)
+            self.tx_packets += 1
+            histogram = self.send_latency.get((hand_id, cmd))
+            if histogram is None:
+                histogram = self.send_latency[(hand_id, cmd)] = LatencyHistogram()
+            histogram.record(latency)
+            if err:
+                self._error(hand_id, cmd, "send_failed")
+        finally:
+            self._lock.release()
+
+    def record_response(self, hand_id, cmd, latency, err, answered):
+        """answered is True when the hand responded (also with an error), then latency is recorded"""
+        self._lock.acquire()
+        try:
+            if answered:
+                histogram = self.response_latency.get((hand_id, cmd))
+                if histogram is None:
+                    histogram = self.response_latency[(hand_id, cmd)] = LatencyHistogram()
+                histogram.record(latency)
+            if err:
+                self._error(hand_id, cmd, self.error_names.get(err, f"err_{err}"))
+        finally:
+            self._lock.release()
+
+    def record_rx(self, nb_bytes):
+        self._lock.acquire()
+        try:
+            self.rx_bytes += nb_bytes
+            self.rx_frames += 1
+        finally:
+            self._lock.release()
+
+    def record_rx_packet(self):
+        self._lock.acquire()
+        try:
+            self.rx_packets += 1
+        finally:
+            self._lock.release()
+
+    def _error(self, hand_id, cmd, name):
+        key = (hand_id, cmd, name)
+        self.errors[key] = self.errors.get(key, 0) + 1
+
+    def _totals(self):
+        totals = {
+            "tx_bytes": self.tx_bytes,
+            "tx_frames": self.tx_frames,
+            "tx_packets": self.tx_packets,
+            "rx_bytes": self.rx_bytes,
+            "rx_frames": self.rx_frames,
+            "rx_packets": self.rx_packets,
+        }
+        if self.counters is not None:
+            totals.update(self.counters())
+        return totals
+
+    def to_dict(self):
+        self._lock.acquire()
+        try:
+            return {
+                "counters": self._totals(),
+                "send_latency_us": [
+                    dict(hand_id=hand_id, cmd=cmd, **histogram.to_dict())
+                    for (hand_id, cmd), histogram in sorted(self.send_latency.items())
+                ],
+                "response_latency_us": [
+                    dict(hand_id=hand_id, cmd=cmd, **histogram.to_dict())
+                    for (hand_id, cmd), histogram in sorted(self.response_latency.items())
+                ],
+                "errors": [
+                    {"hand_id": hand_id, "cmd": cmd, "error": name, "count": count}
+                    for (hand_id, cmd, name), count in sorted(self.errors.items())
+                ],
+            }
+        finally:
+            self._lock.release()
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=1)
+
+    def to_prometheus(self):
+        """Prometheus text exposition format, latencies as summaries"""
+        lines = []
+        self._lock.acquire()
+        try:
+            for name, histograms, help_text in (
+                ("ohand_send_latency_us", self.send_latency, "Time spent in send_data_impl"),
+                ("ohand_response_latency_us", self.response_latency, "Time from the end of the send to the response"),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} summary"]
+                for (hand_id, cmd), histogram in sorted(histograms.items()):
+                    labels = f'hand="{hand_id}",cmd="0x{cmd:02X}"'
+                    for quantile in METRICS_QUANTILES:
+                        lines.append(f'{name}{{{labels},quantile="{quantile:g}"}} {histogram.percentile(quantile * 100)}')
+                    lines.append(f"{name}_sum{{{labels}}} {histogram.total}")
+                    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+            lines += ["# HELP ohand_errors_total Failed transactions by error", "# TYPE ohand_errors_total counter"]
+            for (hand_id, cmd, error), count in sorted(self.errors.items()):
+                lines.append(f'ohand_errors_total{{hand="{hand_id}",cmd="0x{cmd:02X}",error="{error}"}} {count}')
+
+            for name, value in self._totals().items():
+                lines += [f"# TYPE ohand_{name}_total counter", f"ohand_{name}_total {value}"]
+        finally:
+            self._lock.release()
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path, fmt="json"):
+        """Write the metrics to path as "json" or "prometheus", replaced atomically"""
+        text = self.to_prometheus() if fmt == "prometheus" else self.to_json()
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write(text)
+        os.replace(temp_path, path)
+
+    def serve(self, port=METRICS_PORT, host="127.0.0.1"):
+        """
+        Serve /metrics (Prometheus) and /metrics.json over HTTP from a background thread,
+        returns the server, call its shutdown() to stop
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = metrics.to_prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = metrics.to_json(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                body = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # No log line per scrape
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="HandMetrics", daemon=True).start()
+        return server
@@ -0,0 +1,157 @@
+import json
+
+from HandCache import HAND_CACHE_INVALIDATE_CMDS, HAND_SHADOW_PARAMS, _SHADOW_GET_CMDS
+from OHandProtocol import (
+    HAND_CMD_GET_CALI_DATA,
+    HAND_CMD_LAYOUTS,
+    HAND_CMD_SET_CALI_DATA,
+    HAND_RESP_DATA_INVALID,
+    HAND_RESP_HAND_ERROR,
+    HAND_RESP_SUCCESS,
+    MAX_MOTOR_CNT,
+    MAX_PROTOCOL_DATA_SIZE,
+)
+
+
+def _cali_set_data(resp_bytes):
+    """HAND_CMD_SET_CALI_DATA request from a HAND_CMD_GET_CALI_DATA response, None if truncated"""
+    header = HAND_CMD_LAYOUTS[HAND_CMD_GET_CALI_DATA][1]
+    if len(resp_bytes) < header.size:
+        return None
+    motor_cnt, thumb_root_pos_cnt = header.unpack_from(resp_bytes)
+    positions = header.size + 4 * motor_cnt
+    if len(resp_bytes) < positions + 2 * thumb_root_pos_cnt:
+        return None
+    # [motor_cnt, thumb_root_pos_cnt, end_pos, start_pos, thumb_root_pos] -> [motor_cnt, end_pos, start_pos, thumb_root_pos_cnt, thumb_root_pos]
+    return (
+        bytes([motor_cnt])
+        + bytes(resp_bytes[header.size : positions])
+        + bytes([thumb_root_pos_cnt])
+        + bytes(resp_bytes[positions : positions + 2 * thumb_root_pos_cnt])
+    )
+
+
+class Profile:
+    """Hand configuration from snapshot(), params maps (set command, finger_id byte or b"") to the request data"""
+
+    def __init__(self, params=None):
+        self.params = {} if params is None else params
+
+    def __eq__(self, other):
+        return isinstance(other, Profile) and self.params == other.params
+
+    def diff(self, other):
+        """Keys of params whose data differs from other, or missing from it, in self's order"""
+        return [key for key, data in self.params.items() if other.params.get(key) != data]
+
+    def to_dict(self):
+        """{"CMD:KEY": data} in hex, JSON serializable"""
+        return {f"{cmd:02X}:{key.hex()}": data.hex() for (cmd, key), data in self.params.items()}
+
+    @classmethod
+    def from_dict(cls, values):
+        params = {}
+        for name, data in values.items():
+            cmd, key = name.split(":")
+            params[(int(cmd, 16), bytes.fromhex(key))] = bytes.fromhex(data)
+        return cls(params)
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=1)
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+    def __repr__(self):
+        return f"Profile({len(self.params)} params)"
+
+
+class HandProfile:
+    """Configuration snapshot and restore of OHandSerialAPI"""
+
+    def snapshot(self, hand_id, remote_err=None):
+        """Read the HAND_SHADOW_PARAMS and calibration data of the hand, returns (err, Profile)"""
+        requests = [(HAND_CMD_GET_CALI_DATA, b"")]
+        for set_cmd, (get_cmd, key_size) in HAND_SHADOW_PARAMS.items():
+            if key_size:
+                requests += [(get_cmd, bytes([finger_id])) for finger_id in range(MAX_MOTOR_CNT)]
+            else:
+                requests.append((get_cmd, b""))
+
+        profile = Profile()
+        err = HAND_RESP_SUCCESS
+        for (cmd, data), (result, resp_bytes) in zip(requests, self._pipeline(hand_id, requests, remote_err)):
+            if result != HAND_RESP_SUCCESS:
+                err = err or result
+                continue
+            if cmd == HAND_CMD_GET_CALI_DATA:
+                set_cmd, set_data = HAND_CMD_SET_CALI_DATA, _cali_set_data(resp_bytes)
+            else:
+                set_cmd = _SHADOW_GET_CMDS[cmd]
+                size = HAND_CMD_LAYOUTS[set_cmd][0].size
+                set_data = bytes(resp_bytes[:size]) if len(resp_bytes) >= size else None
+            if set_data is None:
+                err = err or HAND_RESP_DATA_INVALID
+                continue
+            profile.params[(set_cmd, data)] = set_data
+            if self._shadow is not None and set_cmd in HAND_SHADOW_PARAMS:
+                self._update_shadow(hand_id, cmd, data, resp_bytes, result)
+        return err, profile
+
+    def restore(self, hand_id, profile, force=False, remote_err=None):
+        """Write the parameters of profile the hand doesn't have, all with force, returns (err, keys written)"""
+        if force:
+            keys = list(profile.params)
+        else:
+            err, current = self.snapshot(hand_id, remote_err)
+            if err != HAND_RESP_SUCCESS:
+                return err, []
+            keys = profile.diff(current)
+        keys.sort(key=lambda key: key[0] != HAND_CMD_SET_CALI_DATA)
+
+        requests = [(cmd, profile.params[(cmd, key)]) for cmd, key in keys]
+        err = HAND_RESP_SUCCESS
+        for (cmd, data), (result, _) in zip(requests, self._pipeline(hand_id, requests, remote_err)):
+            err = err or result
+            if self._response_cache is not None and cmd in HAND_CACHE_INVALIDATE_CMDS:
+                self.HAND_ClearResponseCache(hand_id)
+            if self._shadow is not None:
+                self._update_shadow(hand_id, cmd, data, None, result)
+        return err, keys
+
+    def _pipeline(self, hand_id, requests, remote_err):
+        """Pipelined requests [(cmd, data)] to the hand, returns [(err, resp_bytes)] in order"""
+        if self._batches and hand_id in self._batches:
+            self._flush_before(hand_id)
+
+        # Requests with the same command can't be told apart, they go in successive rounds
+        rounds = []
+        for index, (cmd, _) in enumerate(requests):
+            for batch in rounds:
+                if cmd not in batch:
+                    break
+            else:
+                batch = {}
+                rounds.append(batch)
+            batch[cmd] = index
+
+        results = [None] * len(requests)
+        for batch in rounds:
+            indexes = list(batch.values())
+            with self.lock_hands([hand_id], batch):
+                futures = [self.HAND_SubmitCmd(hand_id, requests[i][0], requests[i][1], len(requests[i][1])) for i in indexes]
+                replies = self.HAND_WaitCmds(futures)
+            for index, result in zip(indexes, replies):
+                results[index] = result
+
+        for index, (err, resp_bytes) in enumerate(results):
+            cmd, data = requests[index]
+            if err == HAND_RESP_HAND_ERROR:
+                if remote_err is not None:
+                    remote_err.append(resp_bytes[0])
+            elif err != HAND_RESP_SUCCESS:
+                out = bytearray(MAX_PROTOCOL_DATA_SIZE)
+                err = self._transact(hand_id, cmd, data, out, remote_err)
+                results[index] = (err, bytes(out))
+        return results
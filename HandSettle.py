@@ -0,0 +1,85 @@
+from OHandProtocol import (
+    HAND_CMD_GET_FINGER_ANGLE_ALL,
+    HAND_CMD_GET_FINGER_POS_ALL,
+    HAND_RESP_DATA_INVALID,
+    HAND_RESP_SUCCESS,
+    HAND_RESP_TIMEOUT,
+    HAND_RESP_TIMER_FUNC_NOT_SET,
+    MAX_MOTOR_CNT,
+)
+
+SETTLE_TOLERANCE = 200  # Position (or angle) units from the target at which a finger has arrived
+SETTLE_STILL_TIME = 60  # ms without any finger moving more than the tolerance after which the hand has stopped
+SETTLE_POLL_MIN = 5  # ms between polls
+SETTLE_POLL_MAX = 100  # ms
+SETTLE_TIMEOUT = 5000  # ms
+
+
+class _Settle:
+    """Progress of wait_until_settled(), fed with the *_ALL get responses, times in us"""
+
+    def __init__(self, fingers, tolerance, timeout, start):
+        fingers = range(MAX_MOTOR_CNT) if fingers is None else list(fingers)
+        self.fingers = fingers if all(0 <= finger_id < MAX_MOTOR_CNT for finger_id in fingers) else None
+        self.tolerance = tolerance
+        self.timeout = timeout
+        self.start = start
+        self.still_since = start
+        self.still_values = None  # Values when the fingers last moved more than tolerance
+        self.previous = None
+        self.previous_time = start
+
+    def update(self, err, values, now):
+        """((err, elapsed ms, current values), None) once done, else (None, ms until the next poll)"""
+        elapsed = (now - self.start) / 1000.0
+        if err != HAND_RESP_SUCCESS:
+            return (err, elapsed, None), None
+        targets, current = values[:MAX_MOTOR_CNT], values[MAX_MOTOR_CNT:]
+        fingers, tolerance = self.fingers, self.tolerance
+
+        if all(abs(targets[i] - current[i]) <= tolerance for i in fingers):
+            return (HAND_RESP_SUCCESS, elapsed, list(current)), None
+
+        # Stopped when no finger moved more than tolerance since still_since
+        if self.still_values is None or any(abs(current[i] - self.still_values[i]) > tolerance for i in fingers):
+            self.still_since, self.still_values = now, current
+        elif now - self.still_since >= SETTLE_STILL_TIME * 1000:
+            return (HAND_RESP_SUCCESS, elapsed, list(current)), None
+
+        if elapsed >= self.timeout:
+            return (HAND_RESP_TIMEOUT, elapsed, list(current)), None
+
+        # Next poll at half the time the fastest approaching finger needs to arrive
+        interval = SETTLE_POLL_MAX
+        if self.previous is not None and now > self.previous_time:
+            for i in fingers:
+                moved = abs(current[i] - self.previous[i])
+                if moved:
+                    eta = abs(targets[i] - current[i]) * (now - self.previous_time) / moved / 1000.0
+                    interval = min(interval, eta / 2)
+        else:
+            interval = SETTLE_POLL_MIN
+        self.previous, self.previous_time = current, now
+        return None, max(SETTLE_POLL_MIN, min(interval, SETTLE_STILL_TIME / 2, self.timeout - elapsed))
+
+
+class HandSettle:
+    """Motion settling of OHandSerialAPI"""
+
+    def wait_until_settled(
+        self, hand_id, fingers=None, tolerance=SETTLE_TOLERANCE, timeout=SETTLE_TIMEOUT, angle=False, remote_err=None
+    ):
+        """Wait until the fingers reach their targets or stop moving, returns (err, elapsed ms, values)"""
+        if not self._delay_milli_seconds_impl or not self._get_micro_seconds_impl:
+            return HAND_RESP_TIMER_FUNC_NOT_SET, 0, None
+        settle = _Settle(fingers, tolerance, timeout, self._get_micro_seconds_impl())
+        if settle.fingers is None:
+            return HAND_RESP_DATA_INVALID, 0, None
+
+        cmd = HAND_CMD_GET_FINGER_ANGLE_ALL if angle else HAND_CMD_GET_FINGER_POS_ALL
+        while True:
+            err, values = self.HAND_Command(hand_id, cmd, (), remote_err)
+            result, interval = settle.update(err, values, self._get_micro_seconds_impl())
+            if result is not None:
+                return result
+            self._delay_milli_seconds_impl(interval)
@@ -0,0 +1,240 @@
+import struct
+
+MAX_MOTOR_CNT = 6
+MAX_THUMB_ROOT_POS = 3
+MAX_FORCE_ENTRIES = 5 * 12
+
+# Constants from the C header file
+HAND_PROTOCOL_UART = 0
+HAND_PROTOCOL_I2C = 1
+
+# Error codes
+ERR_PROTOCOL_WRONG_LRC = 0x01
+ERR_COMMAND_INVALID = 0x11
+ERR_COMMAND_INVALID_BYTE_COUNT = 0x12
+ERR_COMMAND_INVALID_DATA = 0x13
+ERR_STATUS_INIT = 0x21
+ERR_STATUS_CALI = 0x22
+ERR_STATUS_STUCK = 0x23
+ERR_OP_FAILED = 0x31
+ERR_SAVE_FAILED = 0x32
+
+
+# API return values
+HAND_RESP_HAND_ERROR = 0xFF  # device error, error call back will be called with OHand error codes listed above
+HAND_RESP_SUCCESS = 0x00
+HAND_RESP_TIMER_FUNC_NOT_SET = 0x01  # local error, timer function not set, call HAND_SetTimerFunction(...) first
+HAND_RESP_INVALID_CONTEXT = 0x02  # local error, invalid context, NULL or send data function not set
+HAND_RESP_TIMEOUT = 0x03  # local error, time out when waiting node response
+HAND_RESP_INVALID_OUT_BUFFER_SIZE = 0x04  # local error, out buffer size not matched to returned data
+HAND_RESP_UNMATCHED_ADDR = 0x05  # local error, unmatched node id between returned and waiting
+HAND_RESP_UNMATCHED_CMD = 0x06  # local error, unmatched command between returned and waiting
+HAND_RESP_DATA_SIZE_TOO_BIG = 0x07  # local error, size of data to send exceeds the buffer size
+HAND_RESP_DATA_INVALID = 0x08  # local error, data content invalid
+
+# Sub-commands for HAND_CMD_SET_CUSTOM
+SUB_CMD_SET_SPEED = 1 << 0
+SUB_CMD_SET_POS = 1 << 1
+SUB_CMD_SET_ANGLE = 1 << 2
+SUB_CMD_GET_POS = 1 << 3
+SUB_CMD_GET_ANGLE = 1 << 4
+SUB_CMD_GET_CURRENT = 1 << 5
+SUB_CMD_GET_FORCE = 1 << 6
+SUB_CMD_GET_STATUS = 1 << 7
+
+# Command definitions
+
+# Chief GET commands
+HAND_CMD_GET_PROTOCOL_VERSION = 0x00  # Get protocol version, Please don't modify!
+HAND_CMD_GET_FW_VERSION = 0x01  # Get firmware version
+HAND_CMD_GET_HW_VERSION = 0x02  # Get hardware version, [HW_TYPE, HW_VER, BOOT_VER_MAJOR, BOOT_VER_MINOR]
+HAND_CMD_GET_CALI_DATA = 0x03  # Get calibration data
+HAND_CMD_GET_FINGER_PID = 0x04  # Get PID of finger
+HAND_CMD_GET_FINGER_CURRENT_LIMIT = 0x05  # Get motor current limit of finger
+HAND_CMD_GET_FINGER_CURRENT = 0x06  # Get motor current of finger
+HAND_CMD_GET_FINGER_FORCE_TARGET = 0x07  # Get force limit of finger
+HAND_CMD_GET_FINGER_FORCE = 0x08  # Get force of finger
+HAND_CMD_GET_FINGER_POS_LIMIT = 0x09  # Get absolute position limit of finger
+HAND_CMD_GET_FINGER_POS_ABS = 0x0A  # Get current absolute position of finger
+HAND_CMD_GET_FINGER_POS = 0x0B  # Get current logical position of finger
+HAND_CMD_GET_FINGER_ANGLE = 0x0C  # Get first joint angle of finger
+HAND_CMD_GET_THUMB_ROOT_POS = 0x0D  # Get preset position of thumb root, [0, 1, 2, 255], 255 as invalid
+HAND_CMD_GET_FINGER_POS_ABS_ALL = 0x0E  # Get current absolute position of all fingers
+HAND_CMD_GET_FINGER_POS_ALL = 0x0F  # Get current logical position of all fingers
+HAND_CMD_GET_FINGER_ANGLE_ALL = 0x10  # Get first joint angle of all fingers
+HAND_CMD_GET_FINGER_STOP_PARAMS = 0x11  # Get finger finger stop parametres
+HAND_CMD_GET_FINGER_FORCE_PID = 0x12  # Get finger force PID
+
+# Auxiliary GET commands
+HAND_CMD_GET_SELF_TEST_LEVEL = 0x20  # Get self-test level state
+HAND_CMD_GET_BEEP_SWITCH = 0x21  # Get beep switch state
+HAND_CMD_GET_BUTTON_PRESSED_CNT = 0x22  # Get button press count
+HAND_CMD_GET_UID = 0x23  # Get 96 bits UID
+HAND_CMD_GET_BATTERY_VOLTAGE = 0x24  # Get battery voltage
+HAND_CMD_GET_USAGE_STAT = 0x25  # Get usage stat
+HAND_CMD_GET_SPEED_CTRL_PARAMS = 0x3D  # Get speed control parameters
+HAND_CMD_GET_MANUFACTURE_DATA = 0x3E  # Get manufacture data
+
+# Chief SET commands
+HAND_CMD_RESET = 0x40  # Please don't modify
+HAND_CMD_POWER_OFF = 0x41  # Power off
+HAND_CMD_SET_NODE_ID = 0x42  # Set node ID
+HAND_CMD_CALIBRATE = 0x43  # Recalibrate hand
+HAND_CMD_SET_CALI_DATA = 0x44  # Set finger pos range & thumb pos set
+HAND_CMD_SET_FINGER_PID = 0x45  # Set PID of finger
+HAND_CMD_SET_FINGER_CURRENT_LIMIT = 0x46  # Set motor current limit of finger
+HAND_CMD_SET_FINGER_FORCE_TARGET = 0x47  # Set force limit of finger
+HAND_CMD_SET_FINGER_POS_LIMIT = 0x48  # Get current absolute position of finger
+HAND_CMD_FINGER_START = 0x49  # Start motor
+HAND_CMD_FINGER_STOP = 0x4A  # Stop motor
+HAND_CMD_SET_FINGER_POS_ABS = 0x4B  # Move finger to physical position, [0, 65535]
+HAND_CMD_SET_FINGER_POS = 0x4C  # Move finger to logical position, [0, 65535]
+HAND_CMD_SET_FINGER_ANGLE = 0x4D  # Set first joint angle of finger
+HAND_CMD_SET_THUMB_ROOT_POS = 0x4E  # Move thumb root to preset position, {0, 1, 2}
+HAND_CMD_SET_FINGER_POS_ABS_ALL = 0x4F  # Set current absolute position of all fingers
+HAND_CMD_SET_FINGER_POS_ALL = 0x50  # Set current logical position of all fingers
+HAND_CMD_SET_FINGER_ANGLE_ALL = 0x51  # Set first joint angle of all fingers
+HAND_CMD_SET_FINGER_STOP_PARAMS = 0x52  # Set finger finger stop parametres
+HAND_CMD_SET_FINGER_FORCE_PID = 0x53  # Set finger force PID
+HAND_CMD_RESET_FORCE = 0x54  # Reset force
+
+HAND_CMD_SET_CUSTOM = 0x5F  # Custom set command
+
+# Auxiliary SET commands
+HAND_CMD_SET_SELF_TEST_LEVEL = 0x60  # Set self-test level, level, 0: wait command, 1: semi self-test, 2: full self-test
+HAND_CMD_SET_BEEP_SWITCH = 0x61  # Set beep ON/OFF
+HAND_CMD_BEEP = 0x62  # Beep for duration if beep switch is on
+HAND_CMD_SET_BUTTON_PRESSED_CNT = 0x63  # Set button press count, for ROH calibration only
+HAND_CMD_START_INIT = 0x64  # Start init in case of SELF_TEST_LEVEL=0
+HAND_CMD_SET_MANUFACTURE_DATA = 0x65  # Set manufacture data
+HAND_CMD_SET_SPEED_CTRL_PARAMS = 0x66  # Set speed control parameters
+CMD_ERROR_MASK = 1 << 7  # bit mask for command error
+
+MAX_PROTOCOL_DATA_SIZE = 64
+CAN_FRAME_DATA_SIZE = 8  # Packets (7 bytes of framing + data) are split into CAN frames of up to 8 bytes
+
+# Data type
+UINT8_T = 0
+INT8_T = 1
+UINT16_T = 2
+INT16_T = 3
+
+
+def match_data_type(data, type):
+    if type == UINT8_T:
+        return 0x00 <= data <= 0xFF
+    elif type == INT8_T:
+        return -0x80 <= data <= 0x7F
+    elif type == UINT16_T:
+        return 0x0000 <= data <= 0xFFFF
+    elif type == INT16_T:
+        return -0x8000 <= data <= 0x7FFF
+    else:
+        # print("Unsupported data type: ", type)
+        return False
+
+
+def match_list_type(data, type):
+    if isinstance(data, list):
+        for item in data:
+            if not match_data_type(item, type):
+                return False
+        return True
+    else:
+        return False
+
+
+_STRUCT_CACHE = {}
+
+
+def _struct(fmt):
+    """Precompiled struct.Struct for layouts whose size depends on the content, cached by format"""
+    layout = _STRUCT_CACHE.get(fmt)
+    if layout is None:
+        layout = _STRUCT_CACHE[fmt] = struct.Struct(fmt)
+    return layout
+
+
+def _all_layout(motor_cnt, value_type):
+    """Interleaved [value, speed] records of the *_ALL set commands"""
+    return _struct("<" + (value_type + "B") * motor_cnt)
+
+
+# Command layouts: cmd -> (request, response) as precompiled struct.Struct, little endian.
+# None means no payload, or a payload whose size depends on its content (built with _struct()).
+HAND_CMD_LAYOUTS = {
+    HAND_CMD_GET_PROTOCOL_VERSION: (None, struct.Struct("<BB")),  # minor, major
+    HAND_CMD_GET_FW_VERSION: (None, struct.Struct("<HBB")),  # revision, minor, major
+    HAND_CMD_GET_HW_VERSION: (None, struct.Struct(">BBH")),  # hw_type, hw_ver, boot_version (big endian)
+    HAND_CMD_GET_CALI_DATA: (None, struct.Struct("<BB")),  # motor_cnt, thumb_root_pos_cnt, followed by positions
+    HAND_CMD_GET_FINGER_PID: (struct.Struct("<B"), struct.Struct("<B4f")),  # finger_id, p, i, d, g
+    HAND_CMD_GET_FINGER_CURRENT_LIMIT: (struct.Struct("<B"), struct.Struct("<BH")),
+    HAND_CMD_GET_FINGER_CURRENT: (struct.Struct("<B"), struct.Struct("<BH")),
+    HAND_CMD_GET_FINGER_FORCE_TARGET: (struct.Struct("<B"), struct.Struct("<BH")),
+    HAND_CMD_GET_FINGER_FORCE: (struct.Struct("<B"), struct.Struct("<BB")),  # finger_id, entry count, followed by entries
+    HAND_CMD_GET_FINGER_POS_LIMIT: (struct.Struct("<B"), struct.Struct("<BHH")),
+    HAND_CMD_GET_FINGER_POS_ABS: (struct.Struct("<B"), struct.Struct("<BHH")),  # finger_id, target, current
+    HAND_CMD_GET_FINGER_POS: (struct.Struct("<B"), struct.Struct("<BHH")),
+    HAND_CMD_GET_FINGER_ANGLE: (struct.Struct("<B"), struct.Struct("<Bhh")),
+    HAND_CMD_GET_THUMB_ROOT_POS: (None, struct.Struct("<HB")),  # raw_encoder, pos
+    HAND_CMD_GET_FINGER_POS_ABS_ALL: (None, struct.Struct(f"<{2 * MAX_MOTOR_CNT}H")),  # targets, currents
+    HAND_CMD_GET_FINGER_POS_ALL: (None, struct.Struct(f"<{2 * MAX_MOTOR_CNT}H")),
+    HAND_CMD_GET_FINGER_ANGLE_ALL: (None, struct.Struct(f"<{2 * MAX_MOTOR_CNT}h")),
+    HAND_CMD_GET_FINGER_STOP_PARAMS: (struct.Struct("<B"), struct.Struct("<B4H")),
+    HAND_CMD_GET_FINGER_FORCE_PID: (struct.Struct("<B"), struct.Struct("<B4f")),
+    HAND_CMD_GET_SELF_TEST_LEVEL: (None, struct.Struct("<B")),
+    HAND_CMD_GET_BEEP_SWITCH: (None, struct.Struct("<B")),
+    HAND_CMD_GET_BUTTON_PRESSED_CNT: (None, struct.Struct("<B")),
+    HAND_CMD_GET_UID: (None, struct.Struct("<3I")),
+    HAND_CMD_GET_BATTERY_VOLTAGE: (None, struct.Struct("<H")),
+    HAND_CMD_GET_USAGE_STAT: (struct.Struct("<B"), struct.Struct(f"<I{MAX_MOTOR_CNT}I")),  # total_use_time, open times
+    HAND_CMD_GET_SPEED_CTRL_PARAMS: (None, struct.Struct("<HHf")),
+    HAND_CMD_GET_MANUFACTURE_DATA: (None, struct.Struct("<BB16s8s")),
+    HAND_CMD_RESET: (struct.Struct("<B"), None),
+    HAND_CMD_POWER_OFF: (None, None),
+    HAND_CMD_SET_NODE_ID: (struct.Struct("<B"), None),
+    HAND_CMD_CALIBRATE: (struct.Struct("<H"), None),
+    HAND_CMD_SET_CALI_DATA: (None, None),  # motor_cnt, end_pos, start_pos, thumb_root_pos_cnt, thumb_root_pos
+    HAND_CMD_SET_FINGER_PID: (struct.Struct("<B4f"), None),
+    HAND_CMD_SET_FINGER_CURRENT_LIMIT: (struct.Struct("<BH"), None),
+    HAND_CMD_SET_FINGER_FORCE_TARGET: (struct.Struct("<BH"), None),
+    HAND_CMD_SET_FINGER_POS_LIMIT: (struct.Struct("<BHH"), None),
+    HAND_CMD_FINGER_START: (struct.Struct("<B"), None),
+    HAND_CMD_FINGER_STOP: (struct.Struct("<B"), None),
+    HAND_CMD_SET_FINGER_POS_ABS: (struct.Struct("<BHB"), None),  # finger_id, pos, speed
+    HAND_CMD_SET_FINGER_POS: (struct.Struct("<BHB"), None),
+    HAND_CMD_SET_FINGER_ANGLE: (struct.Struct("<BhB"), None),
+    HAND_CMD_SET_THUMB_ROOT_POS: (struct.Struct("<BB"), None),
+    HAND_CMD_SET_FINGER_POS_ABS_ALL: (_all_layout(MAX_MOTOR_CNT, "H"), None),
+    HAND_CMD_SET_FINGER_POS_ALL: (_all_layout(MAX_MOTOR_CNT, "H"), None),
+    HAND_CMD_SET_FINGER_ANGLE_ALL: (_all_layout(MAX_MOTOR_CNT, "h"), None),
+    HAND_CMD_SET_FINGER_STOP_PARAMS: (struct.Struct("<B4H"), None),
+    HAND_CMD_SET_FINGER_FORCE_PID: (struct.Struct("<B4f"), None),
+    HAND_CMD_RESET_FORCE: (None, None),
+    HAND_CMD_SET_CUSTOM: (None, None),
+    HAND_CMD_SET_SELF_TEST_LEVEL: (struct.Struct("<B"), None),
+    HAND_CMD_SET_BEEP_SWITCH: (struct.Struct("<B"), None),
+    HAND_CMD_BEEP: (struct.Struct("<H"), None),
+    HAND_CMD_SET_BUTTON_PRESSED_CNT: (struct.Struct("<B"), None),
+    HAND_CMD_START_INIT: (None, None),
+    HAND_CMD_SET_MANUFACTURE_DATA: (struct.Struct("<2sBB16s8s"), None),
+    HAND_CMD_SET_SPEED_CTRL_PARAMS: (struct.Struct("<HHf"), None),
+}
+
+# Commands whose response size depends on its content, their HAND_CMD_LAYOUTS response is only the header
+HAND_CMD_VARIABLE_RESPONSES = frozenset({HAND_CMD_GET_CALI_DATA, HAND_CMD_GET_FINGER_FORCE, HAND_CMD_SET_CUSTOM})
+
+
+def max_response_size(cmd):
+    """Largest response data size of cmd, MAX_PROTOCOL_DATA_SIZE when it depends on the content"""
+    response = HAND_CMD_LAYOUTS.get(cmd, (None, None))[1]
+    if cmd in HAND_CMD_VARIABLE_RESPONSES or (response is None and cmd < HAND_CMD_RESET):
+        return MAX_PROTOCOL_DATA_SIZE
+    return response.size if response is not None else 0
+
+
+def response_frames(cmd):
+    """CAN frames of the largest response of cmd, all hands answer on the master CAN ID"""
+    return -(-(7 + max_response_size(cmd)) // CAN_FRAME_DATA_SIZE)
+
+
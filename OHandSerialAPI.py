@@ -1,151 +1,257 @@
+import operator
+import random
 import struct
-import time
+import threading
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from functools import reduce
 from typing import Any
 
-MAX_MOTOR_CNT = 6
-MAX_THUMB_ROOT_POS = 3
-MAX_FORCE_ENTRIES = 5 * 12
-
-# Constants from the C header file
-HAND_PROTOCOL_UART = 0
-HAND_PROTOCOL_I2C = 1
-
-# Error codes
-ERR_PROTOCOL_WRONG_LRC = 0x01
-ERR_COMMAND_INVALID = 0x11
-ERR_COMMAND_INVALID_BYTE_COUNT = 0x12
-ERR_COMMAND_INVALID_DATA = 0x13
-ERR_STATUS_INIT = 0x21
-ERR_STATUS_CALI = 0x22
-ERR_STATUS_STUCK = 0x23
-ERR_OP_FAILED = 0x31
-ERR_SAVE_FAILED = 0x32
-
-
-# API return values
-HAND_RESP_HAND_ERROR = 0xFF  # device error, error call back will be called with OHand error codes listed above
-HAND_RESP_SUCCESS = 0x00
-HAND_RESP_TIMER_FUNC_NOT_SET = 0x01  # local error, timer function not set, call HAND_SetTimerFunction(...) first
-HAND_RESP_INVALID_CONTEXT = 0x02  # local error, invalid context, NULL or send data function not set
-HAND_RESP_TIMEOUT = 0x03  # local error, time out when waiting node response
-HAND_RESP_INVALID_OUT_BUFFER_SIZE = 0x04  # local error, out buffer size not matched to returned data
-HAND_RESP_UNMATCHED_ADDR = 0x05  # local error, unmatched node id between returned and waiting
-HAND_RESP_UNMATCHED_CMD = 0x06  # local error, unmatched command between returned and waiting
-HAND_RESP_DATA_SIZE_TOO_BIG = 0x07  # local error, size of data to send exceeds the buffer size
-HAND_RESP_DATA_INVALID = 0x08  # local error, data content invalid
-
-# Sub-commands for HAND_CMD_SET_CUSTOM
-SUB_CMD_SET_SPEED = 1 << 0
-SUB_CMD_SET_POS = 1 << 1
-SUB_CMD_SET_ANGLE = 1 << 2
-SUB_CMD_GET_POS = 1 << 3
-SUB_CMD_GET_ANGLE = 1 << 4
-SUB_CMD_GET_CURRENT = 1 << 5
-SUB_CMD_GET_FORCE = 1 << 6
-SUB_CMD_GET_STATUS = 1 << 7
-
-# Command definitions
-
-# Chief GET commands
-HAND_CMD_GET_PROTOCOL_VERSION = 0x00  # Get protocol version, Please don't modify!
-HAND_CMD_GET_FW_VERSION = 0x01  # Get firmware version
-HAND_CMD_GET_HW_VERSION = 0x02  # Get hardware version, [HW_TYPE, HW_VER, BOOT_VER_MAJOR, BOOT_VER_MINOR]
-HAND_CMD_GET_CALI_DATA = 0x03  # Get calibration data
-HAND_CMD_GET_FINGER_PID = 0x04  # Get PID of finger
-HAND_CMD_GET_FINGER_CURRENT_LIMIT = 0x05  # Get motor current limit of finger
-HAND_CMD_GET_FINGER_CURRENT = 0x06  # Get motor current of finger
-HAND_CMD_GET_FINGER_FORCE_TARGET = 0x07  # Get force limit of finger
-HAND_CMD_GET_FINGER_FORCE = 0x08  # Get force of finger
-HAND_CMD_GET_FINGER_POS_LIMIT = 0x09  # Get absolute position limit of finger
-HAND_CMD_GET_FINGER_POS_ABS = 0x0A  # Get current absolute position of finger
-HAND_CMD_GET_FINGER_POS = 0x0B  # Get current logical position of finger
-HAND_CMD_GET_FINGER_ANGLE = 0x0C  # Get first joint angle of finger
-HAND_CMD_GET_THUMB_ROOT_POS = 0x0D  # Get preset position of thumb root, [0, 1, 2, 255], 255 as invalid
-HAND_CMD_GET_FINGER_POS_ABS_ALL = 0x0E  # Get current absolute position of all fingers
-HAND_CMD_GET_FINGER_POS_ALL = 0x0F  # Get current logical position of all fingers
-HAND_CMD_GET_FINGER_ANGLE_ALL = 0x10  # Get first joint angle of all fingers
-HAND_CMD_GET_FINGER_STOP_PARAMS = 0x11  # Get finger finger stop parametres
-HAND_CMD_GET_FINGER_FORCE_PID = 0x12  # Get finger force PID
-
-# Auxiliary GET commands
-HAND_CMD_GET_SELF_TEST_LEVEL = 0x20  # Get self-test level state
-HAND_CMD_GET_BEEP_SWITCH = 0x21  # Get beep switch state
-HAND_CMD_GET_BUTTON_PRESSED_CNT = 0x22  # Get button press count
-HAND_CMD_GET_UID = 0x23  # Get 96 bits UID
-HAND_CMD_GET_BATTERY_VOLTAGE = 0x24  # Get battery voltage
-HAND_CMD_GET_USAGE_STAT = 0x25  # Get usage stat
-HAND_CMD_GET_SPEED_CTRL_PARAMS = 0x3D  # Get speed control parameters
-HAND_CMD_GET_MANUFACTURE_DATA = 0x3E  # Get manufacture data
-
-# Chief SET commands
-HAND_CMD_RESET = 0x40  # Please don't modify
-HAND_CMD_POWER_OFF = 0x41  # Power off
-HAND_CMD_SET_NODE_ID = 0x42  # Set node ID
-HAND_CMD_CALIBRATE = 0x43  # Recalibrate hand
-HAND_CMD_SET_CALI_DATA = 0x44  # Set finger pos range & thumb pos set
-HAND_CMD_SET_FINGER_PID = 0x45  # Set PID of finger
-HAND_CMD_SET_FINGER_CURRENT_LIMIT = 0x46  # Set motor current limit of finger
-HAND_CMD_SET_FINGER_FORCE_TARGET = 0x47  # Set force limit of finger
-HAND_CMD_SET_FINGER_POS_LIMIT = 0x48  # Get current absolute position of finger
-HAND_CMD_FINGER_START = 0x49  # Start motor
-HAND_CMD_FINGER_STOP = 0x4A  # Stop motor
-HAND_CMD_SET_FINGER_POS_ABS = 0x4B  # Move finger to physical position, [0, 65535]
-HAND_CMD_SET_FINGER_POS = 0x4C  # Move finger to logical position, [0, 65535]
-HAND_CMD_SET_FINGER_ANGLE = 0x4D  # Set first joint angle of finger
-HAND_CMD_SET_THUMB_ROOT_POS = 0x4E  # Move thumb root to preset position, {0, 1, 2}
-HAND_CMD_SET_FINGER_POS_ABS_ALL = 0x4F  # Set current absolute position of all fingers
-HAND_CMD_SET_FINGER_POS_ALL = 0x50  # Set current logical position of all fingers
-HAND_CMD_SET_FINGER_ANGLE_ALL = 0x51  # Set first joint angle of all fingers
-HAND_CMD_SET_FINGER_STOP_PARAMS = 0x52  # Set finger finger stop parametres
-HAND_CMD_SET_FINGER_FORCE_PID = 0x53  # Set finger force PID
-HAND_CMD_RESET_FORCE = 0x54  # Reset force
-
-HAND_CMD_SET_CUSTOM = 0x5F  # Custom set command
-
-# Auxiliary SET commands
-HAND_CMD_SET_SELF_TEST_LEVEL = 0x60  # Set self-test level, level, 0: wait command, 1: semi self-test, 2: full self-test
-HAND_CMD_SET_BEEP_SWITCH = 0x61  # Set beep ON/OFF
-HAND_CMD_BEEP = 0x62  # Beep for duration if beep switch is on
-HAND_CMD_SET_BUTTON_PRESSED_CNT = 0x63  # Set button press count, for ROH calibration only
-HAND_CMD_START_INIT = 0x64  # Start init in case of SELF_TEST_LEVEL=0
-HAND_CMD_SET_MANUFACTURE_DATA = 0x65  # Set manufacture data
-HAND_CMD_SET_SPEED_CTRL_PARAMS = 0x66  # Set speed control parameters
-CMD_ERROR_MASK = 1 << 7  # bit mask for command error
-
-MAX_PROTOCOL_DATA_SIZE = 64
-
-# Data type
-UINT8_T = 0
-INT8_T = 1
-UINT16_T = 2
-INT16_T = 3
-
-
-def match_data_type(data, type):
-    if type == UINT8_T:
-        return 0x00 <= data <= 0xFF
-    elif type == INT8_T:
-        return -0x80 <= data <= 0x7F
-    elif type == UINT16_T:
-        return 0x0000 <= data <= 0xFFFF
-    elif type == INT16_T:
-        return -0x8000 <= data <= 0x7FFF
-    else:
-        # print("Unsupported data type: ", type)
-        return False
-
-
-def match_list_type(data, type):
-    if isinstance(data, list):
-        for item in data:
-            if not match_data_type(item, type):
-                return False
-        return True
-    else:
-        return False
-
-
-class OHandSerialAPI:
+from HandCache import HandCache
+from HandMetrics import HandMetrics
+from HandProfile import HandProfile, Profile  # Profile is part of this module's API
+from HandSettle import HandSettle
+from OHandProtocol import *  # Commands, response codes and layouts, part of this module's API
+from OHandProtocol import _all_layout, _struct
+from SetpointCoalescer import HAND_COALESCED_CMDS, SetpointCoalescer
+
+try:
+    import numpy as np
+except ImportError:  # Optional, only the *AllArray methods need NumPy
+    np = None
+
+RX_QUEUE_SIZE = 16  # Max decoded packets kept waiting for HAND_GetResponse
+
+# Adaptive command timeouts, see HAND_EnableAdaptiveTimeout()
+ADAPTIVE_TIMEOUT_WINDOW = 64  # Latest latencies kept per (hand_id, cmd)
+ADAPTIVE_TIMEOUT_MIN_SAMPLES = 8  # Latencies needed before the timeout is derived from them
+ADAPTIVE_TIMEOUT_PERCENTILE = 99
+ADAPTIVE_TIMEOUT_MARGIN = 2  # ms added to the percentile
+ADAPTIVE_TIMEOUT_MIN = 2  # ms
+ADAPTIVE_TIMEOUT_MAX = 2000  # ms
+# Timeouts in ms used until enough latencies are known, for commands slower than HAND_SetCommandTimeOut()
+HAND_CMD_INITIAL_TIMEOUTS = {
+    HAND_CMD_CALIBRATE: 2000,
+    HAND_CMD_SET_CALI_DATA: 1000,
+    HAND_CMD_SET_MANUFACTURE_DATA: 1000,
+}
+
+# Retries, see HAND_SetRetryPolicy()
+HAND_CMD_READ_ONLY_MAX = HAND_CMD_GET_MANUFACTURE_DATA  # Commands up to this one only read, safe to repeat
+# Commands with an effect at each execution, never repeated automatically
+HAND_CMD_NON_IDEMPOTENT = frozenset(
+    {
+        HAND_CMD_RESET,
+        HAND_CMD_POWER_OFF,
+        HAND_CMD_SET_NODE_ID,
+        HAND_CMD_CALIBRATE,
+        HAND_CMD_FINGER_START,
+        HAND_CMD_FINGER_STOP,
+        HAND_CMD_RESET_FORCE,
+        HAND_CMD_BEEP,
+        HAND_CMD_START_INIT,
+    }
+)
+RETRY_MAX_RETRIES = 2  # Retries of a transaction
+RETRY_BACKOFF = 2  # ms before the first retry, doubled for each following one
+RETRY_JITTER = 0.5  # Backoff randomly extended by up to this share
+RETRY_BUDGET = 10  # Max retries in a row without successful transactions
+RETRY_BUDGET_RATIO = 0.1  # Retry budget earned by each successful transaction
+
+# Node discovery, see discover_nodes()
+DISCOVERY_HAND_IDS = range(0x02, 0xFF)  # All node ids but the master and broadcast addresses
+DISCOVERY_TIMEOUT = 50  # ms listen window for the replies to a burst of probes
+DISCOVERY_PROBE_CMD = HAND_CMD_GET_BEEP_SWITCH  # Its reply fits in one CAN frame, the replies of all hands can't interleave
+
+# Labels of the response errors counted by HAND_EnableMetrics()
+HAND_RESP_ERROR_NAMES = {
+    ERR_PROTOCOL_WRONG_LRC: "wrong_lrc",
+    HAND_RESP_TIMEOUT: "timeout",
+    HAND_RESP_INVALID_OUT_BUFFER_SIZE: "invalid_out_buffer_size",
+    HAND_RESP_UNMATCHED_CMD: "unmatched_cmd",
+    HAND_RESP_HAND_ERROR: "hand_error",
+}
+
+# Decoder states
+WAIT_ON_HEADER_0 = 0
+WAIT_ON_HEADER_1 = 1
+WAIT_ON_ADDRESSED_NODE_ID = 2
+WAIT_ON_OWN_NODE_ID = 3
+WAIT_ON_COMMAND_ID = 4
+WAIT_ON_BYTECOUNT = 5
+WAIT_ON_DATA = 6
+WAIT_ON_LRC = 7
+
+# Interleaved [value, speed] records of the *_ALL set commands, by value type, for the *AllArray setters
+ALL_RECORD_DTYPES = (
+    {
+        "H": np.dtype([("value", "<u2"), ("speed", "u1")]),
+        "h": np.dtype([("value", "<i2"), ("speed", "u1")]),
+    }
+    if np is not None
+    else {}
+)
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("NumPy is required by the *AllArray methods, pip install numpy")
+
+
+# HAND_CMD_SET_CUSTOM payloads: the sub command mask byte, then the setpoints of the SUB_CMD_SET_* bits,
+# the reply holds the fields of the SUB_CMD_GET_* bits. Both in bit order: (sub_cmd, HandState attribute, format)
+HAND_CUSTOM_FORCE_CNT = 5  # One force value per finger
+HAND_CUSTOM_SET_FIELDS = (
+    (SUB_CMD_SET_SPEED, "speed", f"{MAX_MOTOR_CNT}B"),
+    (SUB_CMD_SET_POS, "pos", f"{MAX_MOTOR_CNT}H"),
+    (SUB_CMD_SET_ANGLE, "angle", f"{MAX_MOTOR_CNT}h"),
+)
+HAND_CUSTOM_GET_FIELDS = (
+    (SUB_CMD_GET_POS, "pos", f"{MAX_MOTOR_CNT}H"),
+    (SUB_CMD_GET_ANGLE, "angle", f"{MAX_MOTOR_CNT}h"),
+    (SUB_CMD_GET_CURRENT, "current", f"{MAX_MOTOR_CNT}H"),
+    (SUB_CMD_GET_FORCE, "force", f"{HAND_CUSTOM_FORCE_CNT}H"),
+    (SUB_CMD_GET_STATUS, "status", f"{MAX_MOTOR_CNT}B"),
+)
+HAND_STATE_ALL = SUB_CMD_GET_POS | SUB_CMD_GET_ANGLE | SUB_CMD_GET_CURRENT | SUB_CMD_GET_FORCE | SUB_CMD_GET_STATUS
+HAND_STATE_FIELDS = {name: sub_cmd for sub_cmd, name, _ in HAND_CUSTOM_GET_FIELDS}
+
+_CUSTOM_LAYOUTS = {}
+
+
+def _custom_fields_layout(sub_cmd, fields, fmt, start):
+    slices = []
+    for bit, name, field_fmt in fields:
+        if sub_cmd & bit:
+            count = int(field_fmt[:-1])
+            slices.append((name, start, start + count))
+            start += count
+            fmt += field_fmt
+    return _struct(fmt), slices
+
+
+def _custom_layout(sub_cmd):
+    """((request, set slices), (response, get slices)) of a HAND_CMD_SET_CUSTOM sub command mask"""
+    layout = _CUSTOM_LAYOUTS.get(sub_cmd)
+    if layout is None:
+        layout = _CUSTOM_LAYOUTS[sub_cmd] = (
+            _custom_fields_layout(sub_cmd, HAND_CUSTOM_SET_FIELDS, "<B", 1),
+            _custom_fields_layout(sub_cmd, HAND_CUSTOM_GET_FIELDS, "<", 0),
+        )
+    return layout
+
+
+def _state_fields(fields):
+    """SUB_CMD_GET_* mask from a mask or from names of HAND_STATE_FIELDS"""
+    if isinstance(fields, int):
+        return fields & HAND_STATE_ALL
+    if isinstance(fields, str):
+        fields = (fields,)
+    mask = 0
+    for name in fields:
+        mask |= HAND_STATE_FIELDS[name]
+    return mask
+
+
+def _unpack_state(response, get_slices, out, state, sub_cmd):
+    values = response.unpack_from(out)
+    for name, start, end in get_slices:
+        getattr(state, name)[:] = values[start:end]
+    state.fields = sub_cmd & HAND_STATE_ALL
+
+
+class HandState:
+    """Hand state decoded by read_state(), only the fields in the fields mask are up to date"""
+
+    def __init__(self):
+        self.fields = 0  # SUB_CMD_GET_* mask of the fields read
+        self.pos = [0] * MAX_MOTOR_CNT
+        self.angle = [0] * MAX_MOTOR_CNT
+        self.current = [0] * MAX_MOTOR_CNT
+        self.force = [0] * HAND_CUSTOM_FORCE_CNT
+        self.status = [0] * MAX_MOTOR_CNT
+
+    def __repr__(self):
+        values = ", ".join(
+            f"{name}={getattr(self, name)}" for sub_cmd, name, _ in HAND_CUSTOM_GET_FIELDS if self.fields & sub_cmd
+        )
+        return f"HandState({values})"
+
+
+class _BusLock:
+    """Bus turns: shared for single frame responses, exclusive for multi-frame ones, reentrant when exclusive"""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._shared = 0
+        self._owner = None  # Thread holding the exclusive turn
+        self._depth = 0
+        self._waiting = 0  # Threads waiting for an exclusive turn
+
+    def acquire(self, exclusive):
+        me = threading.get_ident()
+        with self._cond:
+            if self._owner == me:
+                self._depth += 1
+            elif exclusive:
+                self._waiting += 1
+                while self._owner is not None or self._shared:
+                    self._cond.wait()
+                self._waiting -= 1
+                self._owner = me
+                self._depth = 1
+            else:
+                while self._owner is not None or self._waiting:
+                    self._cond.wait()
+                self._shared += 1
+
+    def release(self):
+        with self._cond:
+            if self._owner == threading.get_ident():
+                self._depth -= 1
+                if self._depth == 0:
+                    self._owner = None
+                    self._cond.notify_all()
+            else:
+                self._shared -= 1
+                if self._shared == 0:
+                    self._cond.notify_all()
+
+
+# OHandSerialAPI methods that don't talk to a hand, they have no hand_id argument
+LOCAL_METHODS = frozenset(
+    {
+        "HAND_ProtocolLRC",
+        "HAND_SendCmd",
+        "HAND_GetResponse",
+        "HAND_SubmitCmd",
+        "HAND_WaitCmds",
+        "HAND_CancelCmd",
+        "HAND_SetTimerFunction",
+        "HAND_GetTick",
+        "HAND_GetTickUs",
+        "HAND_SetCommandTimeOut",
+        "HAND_EnableAdaptiveTimeout",
+        "HAND_GetCommandTimeOut",
+        "HAND_SetRetryPolicy",
+        "HAND_EnableResponseCache",
+        "HAND_ClearResponseCache",
+        "HAND_EnableParamShadow",
+        "HAND_EnableMetrics",
+        "HAND_ClearParamShadow",
+        "HAND_SetCoalesceWindow",
+        "HAND_OnData",
+        "HAND_OnDataBytes",
+    }
+)
+
+
+# High level methods talking to a hand, hand_id first like the HAND_* commands
+COMMAND_METHODS = ("read_state", "control_step", "wait_until_settled")
+
+
+class OHandSerialAPI(HandCache, SetpointCoalescer, HandProfile, HandSettle):
     def __init__(self, private_data, protocol, address_master, send_data_impl, recv_data_impl=None):
         self.private_data = private_data
         self.protocol = protocol
@@ -154,26 +260,73 @@ class OHandSerialAPI:
         self.recv_data_impl = recv_data_impl
         self.timeout = 255  # Default timeout in ms
         self._get_milli_seconds_impl = None
+        self._get_micro_seconds_impl = None  # Deadlines and latencies are kept in us
         self._delay_milli_seconds_impl = None
-        self.packet_data = bytearray(MAX_PROTOCOL_DATA_SIZE + 5)
-        self.is_whole_packet = False
+        self.packet_data = bytearray(MAX_PROTOCOL_DATA_SIZE + 5)  # Decoder work buffer
         self.decode_state = self._initial_state()
         self.byte_count = 0
+        self.rx_queue = deque()  # Decoded packets: [dst, src, cmd, byte_count, data..., lrc]
+        self.rx_queue_size = RX_QUEUE_SIZE
+        self.rx_overflow_cnt = 0  # Packets dropped because rx_queue was full
+        self.rx_unmatched_cnt = 0  # Late or unmatched packets discarded
+        self._rx_cond = threading.Condition()  # Guards rx_queue, notified whenever a packet is decoded
+        self._receiving = False  # True while a thread feeds the decoder through recv_data_impl, guarded by _rx_cond
+        self._pending = {}  # Pipelined requests, (addr, cmd) -> (future, wait_timeout in us, submit time in us)
+        self._tx_lock = threading.Lock()  # Guards the tx frame buffers
+        self._hand_locks = {}  # hand_id -> RLock held by the transactions and pipelined polls of the hand
+        self._bus_lock = _BusLock()  # Taken by every transaction, exclusively when the response takes several frames
+        self._tx_frames = {}  # addr -> (frame buffer, {nb_data: (frame, data, lrc bytes) views})
+        self._response_cache = None  # (hand_id, cmd, request data) -> response data, None when disabled
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._shadow = None  # (hand_id, set command, key) -> last confirmed set request data, None when disabled
+        self.shadow_skips = 0  # Writes skipped because the hand already had the values
+        self.timeout_overrides = {}  # cmd or (hand_id, cmd) -> timeout in ms, used instead of any other timeout
+        self._adaptive_timeout = None  # (percentile, margin, min, max) when enabled
+        self._latencies = {}  # (hand_id, cmd) -> deque of the latest latencies in us
+        self._learned_timeouts = {}  # (hand_id, cmd) -> timeout in ms derived from _latencies
+        self._retry_policy = None  # (max_retries, backoff, jitter, retry_writes) when enabled
+        self._retry_budget = RETRY_BUDGET
+        self._retry_lock = threading.Lock()  # Guards _retry_budget and the retry counters
+        self.retry_cnt = 0  # Retries done
+        self.retry_denied_cnt = 0  # Retries refused because the retry budget was exhausted
+        self._control_buffers = {}  # (hand_id, sub_cmd) -> (request buffer view, response buffer, HandState)
+        self._batches = {}  # hand_id -> _Batch of the per-finger setpoints being coalesced
+        self._batch_lock = threading.RLock()  # Guards _batches and _flush_errors, never held while sending
+        self._coalesce_window = 0  # ms, 0 when only batch() blocks coalesce
+        self._flush_errors = {}  # hand_id -> (err, remote_err) of a failed flush at the window close, not reported yet
+        self._targets = None  # (hand_id, *_ALL set command) -> [(value, speed) or None per finger], None until used
+        self.metrics = None  # HandMetrics, None when disabled
 
     def _initial_state(self):
         if self.protocol == HAND_PROTOCOL_UART:
-            return "WAIT_ON_HEADER_0"
+            return WAIT_ON_HEADER_0
         elif self.protocol == HAND_PROTOCOL_I2C:
-            return "WAIT_ON_ADDRESSED_NODE_ID"
+            return WAIT_ON_ADDRESSED_NODE_ID
 
     def get_private_data(self):
         return self.private_data
 
     def HAND_ProtocolLRC(self, lrcBytes):
-        lrc = 0
-        for byte in lrcBytes:
-            lrc ^= byte
-        return lrc
+        return reduce(operator.xor, lrcBytes, 0)
+
+    def _tx_frame(self, addr, nb_data):
+        """Preallocated frame buffer of addr and its (frame, data, lrc) views for nb_data, caller holds _tx_lock"""
+        frame = self._tx_frames.get(addr)
+        if frame is None:
+            send_buf = bytearray(7 + MAX_PROTOCOL_DATA_SIZE)
+            send_buf[0] = 0x55
+            send_buf[1] = 0xAA
+            send_buf[2] = addr
+            frame = self._tx_frames[addr] = (send_buf, {})
+
+        send_buf, views = frame
+        send_buf[3] = self.address_master
+        view = views.get(nb_data)
+        if view is None:
+            buf_view = memoryview(send_buf)
+            view = views[nb_data] = (buf_view[: 7 + nb_data], buf_view[6 : 6 + nb_data], buf_view[2 : 6 + nb_data])
+        return send_buf, view
 
     def HAND_SendCmd(self, addr, cmd, data, nb_data):
         if not self.send_data_impl:
@@ -185,79 +338,279 @@ class OHandSerialAPI:
         if nb_data >= MAX_PROTOCOL_DATA_SIZE:
             return HAND_RESP_DATA_SIZE_TOO_BIG
 
-        send_buf = bytearray(7 + nb_data)
-        send_buf[0] = 0x55
-        send_buf[1] = 0xAA
-        send_buf[2] = addr
-        send_buf[3] = self.address_master
-        send_buf[4] = cmd
-        send_buf[5] = nb_data
-
-        # 处理data为None或空的情况
-        if data is not None:
-            send_buf[6 : 6 + nb_data] = data  # 确保data是可迭代的字节数据
-
-        # 计算LRC校验（从addr开始到data结束）
-        lrc = 0
-        for i in range(2, 6 + nb_data):
-            lrc ^= send_buf[i]
-        send_buf[6 + nb_data] = lrc
-
-        # 发送数据并返回结果（假设send_data_impl返回0表示成功）
-        if self.send_data_impl(addr, send_buf, len(send_buf), self.private_data) != 0:
-            return HAND_RESP_HAND_ERROR
+        # 丢弃该节点上一次事务遗留的应答
+        self._flush_packets(addr)
+
+        # Frames built in place in the per-hand buffer, acquire/release avoids the allocation of "with"
+        self._tx_lock.acquire()
+        try:
+            send_buf, (frame, data_view, lrc_bytes) = self._tx_frame(addr, nb_data)
+            send_buf[4] = cmd
+            send_buf[5] = nb_data
+
+            # 处理data为None或空的情况
+            if data is not None and nb_data > 0:
+                if not isinstance(data, (bytes, bytearray, memoryview)):
+                    data = bytes(data)  # 确保data是可迭代的字节数据
+                if len(data) < nb_data:
+                    return HAND_RESP_DATA_INVALID
+                if len(data) > nb_data:
+                    data = data[:nb_data]
+                data_view[:] = data  # Unlike bytearray slice assignment, copies without a temporary
+
+            # 计算LRC校验（从addr开始到data结束）
+            send_buf[6 + nb_data] = reduce(operator.xor, lrc_bytes, 0)
+
+            # 发送数据并返回结果（假设send_data_impl返回0表示成功）
+            # frame is only valid during the call, send_data_impl must copy what it keeps
+            metrics = self.metrics
+            if metrics is None:
+                if self.send_data_impl(addr, frame, 7 + nb_data, self.private_data) != 0:
+                    return HAND_RESP_HAND_ERROR
+            else:
+                start = self._get_micro_seconds_impl()
+                failed = self.send_data_impl(addr, frame, 7 + nb_data, self.private_data) != 0
+                metrics.record_send(addr, cmd, 7 + nb_data, self._get_micro_seconds_impl() - start, failed)
+                if failed:
+                    return HAND_RESP_HAND_ERROR
+        finally:
+            self._tx_lock.release()
 
         return HAND_RESP_SUCCESS
 
     def HAND_GetResponse(self, addr, cmd, time_out, resp_bytes, remote_err):
-        wait_start = self._get_milli_seconds_impl()
-        wait_timeout = wait_start + time_out
+        wait_start = self._get_micro_seconds_impl()
+        wait_timeout = wait_start + int(time_out * 1000)
 
-        while not self.is_whole_packet:
-            time.sleep(0.001)  # Delay 1ms
-
-            if self.recv_data_impl:
-                self.recv_data_impl(self.private_data, self)
+        packet, unmatched = self._wait_packet(addr, cmd, wait_timeout)
+        if packet is None:
+            # Only packets from addr this waiter discarded make it an unmatched response
+            err = HAND_RESP_UNMATCHED_CMD if unmatched else HAND_RESP_TIMEOUT
+        else:
+            err = self._check_packet(packet, resp_bytes, remote_err)
 
-            if self._get_milli_seconds_impl() > wait_timeout:
-                self.decode_state = self._initial_state()
-                return HAND_RESP_TIMEOUT
+        if self.metrics is not None:
+            self.metrics.record_response(addr, cmd, self._get_micro_seconds_impl() - wait_start, err, packet is not None)
+        return err
 
+    def _check_packet(self, packet, resp_bytes, remote_err):
         # Validate LRC
-        lrc = self.HAND_ProtocolLRC(self.packet_data[: self.packet_data[3] + 4])
-        if lrc != self.packet_data[self.packet_data[3] + 4]:
-            self.is_whole_packet = False
+        packet_byte_count = packet[3]
+        lrc = self.HAND_ProtocolLRC(packet[: packet_byte_count + 4])
+        if lrc != packet[packet_byte_count + 4]:
             return ERR_PROTOCOL_WRONG_LRC
 
         # Check if response is error
-        if (self.packet_data[2] & CMD_ERROR_MASK) != 0:
-            self.is_whole_packet = False
+        if (packet[2] & CMD_ERROR_MASK) != 0:
             if remote_err is not None:
-                remote_err.append(self.packet_data[4])
+                remote_err.append(packet[4])
             return HAND_RESP_HAND_ERROR
 
-        if self.packet_data[1] != addr and addr != 0xFF:
-            self.is_whole_packet = False
-            return HAND_RESP_UNMATCHED_ADDR
-
-        if self.packet_data[2] != cmd:
-            self.is_whole_packet = False
-            return HAND_RESP_UNMATCHED_CMD
-
         # Copy response data
         if resp_bytes:
-            packet_byte_count = self.packet_data[3]
             if packet_byte_count > len(resp_bytes):
                 return HAND_RESP_INVALID_OUT_BUFFER_SIZE
             else:
-                resp_bytes[:] = self.packet_data[4 : 4 + packet_byte_count]
+                resp_bytes[:] = packet[4 : 4 + packet_byte_count]
 
-        self.is_whole_packet = False
         return HAND_RESP_SUCCESS
 
-    def HAND_SetTimerFunction(self, get_milli_seconds_impl, delay_milli_seconds_impl):
+    def _wait_packet(self, addr, cmd, wait_timeout):
+        """(packet answering cmd from addr or None at wait_timeout us, True if late packets were dropped)"""
+        unmatched = False
+        while True:
+            with self._rx_cond:
+                packet, discarded = self._take_packet(addr, cmd)
+                unmatched = unmatched or discarded
+                if packet is not None:
+                    return packet, unmatched
+
+                remaining = wait_timeout - self._get_micro_seconds_impl()
+                if remaining < 0:
+                    return None, unmatched
+
+                if not self._claim_receive(remaining / 1000000.0):
+                    continue
+
+            # recv_data_impl blocks on the bus until a frame arrives, no extra sleep needed
+            self._receive()
+
+    def _claim_receive(self, timeout):
+        """Caller holds _rx_cond, True when the caller is to feed the decoder, else waits up to timeout s"""
+        if not self.recv_data_impl or self._receiving:
+            self._rx_cond.wait(timeout)
+            return False
+        self._receiving = True
+        return True
+
+    def _receive(self):
+        """Call recv_data_impl once after _claim_receive(), then let the next waiter receive"""
+        recv_data_impl = self.recv_data_impl  # None once a background receiver took over
+        try:
+            if recv_data_impl:
+                recv_data_impl(self.private_data, self)
+        finally:
+            with self._rx_cond:
+                self._receiving = False
+                self._rx_cond.notify_all()
+
+    def HAND_SubmitCmd(self, addr, cmd, data, nb_data, time_out=None):
+        """Send a command without waiting, returns a Future of (err, resp_bytes)"""
+        future = Future()
+        key = (addr, cmd)
+        with self._rx_cond:
+            previous = self._pending.get(key)
+            if previous is not None and previous[0].done():
+                del self._pending[key]  # Cancelled by the caller
+                previous = None
+        if previous is not None:
+            self.HAND_WaitCmds([previous[0]])
+
+        if not self._get_micro_seconds_impl:
+            future.set_result((HAND_RESP_TIMER_FUNC_NOT_SET, b""))
+            return future
+
+        if time_out is None:
+            time_out = self._command_timeout(addr, cmd)
+        now = self._get_micro_seconds_impl()
+        wait_timeout = now + int(time_out * 1000)
+        with self._rx_cond:
+            self._pending[key] = (future, wait_timeout, now)
+
+        err = self.HAND_SendCmd(addr, cmd, data, nb_data)
+        if err != HAND_RESP_SUCCESS:
+            with self._rx_cond:
+                self._pending.pop(key, None)
+            future.set_result((err, b""))
+        return future
+
+    def HAND_WaitCmds(self, futures, time_out=None):
+        """Results of the futures of HAND_SubmitCmd, None for the ones unresolved after time_out ms"""
+        deadline = self._get_micro_seconds_impl() + int(time_out * 1000) if time_out is not None else None
+        while True:
+            with self._rx_cond:
+                now = self._get_micro_seconds_impl()
+                next_timeout = None
+                for key, (future, wait_timeout, submitted) in list(self._pending.items()):
+                    if now > wait_timeout:
+                        del self._pending[key]
+                        if not future.done():
+                            future.set_result((HAND_RESP_TIMEOUT, b""))
+                            if self.metrics is not None:
+                                self.metrics.record_response(key[0], key[1], now - submitted, HAND_RESP_TIMEOUT, False)
+                    elif future in futures and (next_timeout is None or wait_timeout < next_timeout):
+                        next_timeout = wait_timeout
+
+                if next_timeout is None:
+                    return [future.result() for future in futures]
+                if deadline is not None:
+                    if now >= deadline:
+                        return [future.result() if future.done() else None for future in futures]
+                    next_timeout = min(next_timeout, deadline)
+
+                if not self._claim_receive((next_timeout - now + 1) / 1000000.0):
+                    continue
+
+            self._receive()
+
+    def HAND_CancelCmd(self, future):
+        """Stop waiting for the response of a HAND_SubmitCmd request, resolves it to HAND_RESP_TIMEOUT"""
+        with self._rx_cond:
+            for key, (pending, _, submitted) in self._pending.items():
+                if pending is future:
+                    del self._pending[key]
+                    if self.metrics is not None:
+                        latency = self._get_micro_seconds_impl() - submitted
+                        self.metrics.record_response(key[0], key[1], latency, HAND_RESP_TIMEOUT, False)
+                    break
+            if not future.done():
+                future.set_result((HAND_RESP_TIMEOUT, b""))
+
+    def _hand_lock(self, hand_id):
+        lock = self._hand_locks.get(hand_id)
+        if lock is None:
+            lock = self._hand_locks.setdefault(hand_id, threading.RLock())
+        return lock
+
+    @contextmanager
+    def lock_hands(self, hand_ids, cmds):
+        """Hold hand_ids and the bus turn of cmds around pipelined HAND_SubmitCmd/HAND_WaitCmds requests"""
+        locks = [self._hand_lock(hand_id) for hand_id in sorted(set(hand_ids))]
+        for lock in locks:
+            lock.acquire()
+        try:
+            self._bus_lock.acquire(any(response_frames(cmd) > 1 for cmd in cmds))
+            try:
+                yield
+            finally:
+                self._bus_lock.release()
+        finally:
+            for lock in locks:
+                lock.release()
+
+    def _resolve_pending(self, packet):
+        """Complete the pipelined request answered by packet, caller must hold _rx_cond"""
+        entry = self._pending.pop((packet[1], packet[2] & ~CMD_ERROR_MASK), None)
+        if entry is None:
+            return False
+
+        if entry[0].done():
+            return True  # Cancelled by the caller
+
+        resp_bytes = bytearray(MAX_PROTOCOL_DATA_SIZE)
+        remote_err = []
+        err = self._check_packet(packet, resp_bytes, remote_err)
+        if self.metrics is not None:
+            latency = self._get_micro_seconds_impl() - entry[2]
+            self.metrics.record_response(packet[1], packet[2] & ~CMD_ERROR_MASK, latency, err, True)
+        entry[0].set_result((err, bytes(remote_err) if err == HAND_RESP_HAND_ERROR else bytes(resp_bytes)))
+        return True
+
+    def _push_packet(self, packet):
+        if self.metrics is not None:
+            self.metrics.record_rx_packet()
+        with self._rx_cond:
+            if self._pending and self._resolve_pending(packet):
+                self._rx_cond.notify_all()
+                return
+
+            if len(self.rx_queue) >= self.rx_queue_size:
+                self.rx_queue.popleft()
+                self.rx_overflow_cnt += 1
+            self.rx_queue.append(packet)
+            self._rx_cond.notify_all()
+
+    def _take_packet(self, addr, cmd):
+        """(first packet answering cmd from addr or None, True if late packets were dropped), holds _rx_cond"""
+        discarded = False
+        for packet in list(self.rx_queue):
+            if packet[1] != addr and addr != 0xFF:
+                continue
+            self.rx_queue.remove(packet)
+            if (packet[2] & ~CMD_ERROR_MASK) == cmd:
+                return packet, discarded
+            self.rx_unmatched_cnt += 1
+            discarded = True
+        return None, discarded
+
+    def _flush_packets(self, addr):
+        """Discard queued packets from addr (0xFF for all nodes), they belong to earlier transactions"""
+        if not self.rx_queue:
+            return  # Nothing queued, skip taking the lock on the send path
+
+        with self._rx_cond:
+            for packet in list(self.rx_queue):
+                if packet[1] == addr or addr == 0xFF:
+                    self.rx_queue.remove(packet)
+                    self.rx_unmatched_cnt += 1
+
+    def HAND_SetTimerFunction(self, get_milli_seconds_impl, delay_milli_seconds_impl, get_micro_seconds_impl=None):
+        """get_micro_seconds_impl gives sub-millisecond timeouts, else derived from get_milli_seconds_impl"""
         self._get_milli_seconds_impl = get_milli_seconds_impl
         self._delay_milli_seconds_impl = delay_milli_seconds_impl
+        if get_micro_seconds_impl is None and get_milli_seconds_impl is not None:
+            get_micro_seconds_impl = lambda: get_milli_seconds_impl() * 1000
+        self._get_micro_seconds_impl = get_micro_seconds_impl
 
     def HAND_GetTick(self):
         if self._get_milli_seconds_impl:
@@ -265,117 +618,324 @@ class OHandSerialAPI:
         else:
             return 0
 
+    def HAND_GetTickUs(self):
+        if self._get_micro_seconds_impl:
+            return self._get_micro_seconds_impl()
+        else:
+            return 0
+
     def HAND_SetCommandTimeOut(self, timeout):
         self.timeout = timeout
 
-    def HAND_OnData(self, data):
-        if self.is_whole_packet:
-            return  # Old packet is not processed, ignore
+    def HAND_EnableAdaptiveTimeout(
+        self,
+        enable=True,
+        percentile=ADAPTIVE_TIMEOUT_PERCENTILE,
+        margin=ADAPTIVE_TIMEOUT_MARGIN,
+        min_timeout=ADAPTIVE_TIMEOUT_MIN,
+        max_timeout=ADAPTIVE_TIMEOUT_MAX,
+    ):
+        """Derive the timeout of each (hand_id, cmd) from a percentile of its latest latencies"""
+        if enable:
+            self._adaptive_timeout = (percentile, margin, min_timeout, max_timeout)
+        else:
+            self._adaptive_timeout = None
+            self._latencies.clear()
+            self._learned_timeouts.clear()
+
+    def HAND_GetCommandTimeOut(self, hand_id, cmd):
+        """Timeout in ms the next cmd to hand_id waits for its response"""
+        return self._command_timeout(hand_id, cmd)
+
+    def _command_timeout(self, hand_id, cmd):
+        overrides = self.timeout_overrides
+        if overrides:
+            time_out = overrides.get((hand_id, cmd), overrides.get(cmd))
+            if time_out is not None:
+                return time_out
+        if self._adaptive_timeout is None:
+            return self.timeout
+        time_out = self._learned_timeouts.get((hand_id, cmd))
+        if time_out is not None:
+            return time_out
+        return max(self.timeout, HAND_CMD_INITIAL_TIMEOUTS.get(cmd, 0))
+
+    def _record_latency(self, hand_id, cmd, latency):
+        """Add the latency in us of a successful transaction and update the learned timeout"""
+        if self._adaptive_timeout is None:
+            return
+        key = (hand_id, cmd)
+        samples = self._latencies.get(key)
+        if samples is None:
+            samples = self._latencies[key] = deque(maxlen=ADAPTIVE_TIMEOUT_WINDOW)
+        samples.append(latency)
+        if len(samples) >= ADAPTIVE_TIMEOUT_MIN_SAMPLES:
+            percentile, margin, min_timeout, max_timeout = self._adaptive_timeout
+            ordered = sorted(samples)
+            latency = ordered[min(len(ordered) - 1, len(ordered) * percentile // 100)]
+            self._learned_timeouts[key] = min(max(latency / 1000.0 + margin, min_timeout), max_timeout)
+
+    def HAND_SetRetryPolicy(
+        self, max_retries=RETRY_MAX_RETRIES, backoff=RETRY_BACKOFF, jitter=RETRY_JITTER, retry_writes=False
+    ):
+        """Retry transactions failing with a timeout or a wrong LRC, max_retries=0 to disable"""
+        if max_retries > 0:
+            self._retry_policy = (max_retries, backoff, jitter, retry_writes)
+        else:
+            self._retry_policy = None
+
+    def _allow_retry(self, cmd, err, attempt):
+        policy = self._retry_policy
+        if policy is None or err not in (HAND_RESP_TIMEOUT, ERR_PROTOCOL_WRONG_LRC):
+            return False
+        max_retries, _, _, retry_writes = policy
+        if attempt >= max_retries:
+            return False
+        if cmd > HAND_CMD_READ_ONLY_MAX and (not retry_writes or cmd in HAND_CMD_NON_IDEMPOTENT):
+            return False
+        with self._retry_lock:
+            if self._retry_budget < 1:
+                self.retry_denied_cnt += 1
+                return False
+            self._retry_budget -= 1
+            self.retry_cnt += 1
+        return True
 
-        if self.decode_state == "WAIT_ON_HEADER_0":
+    def _backoff_delay(self, attempt):
+        """ms to wait before retry attempt"""
+        _, backoff, jitter, _ = self._retry_policy
+        return int(backoff * (1 << (attempt - 1)) * (1 + jitter * random.random()) + 0.5)
+
+    def HAND_EnableMetrics(self, enable=True):
+        """Record latency histograms and counters into metrics, a HandMetrics"""
+        if not enable:
+            self.metrics = None
+        elif self.metrics is None:
+            self.metrics = HandMetrics(HAND_RESP_ERROR_NAMES, self._metric_counters)
+
+    def _metric_counters(self):
+        return {
+            "rx_overflow": self.rx_overflow_cnt,
+            "rx_unmatched": self.rx_unmatched_cnt,
+            "retries": self.retry_cnt,
+            "retries_denied": self.retry_denied_cnt,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "shadow_skips": self.shadow_skips,
+        }
+
+    def HAND_OnData(self, data):
+        """Feed one received byte to the decoder, not counted in metrics, see HAND_OnDataBytes()"""
+        state = self.decode_state
+        if state == WAIT_ON_DATA:
+            index = 4 + self.packet_data[3] - self.byte_count
+            self.packet_data[index] = data
+            self.byte_count -= 1
+            if self.byte_count == 0:
+                self.decode_state = WAIT_ON_LRC
+        elif state == WAIT_ON_HEADER_0:
             if data == 0x55:
-                self.decode_state = "WAIT_ON_HEADER_1"
-        elif self.decode_state == "WAIT_ON_HEADER_1":
+                self.decode_state = WAIT_ON_HEADER_1
+        elif state == WAIT_ON_HEADER_1:
             if data == 0xAA:
-                self.decode_state = "WAIT_ON_ADDRESSED_NODE_ID"
+                self.decode_state = WAIT_ON_ADDRESSED_NODE_ID
             else:
-                self.decode_state = "WAIT_ON_HEADER_0"
-        elif self.decode_state == "WAIT_ON_ADDRESSED_NODE_ID":
-            self.packet_data[0] = data
-            self.decode_state = "WAIT_ON_OWN_NODE_ID"
-        elif self.decode_state == "WAIT_ON_OWN_NODE_ID":
-            self.packet_data[1] = data
-            self.decode_state = "WAIT_ON_COMMAND_ID"
-        elif self.decode_state == "WAIT_ON_COMMAND_ID":
-            self.packet_data[2] = data
-            self.decode_state = "WAIT_ON_BYTECOUNT"
-        elif self.decode_state == "WAIT_ON_BYTECOUNT":
+                self.decode_state = WAIT_ON_HEADER_0
+        elif state == WAIT_ON_LRC:
+            self.packet_data[4 + self.packet_data[3]] = data
+            if self.packet_data[0] == self.address_master:
+                self._push_packet(bytes(self.packet_data[: 5 + self.packet_data[3]]))
+            self.decode_state = self._initial_state()
+        elif state == WAIT_ON_BYTECOUNT:
             self.packet_data[3] = data
             self.byte_count = data
-            if self.byte_count > MAX_PROTOCOL_DATA_SIZE:
+            if data > MAX_PROTOCOL_DATA_SIZE:
                 self.decode_state = self._initial_state()
-            elif self.byte_count > 0:
-                self.decode_state = "WAIT_ON_DATA"
+            elif data > 0:
+                self.decode_state = WAIT_ON_DATA
             else:
-                self.decode_state = "WAIT_ON_LRC"
-        elif self.decode_state == "WAIT_ON_DATA":
-            index = 4 + self.packet_data[3] - self.byte_count
-            self.packet_data[index] = data
-            self.byte_count -= 1
-            if self.byte_count == 0:
-                self.decode_state = "WAIT_ON_LRC"
-        elif self.decode_state == "WAIT_ON_LRC":
-            index = 4 + self.packet_data[3]
-            self.packet_data[index] = data
-            if self.packet_data[0] == self.address_master:
-                self.is_whole_packet = True
-            self.decode_state = self._initial_state()
+                self.decode_state = WAIT_ON_LRC
+        else:
+            # WAIT_ON_ADDRESSED_NODE_ID, WAIT_ON_OWN_NODE_ID, WAIT_ON_COMMAND_ID
+            self.packet_data[state - WAIT_ON_ADDRESSED_NODE_ID] = data
+            self.decode_state = state + 1
+
+    def HAND_OnDataBytes(self, buf):
+        """Feed a chunk of received bytes to the decoder"""
+        packet_data = self.packet_data
+        state = self.decode_state
+        byte_count = self.byte_count
+        size = len(buf)
+        i = 0
+        if self.metrics is not None:
+            self.metrics.record_rx(size)
+
+        while i < size:
+            if state == WAIT_ON_DATA:
+                n = byte_count if byte_count < size - i else size - i
+                index = 4 + packet_data[3] - byte_count
+                packet_data[index : index + n] = buf[i : i + n]
+                i += n
+                byte_count -= n
+                if byte_count == 0:
+                    state = WAIT_ON_LRC
+                continue
+
+            data = buf[i]
+            i += 1
+            if state == WAIT_ON_HEADER_0:
+                if data == 0x55:
+                    state = WAIT_ON_HEADER_1
+            elif state == WAIT_ON_HEADER_1:
+                state = WAIT_ON_ADDRESSED_NODE_ID if data == 0xAA else WAIT_ON_HEADER_0
+            elif state == WAIT_ON_LRC:
+                packet_data[4 + packet_data[3]] = data
+                state = self._initial_state()
+                if packet_data[0] == self.address_master:
+                    self._push_packet(bytes(packet_data[: 5 + packet_data[3]]))
+            elif state == WAIT_ON_BYTECOUNT:
+                packet_data[3] = data
+                byte_count = data
+                if data > MAX_PROTOCOL_DATA_SIZE:
+                    state = self._initial_state()
+                elif data > 0:
+                    state = WAIT_ON_DATA
+                else:
+                    state = WAIT_ON_LRC
+            else:
+                # WAIT_ON_ADDRESSED_NODE_ID, WAIT_ON_OWN_NODE_ID, WAIT_ON_COMMAND_ID
+                packet_data[state - WAIT_ON_ADDRESSED_NODE_ID] = data
+                state += 1
+
+        self.decode_state = state
+        self.byte_count = byte_count
+
+    def _transact(self, hand_id, cmd, data, out, remote_err, force=False):
+        """Send cmd and wait for its response, response data is copied into out"""
+        steps = self.transaction(hand_id, cmd, data, out, remote_err, force)
+        try:
+            delay, time_out = next(steps)
+        except StopIteration as done:
+            return done.value  # Answered locally
+
+        nb_data = len(data) if data is not None else 0
+        exclusive = response_frames(cmd) > 1
+        hand_lock = self._hand_lock(hand_id)
+        bus_lock = self._bus_lock
+        hand_lock.acquire()
+        try:
+            while True:
+                if delay > 0 and self._delay_milli_seconds_impl:
+                    self._delay_milli_seconds_impl(delay)
+                timed = self._adaptive_timeout is not None and self._get_micro_seconds_impl is not None
+                bus_lock.acquire(exclusive)
+                try:
+                    start = self._get_micro_seconds_impl() if timed else 0
+                    err = self.HAND_SendCmd(hand_id, cmd, data, nb_data)
+                    if err == HAND_RESP_SUCCESS:
+                        err = self.HAND_GetResponse(hand_id, cmd, time_out, out, remote_err)
+                    latency = self._get_micro_seconds_impl() - start if timed else None
+                finally:
+                    bus_lock.release()
+                delay, time_out = steps.send((err, latency))
+        except StopIteration as done:
+            return done.value
+        finally:
+            hand_lock.release()
+
+    def transaction(self, hand_id, cmd, data, out, remote_err, force=False):
+        """Transaction policies as a generator: yields (delay, time_out) in ms, receives (err, latency us)"""
+        if self._batches and hand_id in self._batches:
+            self._flush_before(hand_id)
+
+        key = None
+        if self._shadow is not None or self._response_cache is not None:
+            err, key = self._answer_locally(hand_id, cmd, data, out, force)
+            if err is not None:
+                return err
+
+        time_out = self._command_timeout(hand_id, cmd)
+        delay = 0
+        attempt = 0
+        while True:
+            err, latency = yield delay, time_out
+            if err == HAND_RESP_SUCCESS:
+                if latency is not None:
+                    self._record_latency(hand_id, cmd, latency)
+                if self._retry_policy is not None:
+                    with self._retry_lock:
+                        self._retry_budget = min(RETRY_BUDGET, self._retry_budget + RETRY_BUDGET_RATIO)
+                break
+            if not self._allow_retry(cmd, err, attempt):
+                break
+            attempt += 1
+            delay = self._backoff_delay(attempt)
+
+        if self._targets is not None and err == HAND_RESP_SUCCESS:
+            self._track_targets(hand_id, cmd, data, out)
+        if self._shadow is not None or self._response_cache is not None:
+            self._update_cache(hand_id, cmd, data, out, err, key)
+        return err
+
+    def HAND_Command(self, hand_id, cmd, values, remote_err, force=False):
+        """Table driven command with the HAND_CMD_LAYOUTS of cmd, returns (err, response values)"""
+        if (hand_id in self._batches or self._coalesce_window) and cmd in HAND_COALESCED_CMDS and values[0] < MAX_MOTOR_CNT:
+            return self._coalesce(hand_id, cmd, values, remote_err), ()
+
+        request, response = HAND_CMD_LAYOUTS[cmd]
+        data = request.pack(*values) if request is not None else None
+        out = bytearray(response.size) if response is not None else None
+        err = self._transact(hand_id, cmd, data, out, remote_err, force)
+        if err != HAND_RESP_SUCCESS or response is None:
+            return err, ()
+        if len(out) < response.size:
+            return HAND_RESP_DATA_INVALID, ()
+        return err, response.unpack_from(out)
 
     def HAND_GetProtocolVersion(self, hand_id, major, minor, remote_err):
-        out = bytearray(2)
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_PROTOCOL_VERSION, None, 0)
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_PROTOCOL_VERSION, (), remote_err)
         if err == HAND_RESP_SUCCESS:
-            byte_count = len(out)
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_PROTOCOL_VERSION, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS:
-                minor[0] = out[0]
-                major[0] = out[1]
+            minor[0], major[0] = values
         return err, major[0], minor[0]
 
     def HAND_GetFirmwareVersion(self, hand_id, major, minor, revision, remote_err):
-        out = bytearray(4)  # Assuming revision is 2 bytes, and major/minor are 1 byte each
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_FW_VERSION, None, 0)
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_FW_VERSION, (), remote_err)
         if err == HAND_RESP_SUCCESS:
-            byte_count = len(out)
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_FW_VERSION, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS:
-                revision[0] = out[0] | (out[1] << 8)
-                minor[0] = out[2]
-                major[0] = out[3]
+            revision[0], minor[0], major[0] = values
         return err, major[0], minor[0], revision[0]
 
     def HAND_GetHardwareVersion(self, hand_id, hw_type, hw_ver, boot_version, remote_err):
-        out = bytearray(4)  # Assuming boot_version is 2 bytes, and hw_type/hw_ver are 1 byte each
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_HW_VERSION, None, 0)
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_HW_VERSION, (), remote_err)
         if err == HAND_RESP_SUCCESS:
-            byte_count = len(out)
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_HW_VERSION, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS:
-                hw_type[0] = out[0]
-                hw_ver[0] = out[1]
-                boot_version[0] = (out[2] << 8) | out[3]
+            hw_type[0], hw_ver[0], boot_version[0] = values
         return err, hw_type[0], hw_ver[0], boot_version[0]
 
     def HAND_GetCaliData(self, hand_id, end_pos, start_pos, motor_cnt, thumb_root_pos, thumb_root_pos_cnt, remote_err):
         out = bytearray(2 + 2 * MAX_MOTOR_CNT + 2 * MAX_MOTOR_CNT + 1 + 2 * MAX_THUMB_ROOT_POS)
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_CALI_DATA, None, 0)
+        err = self._transact(hand_id, HAND_CMD_GET_CALI_DATA, None, out, remote_err)
         if err == HAND_RESP_SUCCESS:
-            byte_count = len(out)
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_CALI_DATA, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS:
-                p_data = iter(out)
-                motor_cnt_ret = next(p_data)
-                thumb_root_pos_cnt_ret = next(p_data)
-                if motor_cnt[0] < motor_cnt_ret or thumb_root_pos_cnt[0] < thumb_root_pos_cnt_ret:
-                    return HAND_RESP_DATA_SIZE_TOO_BIG
-                motor_cnt[0] = motor_cnt_ret
-                thumb_root_pos_cnt[0] = thumb_root_pos_cnt_ret
-
-                end_pos_size = 2 * motor_cnt_ret
-                start_pos_size = 2 * motor_cnt_ret
-                thumb_root_pos_size = 2 * thumb_root_pos_cnt_ret
-
-                if end_pos:
-                    for i in range(motor_cnt_ret):
-                        end_pos[i] = next(p_data) | (next(p_data) << 8)
-
-                if start_pos:
-                    for i in range(motor_cnt_ret):
-                        start_pos[i] = next(p_data) | (next(p_data) << 8)
-
-                if thumb_root_pos:
-                    for i in range(thumb_root_pos_cnt_ret):
-                        thumb_root_pos[i] = next(p_data) | (next(p_data) << 8)
+            header = HAND_CMD_LAYOUTS[HAND_CMD_GET_CALI_DATA][1]
+            if len(out) < header.size:
+                return HAND_RESP_DATA_INVALID, end_pos, start_pos, thumb_root_pos
+            motor_cnt_ret, thumb_root_pos_cnt_ret = header.unpack_from(out)
+            if motor_cnt[0] < motor_cnt_ret or thumb_root_pos_cnt[0] < thumb_root_pos_cnt_ret:
+                return HAND_RESP_DATA_SIZE_TOO_BIG
+            motor_cnt[0] = motor_cnt_ret
+            thumb_root_pos_cnt[0] = thumb_root_pos_cnt_ret
+
+            layout = _struct(f"<{2 * motor_cnt_ret + thumb_root_pos_cnt_ret}H")
+            if len(out) < header.size + layout.size:
+                return HAND_RESP_DATA_INVALID, end_pos, start_pos, thumb_root_pos
+            values = layout.unpack_from(out, header.size)
+
+            if end_pos:
+                end_pos[:motor_cnt_ret] = values[:motor_cnt_ret]
+
+            if start_pos:
+                start_pos[:motor_cnt_ret] = values[motor_cnt_ret : 2 * motor_cnt_ret]
+
+            if thumb_root_pos:
+                thumb_root_pos[:thumb_root_pos_cnt_ret] = values[2 * motor_cnt_ret :]
 
         return err, end_pos, start_pos, thumb_root_pos
 
@@ -383,497 +943,326 @@ class OHandSerialAPI:
         if not match_data_type(finger_id, UINT8_T):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(1)
-        data[0] = finger_id
-        out = bytearray(1 + 4 + 4 + 4 + 4)  # Assuming float is 4 bytes
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_FINGER_PID, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            byte_count = len(out)
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_FINGER_PID, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS and out[0] == finger_id:
-                p[0] = struct.unpack('f', out[1:5])
-                i[0] = struct.unpack('f', out[5:9])
-                d[0] = struct.unpack('f', out[9:13])
-                g[0] = struct.unpack('f', out[13:17])
-            else:
-                err = HAND_RESP_DATA_INVALID
-        return err, p[0][0], i[0][0], d[0][0], g[0][0]
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_FINGER_PID, (finger_id,), remote_err)
+        if err == HAND_RESP_SUCCESS and values[0] == finger_id:
+            _, p[0], i[0], d[0], g[0] = values
+        else:
+            err = HAND_RESP_DATA_INVALID
+        return err, p[0], i[0], d[0], g[0]
 
     def HAND_GetFingerCurrentLimit(self, hand_id, finger_id, current_limit, remote_err):
         if not match_data_type(finger_id, UINT8_T):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(1)
-        data[0] = finger_id
-        out = bytearray(3)
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_FINGER_CURRENT_LIMIT, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            byte_count = len(out)
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_FINGER_CURRENT_LIMIT, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS and out[0] == finger_id:
-                current_limit[0] = out[1] | (out[2] << 8)
-            else:
-                err = HAND_RESP_DATA_INVALID
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_FINGER_CURRENT_LIMIT, (finger_id,), remote_err)
+        if err == HAND_RESP_SUCCESS and values[0] == finger_id:
+            current_limit[0] = values[1]
+        else:
+            err = HAND_RESP_DATA_INVALID
         return err, current_limit[0]
 
     def HAND_GetFingerCurrent(self, hand_id, finger_id, current, remote_err):
         if not match_data_type(finger_id, UINT8_T):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(1)
-        data[0] = finger_id
-        out = bytearray(3)
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_FINGER_CURRENT, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            byte_count = len(out)
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_FINGER_CURRENT, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS and out[0] == finger_id:
-                current[0] = out[1] | (out[2] << 8)
-            else:
-                err = HAND_RESP_DATA_INVALID
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_FINGER_CURRENT, (finger_id,), remote_err)
+        if err == HAND_RESP_SUCCESS and values[0] == finger_id:
+            current[0] = values[1]
+        else:
+            err = HAND_RESP_DATA_INVALID
         return err, current[0]
 
     def HAND_GetFingerForceTarget(self, hand_id, finger_id, force_target, remote_err):
         if not match_data_type(finger_id, UINT8_T):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(1)
-        data[0] = finger_id
-        out = bytearray(3)
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_FINGER_FORCE_TARGET, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            byte_count = len(out)
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_FINGER_FORCE_TARGET, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS and out[0] == finger_id:
-                force_target[0] = out[1] | (out[2] << 8)
-            else:
-                err = HAND_RESP_DATA_INVALID
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_FINGER_FORCE_TARGET, (finger_id,), remote_err)
+        if err == HAND_RESP_SUCCESS and values[0] == finger_id:
+            force_target[0] = values[1]
+        else:
+            err = HAND_RESP_DATA_INVALID
         return err, force_target[0]
 
     def HAND_GetFingerForce(self, hand_id, finger_id, force_entry_cnt, force, remote_err):
         if not match_data_type(finger_id, UINT8_T):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(1)
-        data[0] = finger_id
+        request, header = HAND_CMD_LAYOUTS[HAND_CMD_GET_FINGER_FORCE]
         out = bytearray(1 + MAX_FORCE_ENTRIES * 2)  # Assuming each entry is 2 bytes
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_FINGER_FORCE, data, len(data))
+        err = self._transact(hand_id, HAND_CMD_GET_FINGER_FORCE, request.pack(finger_id), out, remote_err)
         if err == HAND_RESP_SUCCESS:
-            byte_count = len(out)
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_FINGER_FORCE, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS:
-                if finger_id != out[0]:
-                    err = HAND_RESP_DATA_INVALID
-                else:
-                    force_entry_cnt[0] = out[1]
-                    for i in range(force_entry_cnt[0]):
-                        if i < len(force):
-                            force[i] = out[2 + i]
+            if len(out) < header.size or finger_id != out[0]:
+                err = HAND_RESP_DATA_INVALID
+            else:
+                force_entry_cnt[0] = out[1]
+                entry_cnt = min(force_entry_cnt[0], len(force), len(out) - header.size)
+                force[:entry_cnt] = out[header.size : header.size + entry_cnt]
         return err, force
 
     def HAND_GetFingerPosLimit(self, hand_id, finger_id, low_limit, high_limit, remote_err):
         if not match_data_type(finger_id, UINT8_T):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(1)
-        data[0] = finger_id
-        out = bytearray(5)
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_FINGER_POS_LIMIT, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            byte_count = len(out)
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_FINGER_POS_LIMIT, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS and out[0] == finger_id:
-                low_limit[0] = out[1] | (out[2] << 8)
-                high_limit[0] = out[3] | (out[4] << 8)
-            else:
-                err = HAND_RESP_DATA_INVALID
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_FINGER_POS_LIMIT, (finger_id,), remote_err)
+        if err == HAND_RESP_SUCCESS and values[0] == finger_id:
+            _, low_limit[0], high_limit[0] = values
+        else:
+            err = HAND_RESP_DATA_INVALID
         return err, low_limit[0], high_limit[0]
 
     def HAND_GetFingerPosAbs(self, hand_id, finger_id, target_pos, current_pos, remote_err):
         if not match_data_type(finger_id, UINT8_T):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(1)
-        data[0] = finger_id
-        out = bytearray(5)
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_FINGER_POS_ABS, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            byte_count = len(out)
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_FINGER_POS_ABS, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS and out[0] == finger_id:
-                if target_pos:
-                    target_pos[0] = out[1] | (out[2] << 8)
-                if current_pos:
-                    current_pos[0] = out[3] | (out[4] << 8)
-            else:
-                err = HAND_RESP_DATA_INVALID
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_FINGER_POS_ABS, (finger_id,), remote_err)
+        if err == HAND_RESP_SUCCESS and values[0] == finger_id:
+            if target_pos:
+                target_pos[0] = values[1]
+            if current_pos:
+                current_pos[0] = values[2]
+        else:
+            err = HAND_RESP_DATA_INVALID
         return err, target_pos[0], current_pos[0]
 
     def HAND_GetFingerPos(self, hand_id, finger_id, target_pos, current_pos, remote_err):
         if not match_data_type(finger_id, UINT8_T):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(1)
-        data[0] = finger_id
-        out = bytearray(5)
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_FINGER_POS, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            byte_count = len(out)
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_FINGER_POS, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS and out[0] == finger_id:
-                if target_pos:
-                    target_pos[0] = out[1] | (out[2] << 8)
-                if current_pos:
-                    current_pos[0] = out[3] | (out[4] << 8)
-            else:
-                err = HAND_RESP_DATA_INVALID
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_FINGER_POS, (finger_id,), remote_err)
+        if err == HAND_RESP_SUCCESS and values[0] == finger_id:
+            if target_pos:
+                target_pos[0] = values[1]
+            if current_pos:
+                current_pos[0] = values[2]
+        else:
+            err = HAND_RESP_DATA_INVALID
         return err, target_pos[0], current_pos[0]
 
     def HAND_GetFingerAngle(self, hand_id, finger_id, target_angle, current_angle, remote_err):
         if not match_data_type(finger_id, UINT8_T):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(1)
-        data[0] = finger_id
-        out = bytearray(5)
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_FINGER_ANGLE, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            byte_count = len(out)
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_FINGER_ANGLE, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS and out[0] == finger_id:
-                if target_angle:
-                    target_angle[0] = int.from_bytes(out[1:3], byteorder="little", signed=True)
-                if current_angle:
-                    current_angle[0] = int.from_bytes(out[3:5], byteorder="little", signed=True)
-            else:
-                err = HAND_RESP_DATA_INVALID
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_FINGER_ANGLE, (finger_id,), remote_err)
+        if err == HAND_RESP_SUCCESS and values[0] == finger_id:
+            if target_angle:
+                target_angle[0] = values[1]
+            if current_angle:
+                current_angle[0] = values[2]
+        else:
+            err = HAND_RESP_DATA_INVALID
         return err, target_angle[0], current_angle[0]
 
     def HAND_GetThumbRootPos(self, hand_id, raw_encoder, pos, remote_err):
-        out = bytearray(3)
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_THUMB_ROOT_POS, None, 0)
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_THUMB_ROOT_POS, (), remote_err)
         if err == HAND_RESP_SUCCESS:
-            byte_count = len(out)
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_THUMB_ROOT_POS, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS:
-                raw_encoder[0] = out[0] | (out[1] << 8)
-                pos[0] = out[2]
+            raw_encoder[0], pos[0] = values
         return err, raw_encoder[0], pos[0]
 
     def HAND_GetFingerPosAbsAll(self, hand_id, target_pos, current_pos, motor_cnt, remote_err):
-        out = bytearray(2 * MAX_MOTOR_CNT * 2)
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_FINGER_POS_ABS_ALL, None, 0)
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_FINGER_POS_ABS_ALL, (), remote_err)
         if err == HAND_RESP_SUCCESS:
-            byte_count = len(out)
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_FINGER_POS_ABS_ALL, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS:
-                motor_cnt_ret = byte_count // (2 + 2)
-                if motor_cnt[0] < motor_cnt_ret:
-                    return HAND_RESP_DATA_SIZE_TOO_BIG
-                motor_cnt[0] = motor_cnt_ret
-                if target_pos:
-                    for i in range(motor_cnt_ret):
-                        target_pos[i] = out[2 * i] | (out[2 * i + 1] << 8)
-                if current_pos:
-                    for i in range(motor_cnt_ret):
-                        current_pos[i] = out[2 * motor_cnt_ret + 2 * i] | (out[2 * motor_cnt_ret + 2 * i + 1] << 8)
+            if motor_cnt[0] < MAX_MOTOR_CNT:
+                return HAND_RESP_DATA_SIZE_TOO_BIG
+            motor_cnt[0] = MAX_MOTOR_CNT
+            if target_pos:
+                target_pos[:MAX_MOTOR_CNT] = values[:MAX_MOTOR_CNT]
+            if current_pos:
+                current_pos[:MAX_MOTOR_CNT] = values[MAX_MOTOR_CNT:]
         return err, target_pos, current_pos
 
     def HAND_GetFingerPosAll(self, hand_id, target_pos, current_pos, motor_cnt, remote_err):
-        out = bytearray(2 * MAX_MOTOR_CNT * 2)
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_FINGER_POS_ALL, None, 0)
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_FINGER_POS_ALL, (), remote_err)
         if err == HAND_RESP_SUCCESS:
-            byte_count = len(out)
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_FINGER_POS_ALL, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS:
-                motor_cnt_ret = byte_count // (2 + 2)
-                if motor_cnt[0] < motor_cnt_ret:
-                    return HAND_RESP_DATA_SIZE_TOO_BIG
-                motor_cnt[0] = motor_cnt_ret
-                if target_pos:
-                    for i in range(motor_cnt_ret):
-                        target_pos[i] = out[2 * i] | (out[2 * i + 1] << 8)
-                if current_pos:
-                    for i in range(motor_cnt_ret):
-                        current_pos[i] = out[2 * motor_cnt_ret + 2 * i] | (out[2 * motor_cnt_ret + 2 * i + 1] << 8)
+            if motor_cnt[0] < MAX_MOTOR_CNT:
+                return HAND_RESP_DATA_SIZE_TOO_BIG
+            motor_cnt[0] = MAX_MOTOR_CNT
+            if target_pos:
+                target_pos[:MAX_MOTOR_CNT] = values[:MAX_MOTOR_CNT]
+            if current_pos:
+                current_pos[:MAX_MOTOR_CNT] = values[MAX_MOTOR_CNT:]
         return err, target_pos, current_pos
 
     def HAND_GetFingerAngleAll(self, hand_id, target_angle, current_angle, motor_cnt, remote_err):
-        out = bytearray(2 * MAX_MOTOR_CNT * 2)
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_FINGER_ANGLE_ALL, None, 0)
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_FINGER_ANGLE_ALL, (), remote_err)
         if err == HAND_RESP_SUCCESS:
-            byte_count = len(out)
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_FINGER_ANGLE_ALL, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS:
-                motor_cnt_ret = byte_count // (2 + 2)
-                if motor_cnt[0] < motor_cnt_ret:
-                    return HAND_RESP_DATA_SIZE_TOO_BIG
-                motor_cnt[0] = motor_cnt_ret
-                if target_angle:
-                    for i in range(motor_cnt_ret):
-                        target_angle[i] = int.from_bytes(out[2 * i : 2 * i + 2], byteorder="little", signed=True)
-                if current_angle:
-                    for i in range(motor_cnt_ret):
-                        current_angle[i] = int.from_bytes(
-                            out[2 * motor_cnt_ret + 2 * i : 2 * motor_cnt_ret + 2 * i + 2], byteorder="little", signed=True
-                        )
+            if motor_cnt[0] < MAX_MOTOR_CNT:
+                return HAND_RESP_DATA_SIZE_TOO_BIG
+            motor_cnt[0] = MAX_MOTOR_CNT
+            if target_angle:
+                target_angle[:MAX_MOTOR_CNT] = values[:MAX_MOTOR_CNT]
+            if current_angle:
+                current_angle[:MAX_MOTOR_CNT] = values[MAX_MOTOR_CNT:]
         return err, target_angle, current_angle
 
+    def _get_all_array(self, hand_id, cmd, dtype, remote_err):
+        """Response of a *_ALL get command as NumPy arrays (target, current), views of the response buffer"""
+        _require_numpy()
+        response = HAND_CMD_LAYOUTS[cmd][1]
+        out = bytearray(response.size)
+        err = self._transact(hand_id, cmd, None, out, remote_err)
+        if err != HAND_RESP_SUCCESS:
+            return err, None, None
+        if len(out) < response.size:
+            return HAND_RESP_DATA_INVALID, None, None
+        values = np.frombuffer(out, dtype, 2 * MAX_MOTOR_CNT)
+        return err, values[:MAX_MOTOR_CNT], values[MAX_MOTOR_CNT:]
+
+    def HAND_GetFingerPosAbsAllArray(self, hand_id, remote_err):
+        """Returns (err, target_pos, current_pos), uint16 arrays of MAX_MOTOR_CNT raw positions"""
+        return self._get_all_array(hand_id, HAND_CMD_GET_FINGER_POS_ABS_ALL, "<u2", remote_err)
+
+    def HAND_GetFingerPosAllArray(self, hand_id, remote_err):
+        """Returns (err, target_pos, current_pos), uint16 arrays of MAX_MOTOR_CNT positions"""
+        return self._get_all_array(hand_id, HAND_CMD_GET_FINGER_POS_ALL, "<u2", remote_err)
+
+    def HAND_GetFingerAngleAllArray(self, hand_id, remote_err):
+        """Returns (err, target_angle, current_angle), int16 arrays of MAX_MOTOR_CNT angles"""
+        return self._get_all_array(hand_id, HAND_CMD_GET_FINGER_ANGLE_ALL, "<i2", remote_err)
+
     def HAND_GetFingerStopParams(self, hand_id, finger_id, speed, stop_current, stop_after_period, retry_interval, remote_err):
         if not match_data_type(finger_id, UINT8_T):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(1)
-        data[0] = finger_id
-        out = bytearray(9)  # Assuming 4 bytes of stop params
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_FINGER_STOP_PARAMS, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_FINGER_STOP_PARAMS, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS and out[0] == finger_id:
-                speed[0] = out[1] | (out[2] << 8)
-                stop_current[0] = out[3] | (out[4] << 8)
-                stop_after_period[0] = out[5] | (out[6] << 8)
-                retry_interval[0] = out[7] | (out[8] << 8)
-            else:
-                err = HAND_RESP_DATA_INVALID
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_FINGER_STOP_PARAMS, (finger_id,), remote_err)
+        if err == HAND_RESP_SUCCESS and values[0] == finger_id:
+            _, speed[0], stop_current[0], stop_after_period[0], retry_interval[0] = values
+        else:
+            err = HAND_RESP_DATA_INVALID
         return err, speed[0], stop_current[0], stop_after_period[0], retry_interval[0]
 
     def HAND_GetFingerForcePID(self, hand_id, finger_id, p, i, d, g, remote_err):
         if not match_data_type(finger_id, UINT8_T):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(1)
-        data[0] = finger_id
-        out = bytearray(1 + 4 + 4 + 4 + 4)  # Assuming float is 4 bytes
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_FINGER_FORCE_PID, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_FINGER_FORCE_PID, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS and out[0] == finger_id:
-                p[0] = struct.unpack('f', out[1:5])
-                i[0] = struct.unpack('f', out[5:9])
-                d[0] = struct.unpack('f', out[9:13])
-                g[0] = struct.unpack('f', out[13:17])
-            else:
-                err = HAND_RESP_DATA_INVALID
-        return err, p[0][0], i[0][0], d[0][0], g[0][0]
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_FINGER_FORCE_PID, (finger_id,), remote_err)
+        if err == HAND_RESP_SUCCESS and values[0] == finger_id:
+            _, p[0], i[0], d[0], g[0] = values
+        else:
+            err = HAND_RESP_DATA_INVALID
+        return err, p[0], i[0], d[0], g[0]
 
     def HAND_GetSelfTestLevel(self, hand_id, self_test_level, remote_err):
-        out = bytearray(1)
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_SELF_TEST_LEVEL, None, 0)
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_SELF_TEST_LEVEL, (), remote_err)
         if err == HAND_RESP_SUCCESS:
-            byte_count = len(out)
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_SELF_TEST_LEVEL, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS:
-                self_test_level[0] = out[0]
+            self_test_level[0] = values[0]
         return err, self_test_level[0]
 
     def HAND_GetBeepSwitch(self, hand_id, beep_switch, remote_err):
-        out = bytearray(1)
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_BEEP_SWITCH, None, 0)
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_BEEP_SWITCH, (), remote_err)
         if err == HAND_RESP_SUCCESS:
-            byte_count = len(out)
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_BEEP_SWITCH, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS:
-                beep_switch[0] = out[0]
+            beep_switch[0] = values[0]
         return err, beep_switch[0]
 
     def HAND_GetButtonPressedCnt(self, hand_id, pressed_cnt, remote_err):
-        out = bytearray(1)
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_BUTTON_PRESSED_CNT, None, 0)
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_BUTTON_PRESSED_CNT, (), remote_err)
         if err == HAND_RESP_SUCCESS:
-            byte_count = len(out)
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_BUTTON_PRESSED_CNT, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS:
-                pressed_cnt[0] = out[0]
+            pressed_cnt[0] = values[0]
         return err, pressed_cnt[0]
 
     def HAND_GetUID(self, hand_id, uid_w0, uid_w1, uid_w2, remote_err):
-        out = bytearray(12)  # 96 bits UID
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_UID, None, 0)
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_UID, (), remote_err)
         if err == HAND_RESP_SUCCESS:
-            byte_count = len(out)
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_UID, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS:
-                uid_w0[0] = out[0] | (out[1] << 8) | (out[2] << 16) | (out[3] << 24)
-                uid_w1[0] = out[4] | (out[5] << 8) | (out[6] << 16) | (out[7] << 24)
-                uid_w2[0] = out[8] | (out[9] << 8) | (out[10] << 16) | (out[11] << 24)
+            uid_w0[0], uid_w1[0], uid_w2[0] = values
         return err, uid_w0[0], uid_w1[0], uid_w2[0]
 
     def HAND_GetBatteryVoltage(self, hand_id, voltage, remote_err):
-        out = bytearray(2)
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_BATTERY_VOLTAGE, None, 0)
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_BATTERY_VOLTAGE, (), remote_err)
         if err == HAND_RESP_SUCCESS:
-            byte_count = len(out)
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_BATTERY_VOLTAGE, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS:
-                voltage[0] = out[0] | (out[1] << 8)
+            voltage[0] = values[0]
         return err
 
     def HAND_GetUsageStat(self, hand_id, total_use_time, total_open_times, motor_cnt, remote_err):
-        data = bytearray(1)
-        data[0] = motor_cnt
-        out = bytearray(4 + 4 * MAX_MOTOR_CNT)
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_USAGE_STAT, data, len(data))
+        if not match_data_type(motor_cnt, UINT8_T):
+            return HAND_RESP_DATA_INVALID
+
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_USAGE_STAT, (motor_cnt,), remote_err)
         if err == HAND_RESP_SUCCESS:
-            byte_count = len(out)
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_USAGE_STAT, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS:
-                total_use_time[0] = out[0] | (out[1] << 8) | (out[2] << 16) | (out[3] << 24)
-                for i in range(MAX_MOTOR_CNT):
-                    index = 4 + i * 4
-                    total_open_times[i] = out[index] | (out[index + 1] << 8) | (out[index + 2] << 16) | (out[index + 3] << 24)
+            total_use_time[0] = values[0]
+            total_open_times[:MAX_MOTOR_CNT] = values[1:]
         return err
 
     def HAND_GetManufactureData(self, hand_id, sub_model, hw_revision, serial_number, customer_tag, remote_err):
-        out = bytearray(26)
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_MANUFACTURE_DATA, None, 0)
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_MANUFACTURE_DATA, (), remote_err)
         if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_MANUFACTURE_DATA, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS:
-                sub_model[0] = out[0]
-                hw_revision[0] = out[1]
-                serial_bytes = out[2:18]
-                customer_bytes = out[18:26]
-
-                serial_numbers = [int(byte) for byte in serial_bytes]
-                serial_number_str = ''.join(map(str, serial_numbers))
-                serial_number[0] = serial_number_str
-
-                customer_numbers = [int(byte) for byte in customer_bytes]
-                customer_numbers_str = ''.join(map(str, customer_numbers))
-                customer_tag[0] = customer_numbers_str
-            else:
-                err = HAND_RESP_DATA_INVALID
+            sub_model[0], hw_revision[0], serial_bytes, customer_bytes = values
+            serial_number[0] = ''.join(map(str, serial_bytes))
+            customer_tag[0] = ''.join(map(str, customer_bytes))
+        else:
+            err = HAND_RESP_DATA_INVALID
         return err, sub_model[0], hw_revision[0], serial_number[0], customer_tag[0]
 
     def HAND_GetFingerSpeedCtrlParams(self, hand_id, brake_distance, accel_distance, speed_ratio, remote_err):
-        out = bytearray(2 + 2 + 4)
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_GET_SPEED_CTRL_PARAMS, None, 0)
+        err, values = self.HAND_Command(hand_id, HAND_CMD_GET_SPEED_CTRL_PARAMS, (), remote_err)
         if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_GET_SPEED_CTRL_PARAMS, self.timeout, out, remote_err)
-            if err == HAND_RESP_SUCCESS:
-                brake_distance[0] = out[0] | (out[1] << 8)
-                accel_distance[0] = out[2] | (out[3] << 8)
-                speed_ratio[0] = struct.unpack('f', out[4:8])
-            else:
-                err = HAND_RESP_DATA_INVALID
+            brake_distance[0], accel_distance[0], speed_ratio[0] = values
+        else:
+            err = HAND_RESP_DATA_INVALID
 
-        return err, brake_distance[0], accel_distance[0], speed_ratio[0][0]
+        return err, brake_distance[0], accel_distance[0], speed_ratio[0]
 
     def HAND_Reset(self, hand_id, mode, remote_err):
         if not match_data_type(mode, UINT8_T):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(1)
-        data[0] = mode
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_RESET, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_RESET, self.timeout, None, remote_err)
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_RESET, (mode,), remote_err)
         return err
 
     def HAND_PowerOff(self, hand_id, remote_err):
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_POWER_OFF, None, 0)
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_POWER_OFF, self.timeout, None, remote_err)
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_POWER_OFF, (), remote_err)
         return err
 
     def HAND_SetID(self, hand_id, new_id, remote_err):
         if not match_data_type(new_id, UINT8_T):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(1)
-        data[0] = new_id
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_SET_NODE_ID, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_SET_NODE_ID, self.timeout, None, remote_err)
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_SET_NODE_ID, (new_id,), remote_err)
         return err
 
     def HAND_Calibrate(self, hand_id, key, remote_err):
-        data = bytearray(2)
-        data[0] = key & 0xFF
-        data[1] = (key >> 8) & 0xFF
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_CALIBRATE, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_CALIBRATE, self.timeout, None, remote_err)
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_CALIBRATE, (key & 0xFFFF,), remote_err)
         return err
 
     def HAND_SetCaliData(self, hand_id, end_pos, start_pos, motor_cnt, thumb_root_pos, thumb_root_pos_cnt, remote_err):
         if not match_data_type(motor_cnt, UINT8_T) or not match_data_type(thumb_root_pos_cnt, UINT8_T):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(1 + 2 * MAX_MOTOR_CNT + 2 * MAX_MOTOR_CNT + 1 + 2 * MAX_THUMB_ROOT_POS)
-        p_data = 0
-        data[p_data] = motor_cnt
-        p_data += 1
-
-        for i in range(motor_cnt):
-            data[p_data] = end_pos[i] & 0xFF
-            data[p_data + 1] = (end_pos[i] >> 8) & 0xFF
-            p_data += 2
-
-        for i in range(motor_cnt):
-            data[p_data] = start_pos[i] & 0xFF
-            data[p_data + 1] = (start_pos[i] >> 8) & 0xFF
-            p_data += 2
-
-        data[p_data] = thumb_root_pos_cnt
-        p_data += 1
-
-        for i in range(thumb_root_pos_cnt):
-            data[p_data] = thumb_root_pos[i] & 0xFF
-            data[p_data + 1] = (thumb_root_pos[i] >> 8) & 0xFF
-            p_data += 2
+        layout = _struct(f"<B{2 * motor_cnt}HB{thumb_root_pos_cnt}H")
+        try:
+            data = layout.pack(
+                motor_cnt,
+                *end_pos[:motor_cnt],
+                *start_pos[:motor_cnt],
+                thumb_root_pos_cnt,
+                *thumb_root_pos[:thumb_root_pos_cnt],
+            )
+        except struct.error:
+            return HAND_RESP_DATA_INVALID
 
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_SET_CALI_DATA, data, p_data)
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_SET_CALI_DATA, self.timeout, None, remote_err)
+        err = self._transact(hand_id, HAND_CMD_SET_CALI_DATA, data, None, remote_err)
         return err
 
-    def HAND_SetFingerPID(self, hand_id, finger_id, p, i, d, g, remote_err):
+    def HAND_SetFingerPID(self, hand_id, finger_id, p, i, d, g, remote_err, force=False):
         if not match_data_type(finger_id, UINT8_T):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(1 + 4 + 4 + 4 + 4)
-        data[0] = finger_id
-        data[1:5] =   struct.pack('f', p)
-        data[5:9] =   struct.pack('f', i)
-        data[9:13] =  struct.pack('f', d)
-        data[13:17] = struct.pack('f', g)
-
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_SET_FINGER_PID, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_SET_FINGER_PID, self.timeout, None, remote_err)
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_SET_FINGER_PID, (finger_id, p, i, d, g), remote_err, force)
         return err
 
-    def HAND_SetFingerCurrentLimit(self, hand_id, finger_id, current_limit, remote_err):
+    def HAND_SetFingerCurrentLimit(self, hand_id, finger_id, current_limit, remote_err, force=False):
         if not match_data_type(finger_id, UINT8_T) or not match_data_type(current_limit, UINT16_T):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(3)
-        data[0] = finger_id
-        data[1] = current_limit & 0xFF
-        data[2] = (current_limit >> 8) & 0xFF
-
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_SET_FINGER_CURRENT_LIMIT, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_SET_FINGER_CURRENT_LIMIT, self.timeout, None, remote_err)
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_SET_FINGER_CURRENT_LIMIT, (finger_id, current_limit), remote_err, force)
         return err
 
-    def HAND_SetFingerForceTarget(self, hand_id, finger_id, force_limit, remote_err):
+    def HAND_SetFingerForceTarget(self, hand_id, finger_id, force_limit, remote_err, force=False):
         if not match_data_type(finger_id, UINT8_T) or not match_data_type(force_limit, UINT16_T):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(3)
-        data[0] = finger_id
-        data[1] = force_limit & 0xFF
-        data[2] = (force_limit >> 8) & 0xFF
-
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_SET_FINGER_FORCE_TARGET, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_SET_FINGER_FORCE_TARGET, self.timeout, None, remote_err)
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_SET_FINGER_FORCE_TARGET, (finger_id, force_limit), remote_err, force)
         return err
 
-    def HAND_SetFingerPosLimit(self, hand_id, finger_id, pos_limit_low, pos_limit_high, remote_err):
+    def HAND_SetFingerPosLimit(self, hand_id, finger_id, pos_limit_low, pos_limit_high, remote_err, force=False):
         if (
             not match_data_type(finger_id, UINT8_T)
             or not match_data_type(pos_limit_low, UINT16_T)
@@ -882,40 +1271,21 @@ class OHandSerialAPI:
         ):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(5)
-        data[0] = finger_id
-        data[1] = pos_limit_low & 0xFF
-        data[2] = (pos_limit_low >> 8) & 0xFF
-        data[3] = pos_limit_high & 0xFF
-        data[4] = (pos_limit_high >> 8) & 0xFF
-
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_SET_FINGER_POS_LIMIT, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_SET_FINGER_POS_LIMIT, self.timeout, None, remote_err)
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_SET_FINGER_POS_LIMIT, (finger_id, pos_limit_low, pos_limit_high), remote_err, force)
         return err
 
     def HAND_FingerStart(self, hand_id, finger_id_bits, remote_err):
         if not match_data_type(finger_id_bits, UINT8_T):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(1)
-        data[0] = finger_id_bits
-
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_FINGER_START, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_FINGER_START, self.timeout, None, remote_err)
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_FINGER_START, (finger_id_bits,), remote_err)
         return err
 
     def HAND_FingerStop(self, hand_id, finger_id_bits, remote_err):
         if not match_data_type(finger_id_bits, UINT8_T):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(1)
-        data[0] = finger_id_bits
-
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_FINGER_STOP, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_FINGER_STOP, self.timeout, None, remote_err)
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_FINGER_STOP, (finger_id_bits,), remote_err)
         return err
 
     def HAND_SetFingerPosAbs(self, hand_id, finger_id, raw_pos, speed, remote_err):
@@ -926,81 +1296,50 @@ class OHandSerialAPI:
         ):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(4)
-        data[0] = finger_id
-        data[1] = raw_pos & 0xFF
-        data[2] = (raw_pos >> 8) & 0xFF
-        data[3] = speed
-
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_SET_FINGER_POS_ABS, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_SET_FINGER_POS_ABS, self.timeout, None, remote_err)
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_SET_FINGER_POS_ABS, (finger_id, raw_pos, speed), remote_err)
         return err
 
     def HAND_SetFingerPos(self, hand_id, finger_id, pos, speed, remote_err):
         if not match_data_type(finger_id, UINT8_T) or not match_data_type(pos, UINT16_T) or not match_data_type(speed, UINT8_T):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(4)
-        data[0] = finger_id
-        data[1] = pos & 0xFF
-        data[2] = (pos >> 8) & 0xFF
-        data[3] = speed
-
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_SET_FINGER_POS, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_SET_FINGER_POS, self.timeout, None, remote_err)
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_SET_FINGER_POS, (finger_id, pos, speed), remote_err)
         return err
 
     def HAND_SetFingerAngle(self, hand_id, finger_id, angle, speed, remote_err):
         if not match_data_type(finger_id, UINT8_T) or not match_data_type(angle, INT16_T) or not match_data_type(speed, UINT8_T):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(4)
-        data[0] = finger_id
-        data[1] = angle & 0xFF
-        data[2] = (angle >> 8) & 0xFF
-        data[3] = speed
-
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_SET_FINGER_ANGLE, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_SET_FINGER_ANGLE, self.timeout, None, remote_err)
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_SET_FINGER_ANGLE, (finger_id, angle, speed), remote_err)
         return err
 
     def HAND_SetThumbRootPos(self, hand_id, pos, speed, remote_err):
         if not match_data_type(pos, UINT8_T) or not match_data_type(speed, UINT8_T):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(2)
-        data[0] = pos
-        data[1] = speed
-
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_SET_THUMB_ROOT_POS, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_SET_THUMB_ROOT_POS, self.timeout, None, remote_err)
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_SET_THUMB_ROOT_POS, (pos, speed), remote_err)
         return err
 
+    def _set_all(self, hand_id, cmd, value_type, values, speed, motor_cnt, remote_err):
+        """Pack interleaved [value, speed] records of the *_ALL set commands with one struct call"""
+        records = [0] * (2 * motor_cnt)
+        records[0::2] = values[:motor_cnt]
+        records[1::2] = speed[:motor_cnt]
+        data = _all_layout(motor_cnt, value_type).pack(*records)
+        return self._transact(hand_id, cmd, data, None, remote_err)
+
     def HAND_SetFingerPosAbsAll(self, hand_id, raw_pos, speed, motor_cnt, remote_err):
         if (
             not match_list_type(raw_pos, UINT16_T)
             or not match_list_type(speed, UINT8_T)
             or not match_data_type(motor_cnt, UINT8_T)
             or motor_cnt > MAX_MOTOR_CNT
+            or len(raw_pos) < motor_cnt
+            or len(speed) < motor_cnt
         ):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(3 * motor_cnt)
-        p_data = 0
-        for i in range(motor_cnt):
-            data[p_data] = raw_pos[i] & 0xFF
-            data[p_data + 1] = (raw_pos[i] >> 8) & 0xFF
-            data[p_data + 2] = speed[i]
-            p_data += 3
-
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_SET_FINGER_POS_ABS_ALL, data, p_data)
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_SET_FINGER_POS_ABS_ALL, self.timeout, None, remote_err)
-        return err
+        return self._set_all(hand_id, HAND_CMD_SET_FINGER_POS_ABS_ALL, "H", raw_pos, speed, motor_cnt, remote_err)
 
     def HAND_SetFingerPosAll(self, hand_id, pos, speed, motor_cnt, remote_err):
         if (
@@ -1008,21 +1347,12 @@ class OHandSerialAPI:
             or not match_list_type(speed, UINT8_T)
             or not match_data_type(motor_cnt, UINT8_T)
             or motor_cnt > MAX_MOTOR_CNT
+            or len(pos) < motor_cnt
+            or len(speed) < motor_cnt
         ):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(3 * motor_cnt)
-        p_data = 0
-        for i in range(motor_cnt):
-            data[p_data] = pos[i] & 0xFF
-            data[p_data + 1] = (pos[i] >> 8) & 0xFF
-            data[p_data + 2] = speed[i]
-            p_data += 3
-
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_SET_FINGER_POS_ALL, data, p_data)
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_SET_FINGER_POS_ALL, self.timeout, None, remote_err)
-        return err
+        return self._set_all(hand_id, HAND_CMD_SET_FINGER_POS_ALL, "H", pos, speed, motor_cnt, remote_err)
 
     def HAND_SetFingerAngleAll(self, hand_id, angle, speed, motor_cnt, remote_err):
         if (
@@ -1030,23 +1360,51 @@ class OHandSerialAPI:
             or not match_list_type(speed, UINT8_T)
             or not match_data_type(motor_cnt, UINT8_T)
             or motor_cnt > MAX_MOTOR_CNT
+            or len(angle) < motor_cnt
+            or len(speed) < motor_cnt
         ):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(3 * motor_cnt)
-        p_data = 0
-        for i in range(motor_cnt):
-            data[p_data] = angle[i] & 0xFF
-            data[p_data + 1] = (angle[i] >> 8) & 0xFF
-            data[p_data + 2] = speed[i]
-            p_data += 3
+        return self._set_all(hand_id, HAND_CMD_SET_FINGER_ANGLE_ALL, "h", angle, speed, motor_cnt, remote_err)
 
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_SET_FINGER_ANGLE_ALL, data, p_data)
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_SET_FINGER_ANGLE_ALL, self.timeout, None, remote_err)
-        return err
+    def _set_all_array(self, hand_id, cmd, value_type, values, speed, remote_err):
+        """Pack the [value, speed] records of a *_ALL set command from NumPy arrays, one record per value"""
+        _require_numpy()
+        values = np.asarray(values)
+        speed = np.asarray(speed)
+        dtype = ALL_RECORD_DTYPES[value_type]
+        value_range = np.iinfo(dtype["value"])
+        if (
+            values.ndim != 1
+            or values.shape != speed.shape
+            or not 0 < len(values) <= MAX_MOTOR_CNT
+            or values.dtype.kind not in "iu"
+            or speed.dtype.kind not in "iu"
+            or values.min() < value_range.min
+            or values.max() > value_range.max
+            or speed.min() < 0
+            or speed.max() > 0xFF
+        ):
+            return HAND_RESP_DATA_INVALID
+
+        records = np.empty(len(values), dtype)
+        records["value"] = values
+        records["speed"] = speed
+        return self._transact(hand_id, cmd, records.tobytes(), None, remote_err)
+
+    def HAND_SetFingerPosAbsAllArray(self, hand_id, raw_pos, speed, remote_err):
+        """raw_pos and speed are arrays of the same length, up to MAX_MOTOR_CNT"""
+        return self._set_all_array(hand_id, HAND_CMD_SET_FINGER_POS_ABS_ALL, "H", raw_pos, speed, remote_err)
 
-    def HAND_SetFingerStopParams(self, hand_id, finger_id, speed, stop_current, stop_after_period, retry_interval, remote_err):
+    def HAND_SetFingerPosAllArray(self, hand_id, pos, speed, remote_err):
+        """pos and speed are arrays of the same length, up to MAX_MOTOR_CNT"""
+        return self._set_all_array(hand_id, HAND_CMD_SET_FINGER_POS_ALL, "H", pos, speed, remote_err)
+
+    def HAND_SetFingerAngleAllArray(self, hand_id, angle, speed, remote_err):
+        """angle and speed are arrays of the same length, up to MAX_MOTOR_CNT"""
+        return self._set_all_array(hand_id, HAND_CMD_SET_FINGER_ANGLE_ALL, "h", angle, speed, remote_err)
+
+    def HAND_SetFingerStopParams(self, hand_id, finger_id, speed, stop_current, stop_after_period, retry_interval, remote_err, force=False):
         if (
             not match_data_type(finger_id, UINT8_T)
             or not match_data_type(speed, UINT16_T)
@@ -1056,130 +1414,178 @@ class OHandSerialAPI:
         ):
             return HAND_RESP_DATA_INVALID
 
-        data = bytearray(1 + 2 + 2 + 2 + 2)
-        data[0] = finger_id
-        data[1] = speed & 0xFF
-        data[2] = (speed >> 8) & 0xFF
-        data[3] = stop_current & 0xFF
-        data[4] = (stop_current >> 8) & 0xFF
-        data[5] = stop_after_period & 0xFF
-        data[6] = (stop_after_period >> 8) & 0xFF
-        data[7] = retry_interval & 0xFF
-        data[8] = (retry_interval >> 8) & 0xFF
-
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_SET_FINGER_STOP_PARAMS, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_SET_FINGER_STOP_PARAMS, self.timeout, None, remote_err)
+        values = (finger_id, speed, stop_current, stop_after_period, retry_interval)
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_SET_FINGER_STOP_PARAMS, values, remote_err, force)
         return err
 
-    def HAND_SetFingerForcePID(self, hand_id, finger_id, p, i, d, g, remote_err):
+    def HAND_SetFingerForcePID(self, hand_id, finger_id, p, i, d, g, remote_err, force=False):
         if not match_data_type(finger_id, UINT8_T):
             return HAND_RESP_DATA_INVALID
-        
-        data = bytearray(1 + 4 + 4 + 4 + 4)
-        data[0] = finger_id
-        data[1:5] =   struct.pack('f', p)
-        data[5:9] =   struct.pack('f', i)
-        data[9:13] =  struct.pack('f', d)
-        data[13:17] = struct.pack('f', g)
-
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_SET_FINGER_FORCE_PID, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_SET_FINGER_FORCE_PID, self.timeout, None, remote_err)
+
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_SET_FINGER_FORCE_PID, (finger_id, p, i, d, g), remote_err, force)
         return err
 
     def HAND_ResetForce(self, hand_id, remote_err):
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_RESET_FORCE, None, 0)
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_RESET_FORCE, self.timeout, None, remote_err)
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_RESET_FORCE, (), remote_err)
         return err
 
     def HAND_SetCustom(self, hand_id, data, send_data_size, recv_data_size, remote_err):
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_SET_CUSTOM, data, send_data_size)
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_SET_CUSTOM, self.timeout, data, recv_data_size, remote_err)
+        """data holds the request, the response is copied back into data (a bytearray or a list)"""
+        if send_data_size > len(data) or send_data_size >= MAX_PROTOCOL_DATA_SIZE:
+            return HAND_RESP_DATA_SIZE_TOO_BIG
+
+        out = bytearray(max(recv_data_size, 1))
+        err = self._transact(hand_id, HAND_CMD_SET_CUSTOM, bytes(data[:send_data_size]), out, remote_err)
+        if err == HAND_RESP_SUCCESS and recv_data_size > 0:
+            if len(out) < recv_data_size:
+                return HAND_RESP_DATA_INVALID
+            data[:recv_data_size] = out[:recv_data_size]
+        return err
+
+    def discover_nodes(self, hand_ids=DISCOVERY_HAND_IDS, time_out=DISCOVERY_TIMEOUT, window=None):
+        """[(hand_id, protocol version, firmware version)] of the hands answering among hand_ids"""
+        found = sorted(self._probe(hand_ids, DISCOVERY_PROBE_CMD, time_out, window))
+        protocols = self._probe(found, HAND_CMD_GET_PROTOCOL_VERSION, time_out)
+        versions = self._probe(found, HAND_CMD_GET_FW_VERSION, time_out)
+
+        nodes = []
+        for hand_id in found:
+            protocol = protocols[hand_id]
+            if protocol is not None:
+                minor, major = protocol
+                protocol = (major, minor)
+            fw_version = versions.get(hand_id)
+            if fw_version is not None:
+                revision, fw_minor, fw_major = fw_version
+                fw_version = (fw_major, fw_minor, revision)
+            nodes.append((hand_id, protocol, fw_version))
+        return nodes
+
+    def _probe(self, hand_ids, cmd, time_out, window=None):
+        """Pipelined cmd to hand_ids, window in flight, returns {hand_id: unpacked response or None}"""
+        hand_ids = list(hand_ids)
+        if not window:
+            window = len(hand_ids) if response_frames(cmd) == 1 else 1
+        window = max(window, 1)
+        response = HAND_CMD_LAYOUTS[cmd][1]
+        replies = {}
+        for start in range(0, len(hand_ids), window):
+            batch = hand_ids[start : start + window]
+            with self.lock_hands(batch, [cmd]):
+                futures = [self.HAND_SubmitCmd(hand_id, cmd, None, 0, time_out) for hand_id in batch]
+                results = self.HAND_WaitCmds(futures)
+            for hand_id, (err, resp_bytes) in zip(batch, results):
+                if err == HAND_RESP_SUCCESS and len(resp_bytes) >= response.size:
+                    replies[hand_id] = response.unpack_from(resp_bytes)
+                elif err in (HAND_RESP_SUCCESS, HAND_RESP_HAND_ERROR):
+                    replies[hand_id] = None
+        return replies
+
+    def read_state(self, hand_id, fields=HAND_STATE_ALL, state=None, remote_err=None):
+        """Read the fields of the hand in one HAND_CMD_SET_CUSTOM transaction, returns (err, state)"""
+        if state is None:
+            state = HandState()
+        try:
+            sub_cmd = _state_fields(fields)
+        except KeyError:
+            return HAND_RESP_DATA_INVALID, state
+        if sub_cmd == 0:
+            return HAND_RESP_DATA_INVALID, state
+
+        err = self._custom(hand_id, sub_cmd, None, state, remote_err)
+        return err, state
+
+    def _custom(self, hand_id, sub_cmd, setpoints, state, remote_err):
+        """One HAND_CMD_SET_CUSTOM transaction, the reply fields are decoded into state"""
+        (request, set_slices), (response, get_slices) = _custom_layout(sub_cmd)
+        values = [sub_cmd]
+        try:
+            for name, start, end in set_slices:
+                values += setpoints[name][: end - start]
+            data = request.pack(*values)
+        except (KeyError, TypeError, struct.error):
+            return HAND_RESP_DATA_INVALID
+
+        out = bytearray(max(response.size, 1))
+        err = self._transact(hand_id, HAND_CMD_SET_CUSTOM, data, out, remote_err)
+        if err != HAND_RESP_SUCCESS or response.size == 0:
+            return err
+        if len(out) < response.size:
+            return HAND_RESP_DATA_INVALID
+
+        _unpack_state(response, get_slices, out, state, sub_cmd)
         return err
 
+    def control_step(self, hand_id, pos, speed, fields=SUB_CMD_GET_POS | SUB_CMD_GET_CURRENT, remote_err=None):
+        """Set pos and speed of all fingers and read back fields in one transaction, returns (err, state)"""
+        try:
+            sub_cmd = SUB_CMD_SET_SPEED | SUB_CMD_SET_POS | _state_fields(fields)
+        except KeyError:
+            return HAND_RESP_DATA_INVALID, None
+        (request, _), (response, get_slices) = _custom_layout(sub_cmd)
+
+        buffers = self._control_buffers.get((hand_id, sub_cmd))
+        if buffers is None:
+            request_buf = bytearray(request.size)
+            buffers = (memoryview(request_buf), bytearray(max(response.size, 1)), HandState())
+            self._control_buffers[(hand_id, sub_cmd)] = buffers
+        data, out, state = buffers
+
+        try:
+            request.pack_into(data, 0, sub_cmd, *speed, *pos)
+        except (TypeError, struct.error):
+            return HAND_RESP_DATA_INVALID, state
+
+        err = self._transact(hand_id, HAND_CMD_SET_CUSTOM, data, out, remote_err)
+        if err != HAND_RESP_SUCCESS or response.size == 0:
+            return err, state
+        if len(out) < response.size:
+            return HAND_RESP_DATA_INVALID, state
+
+        _unpack_state(response, get_slices, out, state, sub_cmd)
+        return err, state
+
     def HAND_SetSelfTestLevel(self, hand_id, self_test_level, remote_err):
         if not match_data_type(self_test_level, UINT8_T):
             return HAND_RESP_DATA_INVALID
-        
-        data = bytearray(1)
-        data[0] = self_test_level
 
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_SET_SELF_TEST_LEVEL, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_SET_SELF_TEST_LEVEL, self.timeout, None, remote_err)
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_SET_SELF_TEST_LEVEL, (self_test_level,), remote_err)
         return err
 
     def HAND_SetBeepSwitch(self, hand_id, beep_on, remote_err):
         if not match_data_type(beep_on, UINT8_T):
             return HAND_RESP_DATA_INVALID
-        
-        data = bytearray(1)
-        data[0] = beep_on
 
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_SET_BEEP_SWITCH, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_SET_BEEP_SWITCH, self.timeout, None, remote_err)
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_SET_BEEP_SWITCH, (beep_on,), remote_err)
         return err
 
     def HAND_Beep(self, hand_id, duration, remote_err):
         if not match_data_type(duration, UINT16_T):
             return HAND_RESP_DATA_INVALID
-        
-        data = bytearray(2)
-        data[0] = duration & 0xFF
-        data[1] = (duration >> 8) & 0xFF
 
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_BEEP, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_BEEP, self.timeout, None, remote_err)
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_BEEP, (duration,), remote_err)
         return err
 
     def HAND_SetButtonPressedCnt(self, hand_id, pressed_cnt, remote_err):
         if not match_data_type(pressed_cnt, UINT8_T):
             return HAND_RESP_DATA_INVALID
-        
-        data = bytearray(1)
-        data[0] = pressed_cnt
 
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_SET_BUTTON_PRESSED_CNT, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_SET_BUTTON_PRESSED_CNT, self.timeout, None, remote_err)
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_SET_BUTTON_PRESSED_CNT, (pressed_cnt,), remote_err)
         return err
 
     def HAND_StartInit(self, hand_id, remote_err):
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_START_INIT, None, 0)
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_START_INIT, self.timeout, None, remote_err)
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_START_INIT, (), remote_err)
         return err
 
     def HAND_SetManufactureData(self, hand_id, key, sub_model, hw_revision, serial_number, customer_tag, remote_err):
-        data = bytearray(28)
-        data[0:2] = key
-        data[2] = sub_model
-        data[3] = hw_revision
-        data[4:20] = serial_number
-        data[20:28] = customer_tag
-
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_SET_MANUFACTURE_DATA, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_SET_MANUFACTURE_DATA, self.timeout, None, remote_err)
+        values = (bytes(key), sub_model, hw_revision, bytes(serial_number), bytes(customer_tag))
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_SET_MANUFACTURE_DATA, values, remote_err)
         return err
 
-    def HAND_SetFingerSpeedCtrlParams(self, hand_id, brake_distance, accel_distance, speed_ratio, remote_err):
+    def HAND_SetFingerSpeedCtrlParams(self, hand_id, brake_distance, accel_distance, speed_ratio, remote_err, force=False):
         if not match_data_type(brake_distance, UINT16_T) or not match_data_type(accel_distance, UINT16_T):
             return HAND_RESP_DATA_INVALID
-        
-        data = bytearray(8)
-        data[0] = brake_distance & 0xFF
-        data[1] = brake_distance >> 8 & 0xFF
-        data[2] = accel_distance & 0xFF
-        data[3] = accel_distance >> 8 & 0xFF
-        data[4:8] = struct.pack('f', speed_ratio)
-
-        err = self.HAND_SendCmd(hand_id, HAND_CMD_SET_SPEED_CTRL_PARAMS, data, len(data))
-        if err == HAND_RESP_SUCCESS:
-            err = self.HAND_GetResponse(hand_id, HAND_CMD_SET_SPEED_CTRL_PARAMS, self.timeout, None, remote_err)
+
+        values = (brake_distance, accel_distance, speed_ratio)
+        err, _ = self.HAND_Command(hand_id, HAND_CMD_SET_SPEED_CTRL_PARAMS, values, remote_err, force)
         return err
@@ -0,0 +1,208 @@
+import heapq
+import threading
+import time
+
+from OHandSerialAPI import (
+    CAN_FRAME_DATA_SIZE,
+    HAND_CMD_LAYOUTS,
+    HAND_RESP_SUCCESS,
+    max_response_size,
+    response_frames,
+)
+
+DEFAULT_UTILIZATION = 0.7  # Bus share the polls may use, the rest is left to commands and retries
+
+
+def can_frame_bits(nb_data):
+    """Worst case bits of a standard (11 bits id) CAN frame with nb_data bytes, bit stuffing and interframe space included"""
+    return 8 * nb_data + 47 + (34 + 8 * nb_data - 1) // 4
+
+
+def packet_bits(nb_data):
+    """Worst case bits of a protocol packet (7 bytes of framing + nb_data) split into CAN frames"""
+    length = 7 + nb_data
+    full, last = divmod(length, CAN_FRAME_DATA_SIZE)
+    bits = full * can_frame_bits(CAN_FRAME_DATA_SIZE)
+    if last:
+        bits += can_frame_bits(last)
+    return bits
+
+
+def command_bits(cmd, data):
+    """Worst case bus bits of a command and its response"""
+    return packet_bits(len(data)) + packet_bits(max_response_size(cmd))
+
+
+class _Poll:
+    """A periodic command of a hand"""
+
+    def __init__(self, hand_id, cmd, values, rate_hz):
+        self.hand_id = hand_id
+        self.cmd = cmd
+        self.values = tuple(values)
+        request = HAND_CMD_LAYOUTS[cmd][0]
+        self.data = request.pack(*values) if request is not None else b""
+        self.period = 1.0 / rate_hz
+        self.bits = command_bits(cmd, self.data)
+        self.frames = response_frames(cmd)
+        self.release = 0.0  # time.perf_counter() from which the poll may run
+        self.deadline = 0.0  # Poll must complete before, next release
+        self.count = 0
+        self.errors = 0
+        self.missed = 0  # Deadlines missed, late completions and skipped periods
+
+    def __lt__(self, other):
+        return self.deadline < other.deadline
+
+
+class PollScheduler:
+    """
+    Runs periodic commands of several hands, each at its own rate, from a background thread.
+    Polls are admitted only while their worst case bus load fits in utilization of the bitrate.
+    Each hand has one command in flight at a time, chosen earliest deadline first. Different hands
+    are polled in parallel with HAND_SubmitCmd when the responses fit in one CAN frame, responses
+    of several frames would interleave on the bus and are polled one hand at a time.
+    The polls hold the hands and the bus turn with OHandSerialAPI.lock_hands(), the HAND_* commands of the
+    same API can run from other threads meanwhile. Pipelined requests of other threads must be sent under
+    lock_hands() as well, a bare HAND_SubmitCmd could take the response of a poll.
+    Results are published to the subscribers:
+
+        scheduler = PollScheduler(api, bitrate=1000000)
+        scheduler.add(0x02, HAND_CMD_GET_FINGER_POS_ALL, 200)
+        scheduler.add(0x02, HAND_CMD_GET_FINGER_CURRENT, 20, (finger_id,))
+        scheduler.add(0x02, HAND_CMD_GET_BATTERY_VOLTAGE, 1)
+        scheduler.subscribe(callback)  # callback(hand_id, cmd, values, err, result, t)
+        scheduler.start()
+
+    result is the response unpacked with HAND_CMD_LAYOUTS, or the raw response bytes for
+    content dependent layouts, or the remote error code when err is HAND_RESP_HAND_ERROR.
+    """
+
+    def __init__(self, api, bitrate=1000000, utilization=DEFAULT_UTILIZATION):
+        self.api = api
+        self.bitrate = bitrate
+        self.utilization = utilization
+        self._polls = []
+        self._queues = {}  # hand_id -> heap of _Poll by deadline
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+    def load(self):
+        """Worst case share of the bus used by the polls"""
+        return sum(poll.bits / poll.period for poll in self._polls) / self.bitrate
+
+    def add(self, hand_id, cmd, rate_hz, values=()):
+        """Poll cmd (with request values) of hand_id at rate_hz, returns False if the bus can't fit it"""
+        poll = _Poll(hand_id, cmd, values, rate_hz)
+        with self._lock:
+            if self.load() + poll.bits / poll.period / self.bitrate > self.utilization:
+                return False
+            poll.release = time.perf_counter()
+            poll.deadline = poll.release + poll.period
+            self._polls.append(poll)
+            heapq.heappush(self._queues.setdefault(hand_id, []), poll)
+        return True
+
+    def remove(self, hand_id, cmd, values=()):
+        with self._lock:
+            values = tuple(values)
+            self._polls = [p for p in self._polls if (p.hand_id, p.cmd, p.values) != (hand_id, cmd, values)]
+            queue = [p for p in self._queues.get(hand_id, []) if (p.cmd, p.values) != (cmd, values)]
+            heapq.heapify(queue)
+            self._queues[hand_id] = queue
+
+    def subscribe(self, callback, hand_id=None, cmd=None):
+        """callback(hand_id, cmd, values, err, result, t) for the results of hand_id and cmd, None for all"""
+        self._subscribers.append((callback, hand_id, cmd))
+
+    def unsubscribe(self, callback):
+        self._subscribers = [s for s in self._subscribers if s[0] is not callback]
+
+    def stats(self):
+        """[(hand_id, cmd, values, rate_hz, count, errors, missed)] of all polls"""
+        return [(p.hand_id, p.cmd, p.values, 1.0 / p.period, p.count, p.errors, p.missed) for p in self._polls]
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="PollScheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _run(self):
+        while self._running:
+            if not self.run_once():
+                time.sleep(max(0.0, min(self._next_release() - time.perf_counter(), 0.01)))
+
+    def _next_release(self):
+        with self._lock:
+            releases = [queue[0].release for queue in self._queues.values() if queue]
+        return min(releases) if releases else time.perf_counter() + 0.01
+
+    def run_once(self):
+        """Run the due poll with the earliest deadline of every hand, returns False if none was due"""
+        now = time.perf_counter()
+        batch = []
+        with self._lock:
+            for queue in self._queues.values():
+                if queue and queue[0].release <= now:
+                    batch.append(heapq.heappop(queue))
+        if not batch:
+            return False
+
+        single = [p for p in batch if p.frames == 1]
+        groups = ([single] if single else []) + [[p] for p in sorted(batch) if p.frames > 1]
+        for group in groups:
+            with self.api.lock_hands([p.hand_id for p in group], [p.cmd for p in group]):
+                futures = [self.api.HAND_SubmitCmd(p.hand_id, p.cmd, p.data, len(p.data)) for p in group]
+                results = self.api.HAND_WaitCmds(futures)
+            done = time.perf_counter()
+
+            for poll, (err, resp_bytes) in zip(group, results):
+                self._publish(poll, err, resp_bytes, done)
+                self._reschedule(poll, done)
+        return True
+
+    def _reschedule(self, poll, done):
+        if done > poll.deadline:
+            poll.missed += 1
+        poll.release = poll.deadline
+        if done > poll.release + poll.period:
+            # Periods skipped while late, restart from now instead of bursting to catch up
+            skipped = int((done - poll.release) / poll.period)
+            poll.missed += skipped
+            poll.release += skipped * poll.period
+        poll.deadline = poll.release + poll.period
+
+        with self._lock:
+            if poll in self._polls:
+                heapq.heappush(self._queues[poll.hand_id], poll)
+
+    def _publish(self, poll, err, resp_bytes, t):
+        poll.count += 1
+        result = resp_bytes
+        if err == HAND_RESP_SUCCESS:
+            response = HAND_CMD_LAYOUTS[poll.cmd][1]
+            if response is not None and len(resp_bytes) == response.size:
+                result = response.unpack(resp_bytes)
+        else:
+            poll.errors += 1
+
+        for callback, hand_id, cmd in self._subscribers:
+            if (hand_id is None or hand_id == poll.hand_id) and (cmd is None or cmd == poll.cmd):
+                callback(poll.hand_id, poll.cmd, poll.values, err, result, t)
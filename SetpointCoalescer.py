@@ -0,0 +1,240 @@
+import threading
+from contextlib import contextmanager
+
+from OHandProtocol import (
+    HAND_CMD_CALIBRATE,
+    HAND_CMD_FINGER_STOP,
+    HAND_CMD_GET_FINGER_ANGLE_ALL,
+    HAND_CMD_GET_FINGER_POS_ABS_ALL,
+    HAND_CMD_GET_FINGER_POS_ALL,
+    HAND_CMD_LAYOUTS,
+    HAND_CMD_RESET,
+    HAND_CMD_SET_CALI_DATA,
+    HAND_CMD_SET_CUSTOM,
+    HAND_CMD_SET_FINGER_ANGLE,
+    HAND_CMD_SET_FINGER_ANGLE_ALL,
+    HAND_CMD_SET_FINGER_POS,
+    HAND_CMD_SET_FINGER_POS_ABS,
+    HAND_CMD_SET_FINGER_POS_ABS_ALL,
+    HAND_CMD_SET_FINGER_POS_ALL,
+    HAND_CMD_SET_THUMB_ROOT_POS,
+    HAND_RESP_SUCCESS,
+    MAX_MOTOR_CNT,
+    _all_layout,
+)
+
+# Per-finger set command -> (*_ALL set command it is merged into, *_ALL get command reading the targets, value type)
+HAND_COALESCED_CMDS = {
+    HAND_CMD_SET_FINGER_POS_ABS: (HAND_CMD_SET_FINGER_POS_ABS_ALL, HAND_CMD_GET_FINGER_POS_ABS_ALL, "H"),
+    HAND_CMD_SET_FINGER_POS: (HAND_CMD_SET_FINGER_POS_ALL, HAND_CMD_GET_FINGER_POS_ALL, "H"),
+    HAND_CMD_SET_FINGER_ANGLE: (HAND_CMD_SET_FINGER_ANGLE_ALL, HAND_CMD_GET_FINGER_ANGLE_ALL, "h"),
+}
+# Commands after which the last known targets of the hand can't be trusted any more
+HAND_TARGET_INVALIDATE_CMDS = frozenset(
+    {
+        HAND_CMD_RESET,
+        HAND_CMD_CALIBRATE,
+        HAND_CMD_SET_CALI_DATA,
+        HAND_CMD_FINGER_STOP,
+        HAND_CMD_SET_THUMB_ROOT_POS,
+        HAND_CMD_SET_CUSTOM,
+    }
+)
+COALESCE_WINDOW = 5  # ms, default window of HAND_SetCoalesceWindow()
+
+
+class _Batch:
+    """Per-finger setpoints of a hand waiting to be merged, see OHandSerialAPI.batch()"""
+
+    def __init__(self, hand_id):
+        self.hand_id = hand_id
+        self.depth = 0  # Nested batch() blocks
+        self.pending = {}  # Per-finger set command -> {finger_id: (value, speed)}, in first use order
+        self.timer = None  # threading.Timer flushing the window, None in batch() blocks
+        self.lock = threading.RLock()  # Held while the setpoints are sent, keeps them ahead of later commands
+        self.sending = False
+        self.err = HAND_RESP_SUCCESS  # Result of the last flush
+        self.remote_err = []  # Remote errors of the last flush
+
+
+class SetpointCoalescer:
+    """Setpoint coalescing of OHandSerialAPI, see batch() and HAND_SetCoalesceWindow()"""
+
+    def HAND_SetCoalesceWindow(self, window=COALESCE_WINDOW):
+        """Merge the per-finger setpoints sent within window ms into one *_ALL transaction, 0 to disable"""
+        with self._batch_lock:
+            self._coalesce_window = window
+            if self._targets is None:
+                self._targets = {}
+            hand_ids = list(self._batches)
+        if not window:
+            for hand_id in hand_ids:
+                self._flush(hand_id, True)
+
+    @contextmanager
+    def batch(self, hand_id):
+        """Merge the per-finger setpoints to hand_id in the block, sent at its exit, result in batch.err"""
+        with self._batch_lock:
+            if self._targets is None:
+                self._targets = {}
+            batch = self._batches.get(hand_id)
+            if batch is None:
+                batch = self._batches[hand_id] = _Batch(hand_id)
+            batch.depth += 1
+        try:
+            yield batch
+        finally:
+            with self._batch_lock:
+                batch.depth -= 1
+                depth = batch.depth
+            if depth == 0:
+                self._flush(hand_id)
+
+    def HAND_FlushSetpoints(self, hand_id, remote_err=None):
+        """Send the setpoints of hand_id being coalesced now, or return the error of an earlier flush"""
+        err, errors = self._flush(hand_id)
+        with self._batch_lock:
+            deferred = self._flush_errors.pop(hand_id, None)
+        if err == HAND_RESP_SUCCESS and deferred is not None:
+            err, errors = deferred
+        if remote_err is not None:
+            remote_err.extend(errors)
+        return err
+
+    def _coalesce(self, hand_id, cmd, values, remote_err):
+        """Add a per-finger setpoint to the batch of hand_id, returns the error of a flush not reported yet"""
+        finger_id, value, speed = values
+        with self._batch_lock:
+            batch = self._batches.get(hand_id)
+            if batch is None:
+                batch = self._batches[hand_id] = _Batch(hand_id)
+            if batch.depth == 0 and batch.timer is None:
+                batch.timer = threading.Timer(self._coalesce_window / 1000.0, self._flush, (hand_id, True))
+                batch.timer.daemon = True
+                batch.timer.start()
+            # The last setpoint of a finger wins, also over one of another kind (position vs angle)
+            for pending in batch.pending.values():
+                pending.pop(finger_id, None)
+            batch.pending.setdefault(cmd, {})[finger_id] = (value, speed)
+            err, errors = self._flush_errors.pop(hand_id, (HAND_RESP_SUCCESS, ()))
+        if remote_err is not None:
+            remote_err.extend(errors)
+        return err
+
+    def _flush_before(self, hand_id):
+        """Send the setpoints merged so far before another command to hand_id, keeping the command order"""
+        self._flush(hand_id, True)
+
+    def _flush(self, hand_id, defer=False):
+        """Send the setpoints of hand_id merged so far, returns (err, remote_err), kept with defer"""
+        while True:
+            with self._batch_lock:
+                batch = self._batches.get(hand_id)
+            if batch is None:
+                return HAND_RESP_SUCCESS, []
+            with batch.lock:
+                with self._batch_lock:
+                    if self._batches.get(hand_id) is not batch:
+                        continue  # Flushed and replaced while waiting for the lock
+                    if batch.sending:
+                        return HAND_RESP_SUCCESS, []  # A command sending the setpoints of this flush
+                    if batch.timer is not None:
+                        batch.timer.cancel()
+                        batch.timer = None
+                    pending, batch.pending = batch.pending, {}
+                    batch.sending = True
+
+                err = HAND_RESP_SUCCESS
+                remote_err = []
+                try:
+                    for cmd, setpoints in pending.items():
+                        if setpoints:
+                            result = self._send_setpoints(hand_id, cmd, setpoints, remote_err)
+                            if result != HAND_RESP_SUCCESS:
+                                err = result
+                finally:
+                    with self._batch_lock:
+                        batch.sending = False
+                        batch.err, batch.remote_err = err, remote_err
+                        if batch.depth == 0:
+                            if defer and err != HAND_RESP_SUCCESS:
+                                self._flush_errors[hand_id] = (err, remote_err)
+                            if not batch.pending:
+                                del self._batches[hand_id]
+                return err, remote_err
+
+    def _send_setpoints(self, hand_id, cmd, setpoints, remote_err):
+        """Setpoints {finger_id: (value, speed)} of cmd in one *_ALL transaction"""
+        set_all_cmd, get_all_cmd, value_type = HAND_COALESCED_CMDS[cmd]
+        targets = self._targets.get((hand_id, set_all_cmd)) or [None] * MAX_MOTOR_CNT
+        unknown = [i for i in range(MAX_MOTOR_CNT) if i not in setpoints and targets[i] is None]
+        if unknown and len(setpoints) < 3:
+            # Reading the targets first would cost as many transactions as sending the setpoints one by one
+            err = HAND_RESP_SUCCESS
+            for finger_id, (value, speed) in setpoints.items():
+                request = HAND_CMD_LAYOUTS[cmd][0]
+                result = self._transact(hand_id, cmd, request.pack(finger_id, value, speed), None, remote_err)
+                if result != HAND_RESP_SUCCESS:
+                    err = result
+            return err
+
+        if unknown:
+            err, _ = self.HAND_Command(hand_id, get_all_cmd, (), remote_err)
+            if err != HAND_RESP_SUCCESS:
+                return err
+            targets = self._targets[(hand_id, set_all_cmd)]
+
+        max_speed = max(speed for _, speed in setpoints.values())
+        values = [0] * MAX_MOTOR_CNT
+        speeds = [0] * MAX_MOTOR_CNT
+        for finger_id in range(MAX_MOTOR_CNT):
+            if finger_id in setpoints:
+                values[finger_id], speeds[finger_id] = setpoints[finger_id]
+            else:
+                value, speed = targets[finger_id]
+                values[finger_id], speeds[finger_id] = value, max_speed if speed is None else speed
+        return self._set_all(hand_id, set_all_cmd, value_type, values, speeds, MAX_MOTOR_CNT, remote_err)
+
+    def _set_targets(self, hand_id, set_all_cmd, targets, moved=True):
+        """Record targets {finger_id: (value, speed)}, moved fingers lose their targets in other units"""
+        for other, _, _ in HAND_COALESCED_CMDS.values():
+            if other != set_all_cmd and not moved:
+                continue
+            known = self._targets.get((hand_id, other))
+            if known is None:
+                known = self._targets[(hand_id, other)] = [None] * MAX_MOTOR_CNT
+            for finger_id, target in targets.items():
+                known[finger_id] = target if other == set_all_cmd else None
+
+    def _track_targets(self, hand_id, cmd, data, out):
+        """Keep the last known targets of the hand from a successful transaction"""
+        if cmd in HAND_COALESCED_CMDS:
+            finger_id, value, speed = HAND_CMD_LAYOUTS[cmd][0].unpack_from(data)
+            if finger_id < MAX_MOTOR_CNT:
+                self._set_targets(hand_id, HAND_COALESCED_CMDS[cmd][0], {finger_id: (value, speed)})
+            return
+
+        for set_all_cmd, get_all_cmd, value_type in HAND_COALESCED_CMDS.values():
+            if cmd == set_all_cmd:
+                motor_cnt = len(data) // 3
+                records = _all_layout(motor_cnt, value_type).unpack_from(data)
+                self._set_targets(hand_id, cmd, {i: (records[2 * i], records[2 * i + 1]) for i in range(motor_cnt)})
+                return
+            if cmd == get_all_cmd:
+                targets = HAND_CMD_LAYOUTS[cmd][1].unpack_from(out)[:MAX_MOTOR_CNT]
+                known = self._targets.get((hand_id, set_all_cmd)) or [None] * MAX_MOTOR_CNT
+                # Keep the speeds of the targets that didn't change
+                self._set_targets(
+                    hand_id,
+                    set_all_cmd,
+                    {
+                        i: (value, known[i][1] if known[i] is not None and known[i][0] == value else None)
+                        for i, value in enumerate(targets)
+                    },
+                    moved=False,
+                )
+                return
+
+        if cmd in HAND_TARGET_INVALIDATE_CMDS:
+            for set_all_cmd, _, _ in HAND_COALESCED_CMDS.values():
+                self._targets.pop((hand_id, set_all_cmd), None)
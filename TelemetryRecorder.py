@@ -0,0 +1,153 @@
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # Checked when a recorder is created, the module can be imported without NumPy
+    np = None
+
+from OHandSerialAPI import (
+    HAND_CUSTOM_FORCE_CNT,
+    HAND_RESP_SUCCESS,
+    HAND_STATE_FIELDS,
+    MAX_MOTOR_CNT,
+    HandState,
+)
+
+# NumPy type and shape of each HandState field
+TELEMETRY_FIELD_TYPES = {
+    "pos": ("u2", (MAX_MOTOR_CNT,)),
+    "angle": ("i2", (MAX_MOTOR_CNT,)),
+    "current": ("u2", (MAX_MOTOR_CNT,)),
+    "force": ("u2", (HAND_CUSTOM_FORCE_CNT,)),
+    "status": ("u1", (MAX_MOTOR_CNT,)),
+}
+
+
+def telemetry_dtype(fields):
+    """Structured dtype of a sample: t (time.perf_counter() seconds) and the fields"""
+    if np is None:
+        raise ImportError("NumPy is required by TelemetryRecorder, pip install numpy")
+    return np.dtype([("t", "f8")] + [(name,) + TELEMETRY_FIELD_TYPES[name] for name in fields])
+
+
+class TelemetryRecorder:
+    """
+    Polls hands at rate_hz from a background thread and records timestamped samples into preallocated
+    NumPy structured ring buffers, one per hand and one row per sample. Each poll is a single read_state()
+    round trip, a transaction holding the hand and the bus turn like any HAND_* command: other threads may use
+    the API meanwhile, pipelined requests under OHandSerialAPI.lock_hands() only.
+    Memory is fixed at capacity rows per hand, the oldest samples are overwritten.
+    The buffers have one spare row, the row being written is never part of the recorded samples.
+
+        recorder = TelemetryRecorder(api, [0x02], rate_hz=100, capacity=360000)
+        recorder.start()
+        ...
+        old, new = recorder.segments(0x02)  # Zero-copy views, oldest first
+        recorder.stop()
+    """
+
+    def __init__(self, api, hand_ids, rate_hz=100, capacity=100000, fields=("pos", "angle", "current")):
+        self.api = api
+        self.hand_ids = list(hand_ids)
+        self.period = 1.0 / rate_hz
+        self.capacity = capacity
+        self.fields = tuple(fields)
+        self.dtype = telemetry_dtype(self.fields)
+        self._sub_cmd = 0
+        for name in self.fields:
+            self._sub_cmd |= HAND_STATE_FIELDS[name]
+
+        self._slots = capacity + 1
+        self._buffers = {hand_id: np.zeros(self._slots, self.dtype) for hand_id in self.hand_ids}
+        # Per field column views of the buffers, written row by row
+        self._columns = {
+            hand_id: [(name, buffer[name]) for name in self.fields] for hand_id, buffer in self._buffers.items()
+        }
+        self._times = {hand_id: buffer["t"] for hand_id, buffer in self._buffers.items()}
+        self._states = {hand_id: HandState() for hand_id in self.hand_ids}
+        self.count = dict.fromkeys(self.hand_ids, 0)  # Samples recorded since start, including overwritten ones
+        self.errors = dict.fromkeys(self.hand_ids, 0)  # Failed polls, not recorded
+        self.overruns = 0  # Polls skipped because the previous one ran past its period
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="TelemetryRecorder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _run(self):
+        deadline = time.perf_counter()
+        while self._running:
+            self.poll()
+            # Absolute deadlines, a slow poll doesn't shift the following ones
+            deadline += self.period
+            now = time.perf_counter()
+            if now > deadline:
+                missed = int((now - deadline) / self.period) + 1
+                self.overruns += missed
+                deadline += missed * self.period
+            time.sleep(max(0.0, deadline - time.perf_counter()))
+
+    def poll(self):
+        """Read and record one sample of every hand, called by the polling thread"""
+        for hand_id in self.hand_ids:
+            state = self._states[hand_id]
+            err, _ = self.api.read_state(hand_id, self._sub_cmd, state)
+            t = time.perf_counter()
+            if err != HAND_RESP_SUCCESS:
+                self.errors[hand_id] += 1
+                continue
+
+            row = self.count[hand_id] % self._slots
+            self._times[hand_id][row] = t
+            for name, column in self._columns[hand_id]:
+                column[row] = getattr(state, name)
+            self.count[hand_id] += 1
+
+    def segments(self, hand_id, last=None):
+        """
+        The recorded samples of hand_id (at most the last ones) as views of the ring buffer, no copy.
+        Returns (older, newer) in time order, older is empty unless the samples wrap around the buffer end.
+        The views are live, while recording new samples overwrite the oldest rows, see samples() for a stable copy.
+        """
+        return self._segments(hand_id, self.count[hand_id], last)
+
+    def _segments(self, hand_id, count, last):
+        buffer = self._buffers[hand_id]
+        size = min(count, self.capacity)
+        if last is not None:
+            size = min(size, last)
+        end = count % self._slots
+        start = end - size
+        if start >= 0:
+            return buffer[:0], buffer[start:end]
+        return buffer[start:], buffer[:end]
+
+    def samples(self, hand_id, last=None):
+        """Copy of the recorded samples of hand_id in time order, without the rows overwritten while copying"""
+        count = self.count[hand_id]
+        samples = np.concatenate(self._segments(hand_id, count, last))
+        # Each sample recorded meanwhile, and the one being written, replaced the oldest row left
+        overwritten = self.count[hand_id] - count + len(samples) - self.capacity
+        return samples[overwritten:] if overwritten > 0 else samples
+
+    def dropped(self, hand_id):
+        """Samples overwritten because the buffer was full"""
+        return max(0, self.count[hand_id] - self.capacity)
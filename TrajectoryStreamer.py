@@ -0,0 +1,171 @@
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # Checked when a trajectory is encoded, the module can be imported without NumPy
+    np = None
+
+from OHandSerialAPI import (
+    ALL_RECORD_DTYPES,
+    HAND_CMD_SET_FINGER_ANGLE_ALL,
+    HAND_CMD_SET_FINGER_POS_ABS_ALL,
+    HAND_CMD_SET_FINGER_POS_ALL,
+    HAND_RESP_SUCCESS,
+    MAX_MOTOR_CNT,
+)
+
+# Value type of the streamable *_ALL set commands
+TRAJECTORY_VALUE_TYPES = {
+    HAND_CMD_SET_FINGER_POS_ABS_ALL: "H",
+    HAND_CMD_SET_FINGER_POS_ALL: "H",
+    HAND_CMD_SET_FINGER_ANGLE_ALL: "h",
+}
+TRAJECTORY_LATE = 0.001  # s past its deadline from which a frame counts as late
+TRAJECTORY_SPIN = 0.001  # s before a deadline spent busy waiting instead of sleeping, sleep overshoots
+
+
+def encode_trajectory(trajectory, speed, cmd=HAND_CMD_SET_FINGER_POS_ALL):
+    """
+    Request data of cmd for every row of trajectory (N x motor_cnt), speed is a scalar,
+    one value per finger or per sample. Returns a list of bytes, None if the values are out of range.
+    """
+    if np is None:
+        raise ImportError("NumPy is required by TrajectoryStreamer, pip install numpy")
+    trajectory = np.asarray(trajectory)
+    if trajectory.ndim != 2 or not 0 < trajectory.shape[1] <= MAX_MOTOR_CNT or trajectory.dtype.kind not in "iu":
+        return None
+    speed = np.broadcast_to(np.asarray(speed), trajectory.shape)
+    dtype = ALL_RECORD_DTYPES[TRAJECTORY_VALUE_TYPES[cmd]]
+    value_range = np.iinfo(dtype["value"])
+    if (
+        speed.dtype.kind not in "iu"
+        or trajectory.min() < value_range.min
+        or trajectory.max() > value_range.max
+        or speed.min() < 0
+        or speed.max() > 0xFF
+    ):
+        return None
+
+    records = np.empty(trajectory.shape, dtype)
+    records["value"] = trajectory
+    records["speed"] = speed
+    row_size = records.itemsize * trajectory.shape[1]
+    data = records.tobytes()
+    return [data[start : start + row_size] for start in range(0, len(data), row_size)]
+
+
+class TrajectoryStreamer:
+    """
+    Plays a trajectory, one row of finger positions (or angles) per sample, on a hand at rate_hz.
+    All packets are encoded up front and sent on absolute deadlines of time.perf_counter(), a slow
+    send doesn't shift the following ones. When a frame is due while the previous one is still being
+    sent, the stale frames are skipped and only the most recent due one is sent. The acknowledgement
+    of a frame is awaited until the next frame is due at the latest, a lost one doesn't hold up the stream.
+
+        streamer = TrajectoryStreamer(api, 0x02, positions, rate_hz=100, speed=255)
+        streamer.run()  # or start() ... wait()
+        print(streamer.stats())
+
+    jitter holds the send time minus the deadline of every frame in s, NaN for the skipped ones.
+    """
+
+    def __init__(self, api, hand_id, trajectory, rate_hz, speed=255, cmd=HAND_CMD_SET_FINGER_POS_ALL):
+        self.api = api
+        self.hand_id = hand_id
+        self.cmd = cmd
+        self.period = 1.0 / rate_hz
+        self.packets = encode_trajectory(trajectory, speed, cmd)
+        if self.packets is None:
+            raise ValueError("trajectory or speed out of range")
+
+        self.jitter = np.full(len(self.packets), np.nan)
+        self.sent = 0
+        self.skipped = 0  # Stale frames not sent
+        self.late = 0  # Frames sent more than TRAJECTORY_LATE past their deadline
+        self.errors = 0  # Frames the hand answered with an error, or the last one unacknowledged
+        self.unacked = 0  # Frames whose acknowledgement hadn't arrived when the next frame was due
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self.run, name="TrajectoryStreamer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop playback before the end of the trajectory"""
+        self._running = False
+        self.wait()
+
+    def wait(self):
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def run(self):
+        """Play the trajectory from now on, returns stats()"""
+        self._running = True
+        count = len(self.packets)
+        start = time.perf_counter()
+        previous = None
+        index = 0
+        while self._running and index < count:
+            deadline = start + index * self.period
+            if previous is not None:
+                # One request per (hand, cmd) in flight, the previous one is dropped when still unanswered
+                self._check(previous, max(0.0, deadline - TRAJECTORY_SPIN - time.perf_counter()) * 1000)
+                previous = None
+            remaining = deadline - time.perf_counter()
+            if remaining > TRAJECTORY_SPIN:
+                time.sleep(remaining - TRAJECTORY_SPIN)
+            while time.perf_counter() < deadline:
+                pass
+
+            now = time.perf_counter()
+            # Frames whose successor is already due are stale
+            due = min(int((now - start) / self.period), count - 1)
+            if due > index:
+                self.skipped += due - index
+                index = due
+                deadline = start + index * self.period
+
+            packet = self.packets[index]
+            self.jitter[index] = now - deadline
+            if now - deadline > TRAJECTORY_LATE:
+                self.late += 1
+            previous = self.api.HAND_SubmitCmd(self.hand_id, self.cmd, packet, len(packet))
+            self.sent += 1
+            index += 1
+
+        if previous is not None:
+            self._check(previous)
+        self._running = False
+        return self.stats()
+
+    def _check(self, future, time_out=None):
+        """Count the acknowledgement of future, awaited up to time_out ms, until its timeout when None"""
+        result = self.api.HAND_WaitCmds([future], time_out)[0]
+        if result is None:
+            self.api.HAND_CancelCmd(future)
+            self.unacked += 1
+        elif result[0] != HAND_RESP_SUCCESS:
+            self.errors += 1
+
+    def stats(self):
+        """Counters and jitter distribution of the frames sent, jitter in us"""
+        jitter = self.jitter[~np.isnan(self.jitter)] * 1e6
+        stats = {"sent": self.sent, "skipped": self.skipped, "late": self.late, "errors": self.errors, "unacked": self.unacked}
+        if len(jitter):
+            p50, p90, p99, p_max = np.percentile(jitter, (50, 90, 99, 100)).tolist()
+            stats.update(jitter_mean=float(jitter.mean()), jitter_p50=p50, jitter_p90=p90, jitter_p99=p99, jitter_max=p_max)
+        return stats
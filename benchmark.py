@@ -0,0 +1,384 @@
+"""
+Micro benchmarks for OHandSerialAPI, no CAN hardware needed.
+
+Usage: python benchmark.py
+"""
+import time
+import tracemalloc
+
+try:
+    import can
+    import can_interface
+except ImportError:  # python-can not installed, only the API side of the send path is measured
+    can = None
+
+from OHandSerialAPI import (
+    HAND_CMD_GET_FINGER_ANGLE_ALL,
+    HAND_CMD_GET_FINGER_POS_ALL,
+    HAND_CMD_GET_USAGE_STAT,
+    HAND_CMD_LAYOUTS,
+    HAND_CMD_SET_FINGER_POS_ALL,
+    HAND_PROTOCOL_UART,
+    MAX_PROTOCOL_DATA_SIZE,
+    MAX_MOTOR_CNT,
+    ALL_RECORD_DTYPES,
+    OHandSerialAPI,
+    np,
+)
+
+ADDRESS_MASTER = 0x01
+HAND_ID = 0x02
+
+
+def build_packet(dst, src, cmd, payload):
+    packet = bytearray([0x55, 0xAA, dst, src, cmd, len(payload)]) + bytes(payload)
+    lrc = 0
+    for byte in packet[2:]:
+        lrc ^= byte
+    packet.append(lrc)
+    return bytes(packet)
+
+
+def can_frames(packet):
+    return [packet[i : i + 8] for i in range(0, len(packet), 8)]
+
+
+class _LegacyDecoder:
+    """Copy of the original string-state, byte by byte decoder, kept as reference."""
+
+    def __init__(self, address_master):
+        self.address_master = address_master
+        self.packet_data = bytearray(MAX_PROTOCOL_DATA_SIZE + 5)
+        self.is_whole_packet = False
+        self.decode_state = "WAIT_ON_HEADER_0"
+        self.byte_count = 0
+
+    def HAND_OnData(self, data):
+        if self.is_whole_packet:
+            return
+
+        if self.decode_state == "WAIT_ON_HEADER_0":
+            if data == 0x55:
+                self.decode_state = "WAIT_ON_HEADER_1"
+        elif self.decode_state == "WAIT_ON_HEADER_1":
+            if data == 0xAA:
+                self.decode_state = "WAIT_ON_ADDRESSED_NODE_ID"
+            else:
+                self.decode_state = "WAIT_ON_HEADER_0"
+        elif self.decode_state == "WAIT_ON_ADDRESSED_NODE_ID":
+            self.packet_data[0] = data
+            self.decode_state = "WAIT_ON_OWN_NODE_ID"
+        elif self.decode_state == "WAIT_ON_OWN_NODE_ID":
+            self.packet_data[1] = data
+            self.decode_state = "WAIT_ON_COMMAND_ID"
+        elif self.decode_state == "WAIT_ON_COMMAND_ID":
+            self.packet_data[2] = data
+            self.decode_state = "WAIT_ON_BYTECOUNT"
+        elif self.decode_state == "WAIT_ON_BYTECOUNT":
+            self.packet_data[3] = data
+            self.byte_count = data
+            if self.byte_count > MAX_PROTOCOL_DATA_SIZE:
+                self.decode_state = "WAIT_ON_HEADER_0"
+            elif self.byte_count > 0:
+                self.decode_state = "WAIT_ON_DATA"
+            else:
+                self.decode_state = "WAIT_ON_LRC"
+        elif self.decode_state == "WAIT_ON_DATA":
+            index = 4 + self.packet_data[3] - self.byte_count
+            self.packet_data[index] = data
+            self.byte_count -= 1
+            if self.byte_count == 0:
+                self.decode_state = "WAIT_ON_LRC"
+        elif self.decode_state == "WAIT_ON_LRC":
+            index = 4 + self.packet_data[3]
+            self.packet_data[index] = data
+            if self.packet_data[0] == self.address_master:
+                self.is_whole_packet = True
+            self.decode_state = "WAIT_ON_HEADER_0"
+
+
+def _report(name, count, unit, elapsed, baseline=None):
+    rate = count / elapsed
+    line = f"{name:<40} {rate:>14,.0f} {unit}/s"
+    if baseline:
+        line += f"  x{rate / baseline:.2f}"
+    print(line)
+    return rate
+
+
+def bench_decoder(packets=20000):
+    """Bytes per second of the legacy decoder vs. the integer-state decoder (per byte and per CAN frame)."""
+    packet = build_packet(ADDRESS_MASTER, HAND_ID, HAND_CMD_GET_FINGER_POS_ALL, bytes(range(4 * MAX_MOTOR_CNT)))
+    frames = can_frames(packet)
+    total = len(packet) * packets
+    print(f"decoder: {packets} packets of {len(packet)} bytes")
+
+    legacy = _LegacyDecoder(ADDRESS_MASTER)
+    start = time.perf_counter()
+    for _ in range(packets):
+        for frame in frames:
+            for byte in frame:
+                legacy.HAND_OnData(byte)
+        legacy.is_whole_packet = False
+    baseline = _report("legacy HAND_OnData", total, "bytes", time.perf_counter() - start)
+
+    api = OHandSerialAPI(None, HAND_PROTOCOL_UART, ADDRESS_MASTER, None)
+    start = time.perf_counter()
+    for _ in range(packets):
+        for frame in frames:
+            for byte in frame:
+                api.HAND_OnData(byte)
+        api.rx_queue.clear()
+    _report("HAND_OnData", total, "bytes", time.perf_counter() - start, baseline)
+
+    api = OHandSerialAPI(None, HAND_PROTOCOL_UART, ADDRESS_MASTER, None)
+    start = time.perf_counter()
+    for _ in range(packets):
+        for frame in frames:
+            api.HAND_OnDataBytes(frame)
+        api.rx_queue.clear()
+    _report("HAND_OnDataBytes (CAN frames)", total, "bytes", time.perf_counter() - start, baseline)
+
+    api = OHandSerialAPI(None, HAND_PROTOCOL_UART, ADDRESS_MASTER, None)
+    start = time.perf_counter()
+    for _ in range(packets):
+        api.HAND_OnDataBytes(packet)
+        api.rx_queue.clear()
+    _report("HAND_OnDataBytes (whole packet)", total, "bytes", time.perf_counter() - start, baseline)
+
+
+# Per-method codecs as they were before HAND_CMD_LAYOUTS, kept as reference
+def _legacy_decode_pos_all(out, target_pos, current_pos):
+    motor_cnt_ret = len(out) // (2 + 2)
+    for i in range(motor_cnt_ret):
+        target_pos[i] = out[2 * i] | (out[2 * i + 1] << 8)
+    for i in range(motor_cnt_ret):
+        current_pos[i] = out[2 * motor_cnt_ret + 2 * i] | (out[2 * motor_cnt_ret + 2 * i + 1] << 8)
+
+
+def _legacy_decode_angle_all(out, target_angle, current_angle):
+    motor_cnt_ret = len(out) // (2 + 2)
+    for i in range(motor_cnt_ret):
+        target_angle[i] = int.from_bytes(out[2 * i : 2 * i + 2], byteorder="little", signed=True)
+    for i in range(motor_cnt_ret):
+        current_angle[i] = int.from_bytes(
+            out[2 * motor_cnt_ret + 2 * i : 2 * motor_cnt_ret + 2 * i + 2], byteorder="little", signed=True
+        )
+
+
+def _legacy_decode_usage_stat(out, total_use_time, total_open_times):
+    total_use_time[0] = out[0] | (out[1] << 8) | (out[2] << 16) | (out[3] << 24)
+    for i in range(MAX_MOTOR_CNT):
+        index = 4 + i * 4
+        total_open_times[i] = out[index] | (out[index + 1] << 8) | (out[index + 2] << 16) | (out[index + 3] << 24)
+
+
+def _legacy_encode_pos_all(pos, speed, motor_cnt):
+    data = bytearray(3 * motor_cnt)
+    p_data = 0
+    for i in range(motor_cnt):
+        data[p_data] = pos[i] & 0xFF
+        data[p_data + 1] = (pos[i] >> 8) & 0xFF
+        data[p_data + 2] = speed[i]
+        p_data += 3
+    return data
+
+
+def _layout_decode_all(layout, out, target, current):
+    values = layout.unpack_from(out)
+    target[:MAX_MOTOR_CNT] = values[:MAX_MOTOR_CNT]
+    current[:MAX_MOTOR_CNT] = values[MAX_MOTOR_CNT:]
+
+
+def _layout_decode_usage_stat(layout, out, total_use_time, total_open_times):
+    values = layout.unpack_from(out)
+    total_use_time[0] = values[0]
+    total_open_times[:MAX_MOTOR_CNT] = values[1:]
+
+
+def _layout_encode_pos_all(layout, pos, speed, motor_cnt):
+    records = [0] * (2 * motor_cnt)
+    records[0::2] = pos[:motor_cnt]
+    records[1::2] = speed[:motor_cnt]
+    return layout.pack(*records)
+
+
+def _legacy_send_cmd(api, addr, cmd, data, nb_data):
+    """HAND_SendCmd before the preallocated frame buffers, kept as reference"""
+    send_buf = bytearray(7 + nb_data)
+    send_buf[0] = 0x55
+    send_buf[1] = 0xAA
+    send_buf[2] = addr
+    send_buf[3] = api.address_master
+    send_buf[4] = cmd
+    send_buf[5] = nb_data
+    if data is not None:
+        send_buf[6 : 6 + nb_data] = data
+    lrc = 0
+    for i in range(2, 6 + nb_data):
+        lrc ^= send_buf[i]
+    send_buf[6 + nb_data] = lrc
+    return api.send_data_impl(addr, send_buf, len(send_buf), api.private_data)
+
+
+def _legacy_send_data(addr, data, length, context):
+    """can_interface.send_data_impl before recycling the messages, without printing"""
+    for i in range(0, length, 8):
+        current_size = min(8, length - i)
+        context.send(can.Message(arbitration_id=addr, data=data[i : i + current_size], is_extended_id=False))
+    return 0
+
+
+class _NullBus:
+    def send(self, msg):
+        pass
+
+
+def _null_send(addr, data, length, context):
+    return 0
+
+
+def _alloc_per_call(func, loops):
+    """Average bytes allocated on top of the live heap by one call, measured with tracemalloc"""
+    func()  # Warm up caches
+    tracemalloc.start()
+    total = 0
+    for _ in range(loops):
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        func()
+        total += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return total / loops
+
+
+def bench_send(loops=2000):
+    """Bytes allocated per SET_FINGER_POS_ALL command by the old and the preallocated send path."""
+    print(f"send path: {loops} SET_FINGER_POS_ALL commands")
+    data = HAND_CMD_LAYOUTS[HAND_CMD_SET_FINGER_POS_ALL][0].pack(*([1000, 255] * MAX_MOTOR_CNT))
+    api = OHandSerialAPI(None, HAND_PROTOCOL_UART, ADDRESS_MASTER, _null_send)
+    api.HAND_SetTimerFunction(lambda: 0, lambda ms: None)
+
+    def legacy():
+        _legacy_send_cmd(api, HAND_ID, HAND_CMD_SET_FINGER_POS_ALL, data, len(data))
+
+    def current():
+        api.HAND_SendCmd(HAND_ID, HAND_CMD_SET_FINGER_POS_ALL, data, len(data))
+
+    cases = [("HAND_SendCmd", _null_send, _null_send)]
+    if can is None:
+        print("python-can not installed, can_interface.send_data_impl not measured")
+    else:
+        can_interface.PRINT_FRAMES = False
+        api.private_data = _NullBus()
+        cases.append(("HAND_SendCmd + send_data_impl", _legacy_send_data, can_interface.send_data_impl))
+
+    for name, legacy_send, send in cases:
+        api.send_data_impl = legacy_send
+        before = _alloc_per_call(legacy, loops)
+        api.send_data_impl = send
+        after = _alloc_per_call(current, loops)
+        print(f"{name:<40} {before:>8.0f} -> {after:.0f} bytes/command")
+
+
+def bench_metrics(loops=100000):
+    """Time per HAND_SendCmd without and with HAND_EnableMetrics() (send histogram and counters)."""
+    print(f"metrics: {loops} SET_FINGER_POS_ALL commands")
+    data = HAND_CMD_LAYOUTS[HAND_CMD_SET_FINGER_POS_ALL][0].pack(*([1000, 255] * MAX_MOTOR_CNT))
+    api = OHandSerialAPI(None, HAND_PROTOCOL_UART, ADDRESS_MASTER, _null_send)
+    api.HAND_SetTimerFunction(lambda: 0, lambda ms: None, lambda: time.perf_counter_ns() // 1000)
+    args = (HAND_ID, HAND_CMD_SET_FINGER_POS_ALL, data, len(data))
+
+    disabled = _time_calls(api.HAND_SendCmd, args, loops)
+    api.HAND_EnableMetrics()
+    enabled = _time_calls(api.HAND_SendCmd, args, loops)
+    print(f"{'HAND_SendCmd':<40} {disabled / loops * 1e6:>8.2f} -> {enabled / loops * 1e6:.2f} us/command")
+
+
+def _time_calls(func, args, loops):
+    start = time.perf_counter()
+    for _ in range(loops):
+        func(*args)
+    return time.perf_counter() - start
+
+
+def bench_codecs(loops=100000):
+    """Packets per second of the hand-rolled per-method codecs vs. the precompiled HAND_CMD_LAYOUTS structs."""
+    print(f"codecs: {loops} packets each")
+    pos_out = bytes(range(4 * MAX_MOTOR_CNT))
+    usage_out = bytes(range(4 + 4 * MAX_MOTOR_CNT))
+    target, current = [0] * MAX_MOTOR_CNT, [0] * MAX_MOTOR_CNT
+    pos, speed = [1000 * i for i in range(MAX_MOTOR_CNT)], [255] * MAX_MOTOR_CNT
+    pos_all_layout = HAND_CMD_LAYOUTS[HAND_CMD_GET_FINGER_POS_ALL][1]
+    angle_all_layout = HAND_CMD_LAYOUTS[HAND_CMD_GET_FINGER_ANGLE_ALL][1]
+    usage_layout = HAND_CMD_LAYOUTS[HAND_CMD_GET_USAGE_STAT][1]
+    set_pos_all_layout = HAND_CMD_LAYOUTS[HAND_CMD_SET_FINGER_POS_ALL][0]
+
+    cases = [
+        ("decode GET_FINGER_POS_ALL", _legacy_decode_pos_all, (pos_out, target, current),
+         _layout_decode_all, (pos_all_layout, pos_out, target, current)),
+        ("decode GET_FINGER_ANGLE_ALL", _legacy_decode_angle_all, (pos_out, target, current),
+         _layout_decode_all, (angle_all_layout, pos_out, target, current)),
+        ("decode GET_USAGE_STAT", _legacy_decode_usage_stat, (usage_out, [0], target),
+         _layout_decode_usage_stat, (usage_layout, usage_out, [0], target)),
+        ("encode SET_FINGER_POS_ALL", _legacy_encode_pos_all, (pos, speed, MAX_MOTOR_CNT),
+         _layout_encode_pos_all, (set_pos_all_layout, pos, speed, MAX_MOTOR_CNT)),
+    ]
+    for name, legacy, legacy_args, layout, layout_args in cases:
+        baseline = _report(f"legacy {name}", loops, "packets", _time_calls(legacy, legacy_args, loops))
+        _report(f"layout {name}", loops, "packets", _time_calls(layout, layout_args, loops), baseline)
+
+
+def _array_decode_all(out):
+    values = np.frombuffer(out, "<u2", 2 * MAX_MOTOR_CNT)
+    return values[:MAX_MOTOR_CNT], values[MAX_MOTOR_CNT:]
+
+
+def _array_encode_pos_all(pos, speed):
+    records = np.empty(len(pos), ALL_RECORD_DTYPES["H"])
+    records["value"] = pos
+    records["speed"] = speed
+    return records.tobytes()
+
+
+def _layout_decode_to_arrays(layout, out, target, current):
+    _layout_decode_all(layout, out, target, current)
+    return np.array(target, np.uint16), np.array(current, np.uint16)
+
+
+def _layout_encode_from_arrays(layout, pos, speed, motor_cnt):
+    return _layout_encode_pos_all(layout, pos.tolist(), speed.tolist(), motor_cnt)
+
+
+def bench_arrays(loops=100000):
+    """
+    Packets per second of the list based *_ALL codecs with the conversions array code needs around them,
+    vs. the NumPy codecs of the *AllArray methods.
+    """
+    if np is None:
+        print("arrays: NumPy not installed, skipped")
+        return
+    print(f"arrays: {loops} packets each")
+    pos_out = bytes(range(4 * MAX_MOTOR_CNT))
+    target, current = [0] * MAX_MOTOR_CNT, [0] * MAX_MOTOR_CNT
+    pos_array = np.array([1000 * i for i in range(MAX_MOTOR_CNT)], np.uint16)
+    speed_array = np.full(MAX_MOTOR_CNT, 255, np.uint8)
+    pos_all_layout = HAND_CMD_LAYOUTS[HAND_CMD_GET_FINGER_POS_ALL][1]
+    set_pos_all_layout = HAND_CMD_LAYOUTS[HAND_CMD_SET_FINGER_POS_ALL][0]
+
+    baseline = _report("list decode GET_FINGER_POS_ALL + np.array", loops, "packets",
+                       _time_calls(_layout_decode_to_arrays, (pos_all_layout, pos_out, target, current), loops))
+    _report("array decode GET_FINGER_POS_ALL", loops, "packets",
+            _time_calls(_array_decode_all, (pos_out,), loops), baseline)
+    baseline = _report("tolist + list encode SET_FINGER_POS_ALL", loops, "packets",
+                       _time_calls(_layout_encode_from_arrays, (set_pos_all_layout, pos_array, speed_array, MAX_MOTOR_CNT), loops))
+    _report("array encode SET_FINGER_POS_ALL", loops, "packets",
+            _time_calls(_array_encode_pos_all, (pos_array, speed_array), loops), baseline)
+
+
+if __name__ == "__main__":
+    bench_decoder()
+    bench_codecs()
+    bench_arrays()
+    bench_send()
+    bench_metrics()
@@ -104,8 +104,7 @@ def recv_data_impl(private_data):
             # 如果是发给主设备的消息，调用HAND_OnData处理
             if msg.arbitration_id == 0x01:  # ADDRESS_MASTER
                 if _api_instance:
-                    for byte in msg.data:
-                        _api_instance.HAND_OnData(byte)
+                    _api_instance.HAND_OnDataBytes(msg.data)
     except can.CanError as e:
         print(f"CAN接收错误: {e}")
     except Exception as e:
@@ -114,11 +113,16 @@ def recv_data_impl(private_data):
 # 时间相关函数
 _start_time = None
 def get_milli_seconds_impl():
-    """返回自程序启动以来的毫秒数"""
+    """返回自程序启动以来的毫秒数（单调时钟，不受系统时间调整影响）"""
+    return get_micro_seconds_impl() // 1000
+
+
+def get_micro_seconds_impl():
+    """返回自程序启动以来的微秒数（单调高精度时钟）"""
     global _start_time
     if _start_time is None:
-        _start_time = time.time() * 1000  # 初始化开始时间
-    return int(time.time() * 1000 - _start_time)
+        _start_time = time.perf_counter_ns()  # 初始化开始时间
+    return (time.perf_counter_ns() - _start_time) // 1000
 
 def delay_milli_seconds_impl(ms):
     """暂停执行指定的毫秒数"""
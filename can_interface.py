@@ -1,6 +1,38 @@
+import threading
 import time
+import weakref
 import can
 
+# 是否打印收发的每一帧，调试时打开；高频发送（如200Hz设定点）时打印会拖慢收发
+PRINT_FRAMES = False
+
+# 复用的发送消息按总线分开：总线 -> (发送锁, {(ID, 数据长度): 每帧一个(can.Message, 数据视图, 起始, 结束)})，避免每帧新建对象
+# 同一总线上的多个API实例共用这些消息，发送锁保证一个包的各帧拷贝并发送完前不被其他线程改写；总线释放后缓存随之释放
+_tx_caches = weakref.WeakKeyDictionary()
+_tx_caches_lock = threading.Lock()
+
+
+def _get_tx_cache(bus):
+    cache = _tx_caches.get(bus)
+    if cache is None:
+        with _tx_caches_lock:
+            cache = _tx_caches.get(bus)
+            if cache is None:
+                cache = _tx_caches[bus] = (threading.Lock(), {})
+    return cache
+
+
+def _get_tx_msgs(msgs_cache, addr, length):
+    msgs = msgs_cache.get((addr, length))
+    if msgs is None:
+        msgs = []
+        for i in range(0, length, 8):
+            msg = can.Message(arbitration_id=addr, data=bytearray(min(8, length - i)), is_extended_id=False)
+            msgs.append((msg, memoryview(msg.data), i, i + msg.dlc))
+        msgs_cache[(addr, length)] = msgs
+    return msgs
+
+
 # 发送数据函数（与OHandSerialAPI接口匹配）
 def send_data_impl(addr, data, length, context):
     """
@@ -18,16 +50,18 @@ def send_data_impl(addr, data, length, context):
         return 1
 
     try:
-        for i in range(0, length, 8):
-            current_size = min(8, length - i)
-            # 创建CAN消息
-            msg = can.Message(arbitration_id=addr, data=data[i : i + current_size], is_extended_id=False)
-            # 发送消息
-            can_interface.send(msg)
-            print(f"发送帧: ID=0x{addr:03X}, LEN={current_size}, DATA=", end="")
-            for byte in data[i : i + current_size]:
-                print(f"{byte:02X} ", end="")
-            print()
+        tx_lock, msgs_cache = _get_tx_cache(can_interface)
+        with tx_lock:
+            for msg, msg_data, start, end in _get_tx_msgs(msgs_cache, addr, length):
+                # 复用缓存的CAN消息，原地拷贝本帧数据
+                msg_data[:] = data[start:end]
+                # 发送消息
+                can_interface.send(msg)
+                if PRINT_FRAMES:
+                    print(f"发送帧: ID=0x{addr:03X}, LEN={msg.dlc}, DATA=", end="")
+                    for byte in msg.data:
+                        print(f"{byte:02X} ", end="")
+                    print()
         return 0
     except can.CanError as e:
         print(f"CAN发送失败，错误: {e}")
@@ -58,31 +92,75 @@ def recv_data_impl(context, api_instance=None):
         msg = can_interface.recv(timeout=0.005)
         if msg is not None:
             # 打印接收到的CAN帧信息
-            print(f"接收帧: ID=0x{msg.arbitration_id:03X}, LEN={msg.dlc}, DATA=", end="")
-            for byte in msg.data:
-                print(f"{byte:02X} ", end="")
-            print()
+            if PRINT_FRAMES:
+                print(f"接收帧: ID=0x{msg.arbitration_id:03X}, LEN={msg.dlc}, DATA=", end="")
+                for byte in msg.data:
+                    print(f"{byte:02X} ", end="")
+                print()
 
             # 如果是发给主设备的消息，调用HAND_OnData处理
             if msg.arbitration_id == 0x01:  # ADDRESS_MASTER
-                for byte in msg.data:
-                    api_instance.HAND_OnData(byte)
+                api_instance.HAND_OnDataBytes(msg.data)
     except can.CanError as e:
         print(f"CAN接收错误: {e}")
     except Exception as e:
         print(f"接收异常: {e}")
 
 
+# 后台接收（can.Notifier），替代在HAND_GetResponse中轮询recv_data_impl
+class OHandListener(can.Listener):
+    """
+    在can.Notifier的接收线程中持续清空驱动队列，
+    将发给主设备的帧整帧送入解码器，由解码器唤醒等待中的HAND_GetResponse
+    """
+
+    def __init__(self, api_instance):
+        self.api_instance = api_instance
+
+    def on_message_received(self, msg):
+        if msg.arbitration_id == self.api_instance.address_master:
+            self.api_instance.HAND_OnDataBytes(msg.data)
+
+    def on_error(self, exc):
+        print(f"CAN接收异常: {exc}")
+
+
+def CAN_StartReceiver(bus, api_instance):
+    """
+    启动后台接收线程，返回can.Notifier实例
+    启动后请求路径不再调用recv_data_impl，响应由后台线程送达
+    """
+    if not bus or not api_instance:
+        print("错误：null context")
+        return None
+
+    api_instance.recv_data_impl = None
+    return can.Notifier(bus, [OHandListener(api_instance)], timeout=0.1)
+
+
+def CAN_StopReceiver(notifier, api_instance=None):
+    """停止后台接收线程，若给出api_instance则恢复为调用方轮询recv_data_impl"""
+    if notifier:
+        notifier.stop()
+    if api_instance:
+        api_instance.recv_data_impl = recv_data_impl
+
+
 # 时间相关函数
 _start_time = None
 
 
 def get_milli_seconds_impl():
-    """返回自程序启动以来的毫秒数"""
+    """返回自程序启动以来的毫秒数（单调时钟，不受系统时间调整影响）"""
+    return get_micro_seconds_impl() // 1000
+
+
+def get_micro_seconds_impl():
+    """返回自程序启动以来的微秒数（单调高精度时钟）"""
     global _start_time
     if _start_time is None:
-        _start_time = time.time() * 1000  # 初始化开始时间
-    return int(time.time() * 1000 - _start_time)
+        _start_time = time.perf_counter_ns()  # 初始化开始时间
+    return (time.perf_counter_ns() - _start_time) // 1000
 
 
 def delay_milli_seconds_impl(ms):
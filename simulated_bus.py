@@ -0,0 +1,220 @@
+"""离线测试共用的模拟总线：模拟手按命令应答，应答按CAN帧分帧后交给解码器"""
+
+import operator
+import struct
+import threading
+import time
+from functools import reduce
+
+import pytest
+
+from HandCache import HAND_SHADOW_PARAMS, _SHADOW_GET_CMDS
+from OHandSerialAPI import (
+    CAN_FRAME_DATA_SIZE,
+    CMD_ERROR_MASK,
+    HAND_CMD_GET_CALI_DATA,
+    HAND_CMD_GET_FINGER_ANGLE_ALL,
+    HAND_CMD_GET_FINGER_POS_ABS_ALL,
+    HAND_CMD_GET_FINGER_POS_ALL,
+    HAND_CMD_GET_FW_VERSION,
+    HAND_CMD_GET_PROTOCOL_VERSION,
+    HAND_CMD_LAYOUTS,
+    HAND_CMD_SET_CALI_DATA,
+    HAND_CMD_SET_CUSTOM,
+    HAND_CMD_SET_FINGER_ANGLE,
+    HAND_CMD_SET_FINGER_ANGLE_ALL,
+    HAND_CMD_SET_FINGER_POS,
+    HAND_CMD_SET_FINGER_POS_ABS,
+    HAND_CMD_SET_FINGER_POS_ABS_ALL,
+    HAND_CMD_SET_FINGER_POS_ALL,
+    HAND_PROTOCOL_UART,
+    MAX_MOTOR_CNT,
+    OHandSerialAPI,
+    _custom_layout,
+)
+
+ADDRESS_MASTER = 0x01
+HAND_ID = 0x02
+TIME_OUT = 100  # ms，模拟总线上应答立即到达，只在丢包时等待超时，留出余量以免机器负载高时误超时
+
+
+def get_micro_seconds():
+    return time.perf_counter_ns() // 1000
+
+
+def build_packet(dst, src, cmd, payload):
+    packet = bytearray([0x55, 0xAA, dst, src, cmd, len(payload)]) + bytes(payload)
+    packet.append(reduce(operator.xor, packet[2:], 0))
+    return bytes(packet)
+
+
+class FakeHand:
+    """模拟手：按命令生成应答数据，记录收到的请求，可注入丢包、校验错误、错误命令和远端错误"""
+
+    def __init__(self, hand_id):
+        self.hand_id = hand_id
+        self.requests = []  # 收到的请求 [(cmd, data)]
+        self.params = {}  # (set命令, 键) -> 参数数据
+        self.targets = [100 * i for i in range(MAX_MOTOR_CNT)]
+        self.cali_data = bytes([MAX_MOTOR_CNT, 3]) + bytes(range(4 * MAX_MOTOR_CNT)) + bytes(6)
+        self.drop = 0  # 丢弃接下来的N个应答
+        self.corrupt = 0  # 接下来的N个应答校验错误
+        self.wrong_cmd = 0  # 接下来的N个应答使用错误的命令号
+        self.errors = {}  # cmd -> 远端错误码
+
+    def handle(self, cmd, data):
+        """返回应答数据"""
+        self.requests.append((cmd, bytes(data)))
+        if cmd == HAND_CMD_GET_PROTOCOL_VERSION:
+            return bytes([0x03, 0x01])
+        if cmd == HAND_CMD_GET_FW_VERSION:
+            return struct.pack("<HBB", 5, 2, 1)
+        if cmd in (HAND_CMD_GET_FINGER_POS_ALL, HAND_CMD_GET_FINGER_POS_ABS_ALL):
+            return struct.pack(f"<{2 * MAX_MOTOR_CNT}H", *self.targets, *self.targets)
+        if cmd == HAND_CMD_GET_FINGER_ANGLE_ALL:
+            return struct.pack(f"<{2 * MAX_MOTOR_CNT}h", *self.targets, *self.targets)
+        if cmd in (HAND_CMD_SET_FINGER_POS_ALL, HAND_CMD_SET_FINGER_POS_ABS_ALL, HAND_CMD_SET_FINGER_ANGLE_ALL):
+            value_type = "h" if cmd == HAND_CMD_SET_FINGER_ANGLE_ALL else "H"
+            values = struct.unpack_from("<" + (value_type + "B") * (len(data) // 3), data)
+            self.targets[: len(data) // 3] = values[0::2]
+            return b""
+        if cmd in (HAND_CMD_SET_FINGER_POS, HAND_CMD_SET_FINGER_POS_ABS, HAND_CMD_SET_FINGER_ANGLE):
+            finger_id, value, _ = HAND_CMD_LAYOUTS[cmd][0].unpack(data)
+            self.targets[finger_id] = value
+            return b""
+        if cmd in _SHADOW_GET_CMDS:
+            set_cmd = _SHADOW_GET_CMDS[cmd]
+            key = bytes(data[: HAND_SHADOW_PARAMS[set_cmd][1]])
+            default = key + bytes(HAND_CMD_LAYOUTS[set_cmd][0].size - len(key))
+            return self.params.get((set_cmd, key), default)
+        if cmd in HAND_SHADOW_PARAMS:
+            self.params[(cmd, bytes(data[: HAND_SHADOW_PARAMS[cmd][1]]))] = bytes(data)
+            return b""
+        if cmd == HAND_CMD_SET_CUSTOM:
+            (request, set_slices), (response, get_slices) = _custom_layout(data[0])
+            values = request.unpack(data)
+            for name, start, end in set_slices:
+                if name == "pos":
+                    self.targets = list(values[start:end])
+            reply = []
+            for name, start, end in get_slices:
+                reply += self.targets if name in ("pos", "angle") else [0] * (end - start)
+            return response.pack(*reply)
+        if cmd == HAND_CMD_GET_CALI_DATA:
+            return self.cali_data
+        if cmd == HAND_CMD_SET_CALI_DATA:
+            motor_cnt = data[0]
+            positions = bytes(data[1 : 1 + 4 * motor_cnt])
+            self.cali_data = bytes([motor_cnt, data[1 + 4 * motor_cnt]]) + positions + bytes(data[2 + 4 * motor_cnt :])
+            return b""
+
+        request, response = HAND_CMD_LAYOUTS.get(cmd, (None, None))
+        if response is None:
+            return b""
+        key = bytes(data[:1]) if request is not None else b""  # 按手指读取的应答以finger_id开头
+        return key + bytes(response.size - len(key))
+
+    def reply(self, cmd, data):
+        """返回应答数据包，丢包时返回None"""
+        payload = self.handle(cmd, data)
+        if self.drop:
+            self.drop -= 1
+            return None
+        if cmd in self.errors:
+            cmd, payload = cmd | CMD_ERROR_MASK, bytes([self.errors[cmd]])
+        elif self.wrong_cmd:
+            self.wrong_cmd -= 1
+            cmd += 1
+        packet = bytearray(build_packet(ADDRESS_MASTER, self.hand_id, cmd, payload))
+        if self.corrupt:
+            self.corrupt -= 1
+            packet[-1] ^= 0xFF
+        return bytes(packet)
+
+
+class FakeBus:
+    """
+    模拟CAN总线：请求发送后应答立即排队，按8字节分帧。
+    每个手依次应答自己的请求，但所有手都用主机CAN ID应答，不同手同时在途的应答逐帧交错到达，与真实总线仲裁相同。
+    """
+
+    def __init__(self, hands):
+        self.hands = {hand.hand_id: hand for hand in hands}
+        self.replies = {}  # hand_id -> 在途应答的待发送帧列表
+        self.lock = threading.Lock()
+        self.sent = []  # 发送的请求包
+        self.frame_time = 0  # s，每次接收前等待的帧传输时间
+        self._thread = None
+        self._running = False
+
+    def send_data_impl(self, addr, data, length, context):
+        packet = bytes(data[:length])
+        self.sent.append(packet)
+        hand = self.hands.get(addr)
+        if hand is None:
+            return 0
+        reply = hand.reply(packet[4], packet[6 : 6 + packet[5]])
+        if reply is not None:
+            frames = [reply[i : i + CAN_FRAME_DATA_SIZE] for i in range(0, len(reply), CAN_FRAME_DATA_SIZE)]
+            with self.lock:
+                self.replies.setdefault(addr, []).extend(frames)
+        return 0
+
+    def deliver(self, api):
+        """每个有在途应答的手送出一帧，返回送出的帧数"""
+        with self.lock:
+            frames = [frames.pop(0) for frames in self.replies.values()]
+            self.replies = {hand_id: frames for hand_id, frames in self.replies.items() if frames}
+        for frame in frames:
+            api.HAND_OnDataBytes(frame)
+        return len(frames)
+
+    def recv_data_impl(self, context, api):
+        if self.frame_time:
+            time.sleep(self.frame_time)
+        if not self.deliver(api):
+            time.sleep(0.0002)  # 等同驱动接收超时
+
+    def start(self, api):
+        """后台线程接收，模拟CAN_StartReceiver"""
+        api.recv_data_impl = None
+        self._running = True
+        self._thread = threading.Thread(target=self._run, args=(api,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, api):
+        while self._running:
+            if not self.deliver(api):
+                time.sleep(0.0002)
+
+    def requests(self, cmd):
+        return [packet for packet in self.sent if packet[4] == cmd]
+
+
+def make_api(hand_ids=(HAND_ID,)):
+    hands = [FakeHand(hand_id) for hand_id in hand_ids]
+    bus = FakeBus(hands)
+    api = OHandSerialAPI(None, HAND_PROTOCOL_UART, ADDRESS_MASTER, bus.send_data_impl, bus.recv_data_impl)
+    api.HAND_SetTimerFunction(lambda: get_micro_seconds() // 1000, lambda ms: time.sleep(ms / 1000.0), get_micro_seconds)
+    api.HAND_SetCommandTimeOut(TIME_OUT)
+    return api, bus, hands
+
+
+def make_hand_bus(hand_ids):
+    """HandBus的接口换成模拟总线"""
+    pytest.importorskip("can")
+    from HandBus import HandBus
+
+    hands = [FakeHand(hand_id) for hand_id in hand_ids]
+    bus = FakeBus(hands)
+    hand_bus = HandBus(None, hand_ids)
+    hand_bus.api.send_data_impl = bus.send_data_impl
+    hand_bus.api.recv_data_impl = bus.recv_data_impl
+    hand_bus.api.HAND_SetCommandTimeOut(TIME_OUT)
+    return hand_bus, bus, hands
@@ -0,0 +1,173 @@
+import time
+
+import pytest
+
+from OHandSerialAPI import (
+    HAND_CMD_GET_PROTOCOL_VERSION,
+    HAND_RESP_SUCCESS,
+    MAX_MOTOR_CNT,
+    RETRY_BUDGET,
+    RETRY_BUDGET_RATIO,
+    HandState,
+)
+from simulated_bus import HAND_ID, TIME_OUT, FakeBus, FakeHand, make_api
+
+
+def test_async_api():
+    # 异步接口：多次重放的调用中缓存、重试计数只计一次，重试前在事件循环中等待退避时间；会阻塞事件循环的同步方法不可用
+    pytest.importorskip("can")
+    import asyncio
+
+    from AsyncOHandAPI import AsyncOHandAPI
+
+    hand = FakeHand(HAND_ID)
+    bus = FakeBus([hand])
+    api = AsyncOHandAPI(None, send_data_impl=bus.send_data_impl)
+    api.HAND_SetCommandTimeOut(TIME_OUT)
+    api.HAND_EnableResponseCache()
+    api.HAND_SetRetryPolicy(backoff=50, jitter=0)
+
+    async def tick(ticks):
+        while True:
+            await asyncio.sleep(0.001)
+            ticks.append(1)
+
+    async def run():
+        hand.drop = 1
+        ticks = []
+        ticker = asyncio.ensure_future(tick(ticks))
+        start = time.perf_counter()
+        result = await api.HAND_GetProtocolVersion(HAND_ID, [0], [0], [])
+        elapsed = time.perf_counter() - start
+        ticker.cancel()
+        assert result == (HAND_RESP_SUCCESS, 1, 3), f"异步命令失败: {result}"
+        assert elapsed >= (TIME_OUT + 50) / 1000.0, f"重试前未等待退避时间: {elapsed}"
+        assert len(ticks) > 10, "等待时阻塞了事件循环"
+        assert (api.cache_misses, api.retry_cnt) == (1, 1), f"重放时计数重复: {api.cache_misses}, {api.retry_cnt}"
+        assert api._retry_budget == pytest.approx(RETRY_BUDGET - 1 + RETRY_BUDGET_RATIO), f"重试预算错误: {api._retry_budget}"
+        result = await api.HAND_GetProtocolVersion(HAND_ID, [0], [0], [])
+        assert result == (HAND_RESP_SUCCESS, 1, 3) and api.cache_hits == 1, "缓存未命中"
+        assert len(bus.requests(HAND_CMD_GET_PROTOCOL_VERSION)) == 2, "请求数量错误"
+
+    bus.start(api._api)
+    try:
+        asyncio.run(run())
+    finally:
+        bus.stop()
+
+    for name in ("batch", "snapshot", "restore", "discover_nodes", "HAND_SubmitCmd", "HAND_FlushSetpoints", "HAND_SetCoalesceWindow"):
+        with pytest.raises(AttributeError):
+            getattr(api, name)
+
+
+def commands():
+    """异步与同步接口执行的相同命令：[(方法名, 参数, 执行前丢弃的应答数)]"""
+    return [
+        ("HAND_GetProtocolVersion", (HAND_ID, [0], [0], []), 1),
+        ("HAND_GetProtocolVersion", (HAND_ID, [0], [0], []), 0),
+        ("HAND_GetFingerCurrentLimit", (HAND_ID, 0, [0], []), 0),
+        ("HAND_SetFingerCurrentLimit", (HAND_ID, 0, 0, []), 0),
+        ("HAND_SetFingerCurrentLimit", (HAND_ID, 0, 500, []), 1),
+        ("HAND_SetFingerCurrentLimit", (HAND_ID, 0, 500, []), 0),
+        ("HAND_GetFingerPosAll", (HAND_ID, [0] * MAX_MOTOR_CNT, [0] * MAX_MOTOR_CNT, [MAX_MOTOR_CNT], []), 2),
+        ("read_state", (HAND_ID,), 0),
+        ("HAND_GetProtocolVersion", (0x09, [0], [0], []), 0),
+        ("HAND_Calibrate", (HAND_ID, 0, []), 0),
+    ]
+
+
+def comparable(result):
+    return (result[0], vars(result[1])) if isinstance(result, tuple) and isinstance(result[-1], HandState) else result
+
+
+def api_state(api, hand):
+    """接口和模拟手上命令执行留下的全部状态"""
+    metrics = api.metrics
+    return {
+        "counters": (api.cache_hits, api.cache_misses, api.shadow_skips, api.retry_cnt, api.retry_denied_cnt),
+        "retry_budget": round(api._retry_budget, 6),
+        "cache": dict(api._response_cache),
+        "shadow": dict(api._shadow),
+        "latencies": {key: len(samples) for key, samples in api._latencies.items()},
+        "learned_timeouts": set(api._learned_timeouts),
+        "metrics": (metrics.errors, metrics.tx_packets, {key: h.count for key, h in metrics.response_latency.items()}),
+        "requests": hand.requests,
+    }
+
+
+def test_async_api_runs_transactions_once():
+    # 异步命令的事务只执行一次：计数、缓存、影子、学习的超时和统计与同步接口执行相同命令后一致
+    pytest.importorskip("can")
+    import asyncio
+
+    from AsyncOHandAPI import AsyncOHandAPI
+
+    def configure(api):
+        api.HAND_SetCommandTimeOut(TIME_OUT)
+        api.HAND_EnableResponseCache()
+        api.HAND_EnableParamShadow()
+        api.HAND_EnableMetrics()
+        api.HAND_EnableAdaptiveTimeout()
+        api.HAND_SetRetryPolicy(backoff=0, retry_writes=True)
+
+    sync_api, _, (sync_hand,) = make_api()
+    configure(sync_api)
+    sync_results = []
+    for name, args, drop in commands():
+        sync_hand.drop = drop
+        sync_results.append(comparable(getattr(sync_api, name)(*args)))
+
+    hand = FakeHand(HAND_ID)
+    bus = FakeBus([hand])
+    api = AsyncOHandAPI(None, send_data_impl=bus.send_data_impl)
+    configure(api)
+
+    async def run():
+        results = []
+        for name, args, drop in commands():
+            hand.drop = drop
+            results.append(comparable(await getattr(api, name)(*args)))
+        return results
+
+    bus.start(api._api)
+    try:
+        results = asyncio.run(run())
+    finally:
+        bus.stop()
+    assert results == sync_results, f"异步结果与同步不同: {results}"
+    assert api_state(api._api, hand) == api_state(sync_api, sync_hand), "异步命令留下的状态与同步不同"
+
+
+def test_async_api_multi_frame_hands():
+    # 并发的异步命令：多帧应答独占总线，不与其他手的应答交错
+    pytest.importorskip("can")
+    import asyncio
+
+    from AsyncOHandAPI import AsyncOHandAPI
+
+    hands = [FakeHand(hand_id) for hand_id in (HAND_ID, 0x03, 0x04)]
+    bus = FakeBus(hands)
+    api = AsyncOHandAPI(None, send_data_impl=bus.send_data_impl)
+    api.HAND_SetCommandTimeOut(TIME_OUT)
+
+    async def read_pos(hand_id):
+        results = []
+        for _ in range(20):
+            err, pos, _ = await api.HAND_GetFingerPosAll(hand_id, [0] * MAX_MOTOR_CNT, [0] * MAX_MOTOR_CNT, [MAX_MOTOR_CNT], [])
+            results.append((err, pos))
+        return results
+
+    async def read_beep_switch():
+        return [(await api.HAND_GetBeepSwitch(0x04, [0], []))[0] for _ in range(40)]
+
+    async def run():
+        return await asyncio.gather(read_pos(HAND_ID), read_pos(0x03), read_beep_switch())
+
+    bus.start(api._api)
+    try:
+        pos_2, pos_3, beep = asyncio.run(run())
+    finally:
+        bus.stop()
+    expected = (HAND_RESP_SUCCESS, [0, 100, 200, 300, 400, 500])
+    assert pos_2 == pos_3 == [expected] * 20, f"多帧应答交错: {pos_2}, {pos_3}"
+    assert beep == [HAND_RESP_SUCCESS] * 40, f"单帧应答出错: {beep}"
@@ -0,0 +1,52 @@
+import threading
+import time
+
+import pytest
+
+from simulated_bus import ADDRESS_MASTER, HAND_ID, build_packet
+
+
+class RecordingBus:
+    """记录每次发送时消息的内容，发送时短暂让出CPU，使并发发送重叠"""
+
+    def __init__(self):
+        self.frames = []
+        self.msgs = []
+
+    def send(self, msg):
+        self.msgs.append(msg)
+        time.sleep(0)
+        self.frames.append((msg.arbitration_id, bytes(msg.data)))
+
+
+def test_send_reuses_messages_per_bus():
+    # 同一总线上复用发送消息，不同总线各用各的消息
+    can_interface = pytest.importorskip("can_interface")
+    packet = build_packet(HAND_ID, ADDRESS_MASTER, 0x4F, bytes(range(18)))
+    buses = [RecordingBus(), RecordingBus()]
+    for bus in buses * 2:
+        assert can_interface.send_data_impl(HAND_ID, packet, len(packet), bus) == 0, "发送失败"
+    frames = [(HAND_ID, packet[i : i + 8]) for i in range(0, len(packet), 8)]
+    assert buses[0].frames == buses[1].frames == frames * 2, f"发送的帧错误: {buses[0].frames}"
+    assert buses[0].msgs[:4] == buses[0].msgs[4:], "同一总线上未复用发送消息"
+    assert not set(map(id, buses[0].msgs)) & set(map(id, buses[1].msgs)), "不同总线共用了发送消息"
+
+
+def test_send_concurrent_packets():
+    # 多个线程在同一总线上发送相同长度的包，各帧内容不被其他线程改写
+    can_interface = pytest.importorskip("can_interface")
+    bus = RecordingBus()
+    packets = [build_packet(HAND_ID, ADDRESS_MASTER, 0x4F, bytes([value]) * 18) for value in range(4)]
+
+    def send(packet):
+        for _ in range(200):
+            can_interface.send_data_impl(HAND_ID, packet, len(packet), bus)
+
+    threads = [threading.Thread(target=send, args=(packet,)) for packet in packets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sent = [data for _, data in bus.frames]
+    received = [b"".join(sent[i : i + 4]) for i in range(0, len(sent), 4)]
+    assert sorted(set(received)) == sorted(packets), "并发发送的帧被其他线程改写"
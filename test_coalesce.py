@@ -0,0 +1,112 @@
+import threading
+import time
+
+from OHandSerialAPI import (
+    ERR_COMMAND_INVALID,
+    HAND_CMD_GET_FINGER_ANGLE_ALL,
+    HAND_CMD_GET_FINGER_POS_ALL,
+    HAND_CMD_SET_FINGER_ANGLE_ALL,
+    HAND_CMD_SET_FINGER_POS,
+    HAND_CMD_SET_FINGER_POS_ALL,
+    HAND_RESP_HAND_ERROR,
+    HAND_RESP_SUCCESS,
+    MAX_MOTOR_CNT,
+)
+from simulated_bus import HAND_ID, make_api
+
+
+def test_batch_merges_setpoints():
+    # batch块内所有手指的设置合并为一次SetFingerPosAll事务
+    api, bus, hands = make_api()
+    with api.batch(HAND_ID) as batch:
+        for finger_id in range(MAX_MOTOR_CNT):
+            assert api.HAND_SetFingerPos(HAND_ID, finger_id, 1000 + finger_id, 200, []) == HAND_RESP_SUCCESS, "设置失败"
+        assert not bus.sent, "块内的设置被立即发送"
+    assert batch.err == HAND_RESP_SUCCESS, f"合并发送失败: err={batch.err}"
+    assert [packet[4] for packet in bus.sent] == [HAND_CMD_SET_FINGER_POS_ALL], f"发送的命令错误: {bus.sent}"
+    assert hands[0].targets == [1000 + i for i in range(MAX_MOTOR_CNT)], f"目标位置错误: {hands[0].targets}"
+
+
+def test_batch_keeps_other_targets():
+    # 部分手指的设置：目标未知时少量设置逐个发送，较多时先读回目标再合并
+    api, bus, hands = make_api()
+    with api.batch(HAND_ID):
+        api.HAND_SetFingerPos(HAND_ID, 0, 10, 200, [])
+        api.HAND_SetFingerPos(HAND_ID, 1, 11, 200, [])
+    assert [packet[4] for packet in bus.sent] == [HAND_CMD_SET_FINGER_POS] * 2, f"少量设置应逐个发送: {bus.sent}"
+
+    del bus.sent[:]
+    with api.batch(HAND_ID):
+        for finger_id in range(4):
+            api.HAND_SetFingerAngle(HAND_ID, finger_id, -finger_id, 200, [])
+    cmds = [packet[4] for packet in bus.sent]
+    assert cmds == [HAND_CMD_GET_FINGER_ANGLE_ALL, HAND_CMD_SET_FINGER_ANGLE_ALL], f"合并发送的命令错误: {cmds}"
+    assert hands[0].targets == [0, -1, -2, -3, 400, 500], f"未设置的手指目标被改变: {hands[0].targets}"
+
+
+def test_batch_flushes_before_other_commands():
+    # 块内的其他命令先发送已合并的设置，保持命令顺序
+    api, bus, _ = make_api()
+    with api.batch(HAND_ID):
+        for finger_id in range(MAX_MOTOR_CNT):
+            api.HAND_SetFingerPos(HAND_ID, finger_id, 0, 255, [])
+        api.HAND_GetFingerPosAll(HAND_ID, [0] * MAX_MOTOR_CNT, [0] * MAX_MOTOR_CNT, [MAX_MOTOR_CNT], [])
+    cmds = [packet[4] for packet in bus.sent]
+    assert cmds == [HAND_CMD_SET_FINGER_POS_ALL, HAND_CMD_GET_FINGER_POS_ALL], f"命令顺序错误: {cmds}"
+
+
+def test_coalesce_window():
+    # 时间窗口内的单指设置合并为一次事务
+    api, bus, hands = make_api()
+    api.HAND_SetCoalesceWindow(20)
+    try:
+        for finger_id in range(MAX_MOTOR_CNT):
+            api.HAND_SetFingerPos(HAND_ID, finger_id, 2000, 255, [])
+        time.sleep(0.1)
+        assert [packet[4] for packet in bus.sent] == [HAND_CMD_SET_FINGER_POS_ALL], f"窗口内的设置未合并: {bus.sent}"
+        assert hands[0].targets == [2000] * MAX_MOTOR_CNT, f"目标位置错误: {hands[0].targets}"
+    finally:
+        api.HAND_SetCoalesceWindow(0)
+
+
+def test_coalesce_window_error():
+    # 窗口关闭时发送不持有全局锁，其他手的设置不被阻塞；发送失败由下一次设置或HAND_FlushSetpoints返回
+    api, bus, hands = make_api((HAND_ID, 0x03))
+    hands[0].errors[HAND_CMD_SET_FINGER_POS_ALL] = ERR_COMMAND_INVALID
+    release = threading.Event()
+
+    def slow_send(addr, data, length, context):
+        if addr == HAND_ID:
+            release.wait(1)
+        return bus.send_data_impl(addr, data, length, context)
+
+    api.send_data_impl = slow_send
+    api.HAND_SetCoalesceWindow(20)
+    try:
+        for finger_id in range(MAX_MOTOR_CNT):
+            api.HAND_SetFingerPos(HAND_ID, finger_id, 2000, 255, [])
+        time.sleep(0.05)
+        start = time.perf_counter()
+        for finger_id in range(MAX_MOTOR_CNT):
+            api.HAND_SetFingerPos(0x03, finger_id, 1000, 255, [])
+        assert time.perf_counter() - start < 0.5, "窗口发送时其他手的设置被阻塞"
+        release.set()
+        time.sleep(0.1)
+        assert hands[1].targets == [1000] * MAX_MOTOR_CNT, f"目标位置错误: {hands[1].targets}"
+
+        remote_err = []
+        err = api.HAND_SetFingerPos(HAND_ID, 0, 500, 255, remote_err)
+        assert (err, remote_err) == (HAND_RESP_HAND_ERROR, [ERR_COMMAND_INVALID]), f"窗口发送的错误丢失: {err}"
+        del hands[0].errors[HAND_CMD_SET_FINGER_POS_ALL]
+        assert api.HAND_FlushSetpoints(HAND_ID) == HAND_RESP_SUCCESS, "错误应只返回一次"
+        assert hands[0].targets[0] == 500, f"目标位置错误: {hands[0].targets}"
+
+        hands[0].errors[HAND_CMD_SET_FINGER_POS] = ERR_COMMAND_INVALID
+        api.HAND_SetFingerPos(HAND_ID, 1, 500, 255, [])
+        time.sleep(0.1)
+        remote_err = []
+        assert api.HAND_FlushSetpoints(HAND_ID, remote_err) == HAND_RESP_HAND_ERROR, "HAND_FlushSetpoints未返回错误"
+        assert remote_err == [ERR_COMMAND_INVALID], f"远端错误错误: {remote_err}"
+    finally:
+        release.set()
+        api.HAND_SetCoalesceWindow(0)
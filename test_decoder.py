@@ -0,0 +1,38 @@
+from OHandSerialAPI import (
+    ERR_PROTOCOL_WRONG_LRC,
+    HAND_CMD_GET_FINGER_POS_ALL,
+    HAND_CMD_GET_PROTOCOL_VERSION,
+    HAND_CMD_SET_FINGER_POS,
+    MAX_PROTOCOL_DATA_SIZE,
+)
+from simulated_bus import ADDRESS_MASTER, HAND_ID, build_packet, make_api
+
+
+def test_decoder_chunks():
+    # 逐字节和按任意分块送入解码器，得到相同的数据包；杂散字节、发给其他主机的包、超长字节数被跳过
+    packets = [build_packet(ADDRESS_MASTER, HAND_ID, HAND_CMD_GET_PROTOCOL_VERSION, b"\x03\x01"),
+               build_packet(ADDRESS_MASTER, 0x03, HAND_CMD_GET_FINGER_POS_ALL, bytes(range(24))),
+               build_packet(ADDRESS_MASTER, HAND_ID, HAND_CMD_SET_FINGER_POS, b"")]
+    stream = b"\x00\x55\x13" + packets[0] + build_packet(0x05, HAND_ID, 0x00, b"\x01") + packets[1]
+    stream += bytes([0x55, 0xAA, ADDRESS_MASTER, HAND_ID, 0x00, MAX_PROTOCOL_DATA_SIZE + 1]) + packets[2]
+
+    packets = [packet[2:] for packet in packets]  # 接收队列中的包不含帧头
+
+    api, _, _ = make_api()
+    for data in stream:
+        api.HAND_OnData(data)
+    assert list(api.rx_queue) == packets, f"逐字节解码结果错误: {list(api.rx_queue)}"
+
+    for chunk_size in (1, 3, 8, 64):
+        api, _, _ = make_api()
+        for start in range(0, len(stream), chunk_size):
+            api.HAND_OnDataBytes(memoryview(stream)[start : start + chunk_size])
+        assert list(api.rx_queue) == packets, f"按{chunk_size}字节分块解码结果错误"
+
+
+def test_decoder_wrong_lrc():
+    # 校验错误的应答返回ERR_PROTOCOL_WRONG_LRC
+    api, _, hands = make_api()
+    hands[0].corrupt = 1
+    err, _, _ = api.HAND_GetProtocolVersion(HAND_ID, [0], [0], [])
+    assert err == ERR_PROTOCOL_WRONG_LRC, f"校验错误未检出: err={err}"
@@ -0,0 +1,10 @@
+from OHandSerialAPI import ERR_COMMAND_INVALID, HAND_CMD_GET_BEEP_SWITCH
+from simulated_bus import HAND_ID, TIME_OUT, make_api
+
+
+def test_discover_nodes():
+    # 单帧探测命令一次发给所有节点，多帧的版本应答逐个读取；以错误应答探测的手也算在线
+    api, _, hands = make_api((HAND_ID, 0x05, 0x0A))
+    hands[1].errors[HAND_CMD_GET_BEEP_SWITCH] = ERR_COMMAND_INVALID
+    nodes = api.discover_nodes(range(0x02, 0x10), time_out=TIME_OUT)
+    assert nodes == [(hand_id, (1, 3), (1, 2, 5)) for hand_id in (HAND_ID, 0x05, 0x0A)], f"扫描结果错误: {nodes}"
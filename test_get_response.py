@@ -0,0 +1,11 @@
+from OHandSerialAPI import ERR_COMMAND_INVALID, HAND_CMD_GET_PROTOCOL_VERSION, HAND_RESP_HAND_ERROR
+from simulated_bus import HAND_ID, make_api
+
+
+def test_remote_error():
+    # 远端错误应答返回HAND_RESP_HAND_ERROR并带回错误码
+    api, _, hands = make_api()
+    hands[0].errors[HAND_CMD_GET_PROTOCOL_VERSION] = ERR_COMMAND_INVALID
+    remote_err = []
+    err, _, _ = api.HAND_GetProtocolVersion(HAND_ID, [0], [0], remote_err)
+    assert err == HAND_RESP_HAND_ERROR and remote_err == [ERR_COMMAND_INVALID], f"远端错误处理错误: {err}, {remote_err}"
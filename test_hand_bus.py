@@ -0,0 +1,72 @@
+import struct
+import threading
+
+from OHandSerialAPI import (
+    HAND_CMD_GET_FINGER_CURRENT_LIMIT,
+    HAND_CMD_GET_FINGER_POS_ALL,
+    HAND_CMD_SET_FINGER_CURRENT_LIMIT,
+    HAND_RESP_SUCCESS,
+    MAX_MOTOR_CNT,
+)
+from simulated_bus import HAND_ID, make_hand_bus
+
+
+def test_hand_bus_poll():
+    # 多帧应答逐个手轮询，不在总线上交错；轮询期间节点的同步命令等待，应答不被流水线请求取走
+    hand_bus, bus, hands = make_hand_bus((HAND_ID, 0x03, 0x04))
+    results = hand_bus.poll(HAND_CMD_GET_FINGER_POS_ALL)
+    expected = (0, 100, 200, 300, 400, 500) * 2
+    assert results == {hand_id: (HAND_RESP_SUCCESS, expected) for hand_id in (HAND_ID, 0x03, 0x04)}, f"轮询结果错误: {results}"
+
+    # 不同手指的电流限制不同，应答被错取时手指编号不符；总线放慢，使轮询和节点命令重叠
+    bus.frame_time = 0.0005
+    for finger_id in range(2):
+        hands[0].params[(HAND_CMD_SET_FINGER_CURRENT_LIMIT, bytes([finger_id]))] = struct.pack("<BH", finger_id, 100 + finger_id)
+    errors = []
+
+    def read_current_limit():
+        for _ in range(50):
+            err, current_limit = hand_bus.node(HAND_ID).HAND_GetFingerCurrentLimit(1, [0], [])
+            if (err, current_limit) != (HAND_RESP_SUCCESS, 101):
+                errors.append((err, current_limit))
+
+    thread = threading.Thread(target=read_current_limit)
+    thread.start()
+    for _ in range(50):
+        result = hand_bus.poll(HAND_CMD_GET_FINGER_CURRENT_LIMIT, (0,), [HAND_ID])
+        if result != {HAND_ID: (HAND_RESP_SUCCESS, (0, 100))}:
+            errors.append(result)
+    thread.join()
+    assert not errors, f"轮询与节点命令冲突: {errors}"
+
+
+def test_hand_bus_nodes_from_threads():
+    # 不同线程向不同的手发送命令：多帧应答独占总线，不与其他手的应答交错
+    hand_bus, bus, _ = make_hand_bus((HAND_ID, 0x03, 0x04))
+    expected = (0, 100, 200, 300, 400, 500)
+    errors = []
+
+    def read_pos(hand_id):
+        for _ in range(50):
+            pos, speed, motor_cnt = [0] * MAX_MOTOR_CNT, [0] * MAX_MOTOR_CNT, [MAX_MOTOR_CNT]
+            err, pos, _ = hand_bus.node(hand_id).HAND_GetFingerPosAll(pos, speed, motor_cnt, [])
+            if (err, tuple(pos)) != (HAND_RESP_SUCCESS, expected):
+                errors.append((hand_id, err))
+
+    def read_beep_switch():
+        for _ in range(100):
+            err, _ = hand_bus.node(0x04).HAND_GetBeepSwitch([0], [])
+            if err != HAND_RESP_SUCCESS:
+                errors.append((0x04, err))
+
+    bus.start(hand_bus.api)
+    try:
+        threads = [threading.Thread(target=read_pos, args=(hand_id,)) for hand_id in (HAND_ID, 0x03)]
+        threads.append(threading.Thread(target=read_beep_switch))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        bus.stop()
+    assert not errors, f"不同手的应答交错: {errors[:5]}"
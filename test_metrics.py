@@ -0,0 +1,64 @@
+import threading
+
+from HandMetrics import HISTOGRAM_SUB_BUCKET_BITS, LatencyHistogram
+from OHandSerialAPI import HAND_CMD_GET_PROTOCOL_VERSION
+from simulated_bus import ADDRESS_MASTER, HAND_ID, build_packet, make_api
+
+
+def test_latency_histogram():
+    # 32以下精确计数，以上每个2的幂16个子桶，桶宽不超过值的1/16
+    histogram = LatencyHistogram()
+    for value in range(32):
+        histogram.record(value)
+    assert [upper for upper, _ in histogram.buckets()] == list(range(32)), "小值未精确计数"
+
+    for value in (33, 100, 1000, 123456, 10**7):
+        histogram = LatencyHistogram()
+        histogram.record(value)
+        (upper, count), = histogram.buckets()
+        assert count == 1 and value <= upper, f"{value}落入错误的桶: {upper}"
+        assert upper - value < max(1, value >> HISTOGRAM_SUB_BUCKET_BITS), f"{value}的桶过宽: {upper}"
+
+    histogram = LatencyHistogram()
+    for value in range(1, 101):
+        histogram.record(value)
+    assert histogram.percentile(50) in (50, 51), f"中位数错误: {histogram.percentile(50)}"
+    assert histogram.percentile(100) == 100, f"最大值错误: {histogram.percentile(100)}"
+    histogram.record(1 << 40)
+    assert histogram.max == 1 << 40, "超大值未计入"
+
+
+def test_metrics():
+    # 按手和命令记录延迟和错误，导出JSON和Prometheus文本
+    api, _, hands = make_api()
+    api.HAND_EnableMetrics()
+    for _ in range(5):
+        api.HAND_GetProtocolVersion(HAND_ID, [0], [0], [])
+    hands[0].drop = 1
+    api.HAND_GetProtocolVersion(HAND_ID, [0], [0], [])
+
+    metrics = api.metrics
+    assert metrics.response_latency[(HAND_ID, HAND_CMD_GET_PROTOCOL_VERSION)].count == 5, "延迟直方图计数错误"
+    assert metrics.errors == {(HAND_ID, HAND_CMD_GET_PROTOCOL_VERSION, "timeout"): 1}, f"错误计数错误: {metrics.errors}"
+    assert (metrics.tx_packets, metrics.rx_packets) == (6, 5), f"收发包计数错误: {metrics.tx_packets}, {metrics.rx_packets}"
+    assert metrics.rx_frames == 10 and metrics.rx_bytes == 45, f"接收帧计数错误: {metrics.rx_frames}, {metrics.rx_bytes}"
+    text = metrics.to_prometheus()
+    assert 'ohand_errors_total{hand="2",cmd="0x00",error="timeout"} 1' in text, "Prometheus导出缺少错误计数"
+    assert metrics.to_dict()["counters"]["tx_packets"] == 6, "JSON导出计数错误"
+
+    # 逐字节送入解码器只计数据包，字节和帧按HAND_OnDataBytes的分块计数
+    for data in build_packet(ADDRESS_MASTER, HAND_ID, HAND_CMD_GET_PROTOCOL_VERSION, b"\x03\x01"):
+        api.HAND_OnData(data)
+    assert (metrics.rx_frames, metrics.rx_bytes, metrics.rx_packets) == (10, 45, 6), "逐字节接收计数错误"
+
+    def feed():
+        for _ in range(1000):
+            metrics.record_rx(8)
+            metrics.record_rx_packet()
+
+    threads = [threading.Thread(target=feed) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (metrics.rx_frames, metrics.rx_bytes, metrics.rx_packets) == (4010, 32045, 4006), "并发接收计数丢失"
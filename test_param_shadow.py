@@ -0,0 +1,23 @@
+from OHandSerialAPI import HAND_CMD_SET_FINGER_CURRENT_LIMIT, HAND_RESP_SUCCESS, HAND_RESP_TIMEOUT
+from simulated_bus import HAND_ID, make_api
+
+
+def test_param_shadow():
+    # 参数影子：写入手上已有的值时跳过，force时强制写入，写入失败后影子失效
+    api, bus, hands = make_api()
+    api.HAND_EnableParamShadow()
+    err, current_limit = api.HAND_GetFingerCurrentLimit(HAND_ID, 0, [0], [])
+    assert err == HAND_RESP_SUCCESS, f"获取电流限制失败: err={err}"
+
+    assert api.HAND_SetFingerCurrentLimit(HAND_ID, 0, current_limit, []) == HAND_RESP_SUCCESS, "相同值写入失败"
+    assert api.shadow_skips == 1 and not bus.requests(HAND_CMD_SET_FINGER_CURRENT_LIMIT), "相同值的写入未被跳过"
+    assert api.HAND_SetFingerCurrentLimit(HAND_ID, 0, current_limit, [], force=True) == HAND_RESP_SUCCESS, "强制写入失败"
+    assert len(bus.requests(HAND_CMD_SET_FINGER_CURRENT_LIMIT)) == 1, "强制写入被跳过"
+
+    hands[0].drop = 1
+    assert api.HAND_SetFingerCurrentLimit(HAND_ID, 0, 500, []) == HAND_RESP_TIMEOUT, "丢包应超时"
+    assert api.HAND_SetFingerCurrentLimit(HAND_ID, 0, current_limit, []) == HAND_RESP_SUCCESS, "写入失败"
+    assert len(bus.requests(HAND_CMD_SET_FINGER_CURRENT_LIMIT)) == 3, "写入失败后影子未失效"
+
+    api.HAND_Calibrate(HAND_ID, 0, [])
+    assert not api._shadow, f"校准后影子未清空: {api._shadow}"
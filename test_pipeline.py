@@ -0,0 +1,33 @@
+from OHandSerialAPI import (
+    ERR_COMMAND_INVALID,
+    HAND_CMD_GET_FW_VERSION,
+    HAND_CMD_GET_PROTOCOL_VERSION,
+    HAND_RESP_HAND_ERROR,
+    HAND_RESP_SUCCESS,
+    HAND_RESP_TIMEOUT,
+)
+from simulated_bus import HAND_ID, make_api
+
+
+def test_submit_and_wait():
+    # 流水线请求按(地址, 命令)匹配应答，不在线的节点超时
+    api, _, hands = make_api()
+    hands[0].errors[HAND_CMD_GET_FW_VERSION] = ERR_COMMAND_INVALID
+    futures = [api.HAND_SubmitCmd(HAND_ID, HAND_CMD_GET_PROTOCOL_VERSION, None, 0),
+               api.HAND_SubmitCmd(HAND_ID, HAND_CMD_GET_FW_VERSION, None, 0),
+               api.HAND_SubmitCmd(0x09, HAND_CMD_GET_PROTOCOL_VERSION, None, 0)]
+    results = api.HAND_WaitCmds(futures)
+    assert results[0] == (HAND_RESP_SUCCESS, b"\x03\x01"), f"协议版本应答错误: {results[0]}"
+    assert results[1] == (HAND_RESP_HAND_ERROR, bytes([ERR_COMMAND_INVALID])), f"远端错误应答错误: {results[1]}"
+    assert results[2] == (HAND_RESP_TIMEOUT, b""), f"不在线节点应超时: {results[2]}"
+    assert not api._pending, "请求完成后仍有待处理项"
+
+
+def test_submit_same_cmd_waits_previous():
+    # 同一(地址, 命令)只能有一个在途请求，第二个等待第一个完成
+    api, bus, _ = make_api()
+    first = api.HAND_SubmitCmd(HAND_ID, HAND_CMD_GET_PROTOCOL_VERSION, None, 0)
+    second = api.HAND_SubmitCmd(HAND_ID, HAND_CMD_GET_PROTOCOL_VERSION, None, 0)
+    assert first.done(), "第二个请求发送前第一个请求未完成"
+    assert api.HAND_WaitCmds([first, second]) == [(HAND_RESP_SUCCESS, b"\x03\x01")] * 2, "流水线结果错误"
+    assert len(bus.requests(HAND_CMD_GET_PROTOCOL_VERSION)) == 2, "请求数量错误"
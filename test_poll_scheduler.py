@@ -0,0 +1,84 @@
+import threading
+
+from OHandSerialAPI import (
+    HAND_CMD_GET_BEEP_SWITCH,
+    HAND_CMD_GET_CALI_DATA,
+    HAND_CMD_GET_FINGER_FORCE,
+    HAND_CMD_GET_FINGER_POS_ALL,
+    HAND_CMD_SET_CUSTOM,
+    HAND_CMD_SET_NODE_ID,
+    HAND_RESP_SUCCESS,
+    MAX_MOTOR_CNT,
+    MAX_PROTOCOL_DATA_SIZE,
+)
+from PollScheduler import PollScheduler, can_frame_bits, command_bits, packet_bits
+from simulated_bus import HAND_ID, make_api
+
+
+def test_command_bits():
+    # 最坏情况的总线位数：帧开销、位填充和帧间隔
+    assert can_frame_bits(8) == 135 and can_frame_bits(0) == 55, "CAN帧位数错误"
+    assert packet_bits(0) == can_frame_bits(7), "空数据包应为一帧"
+    assert packet_bits(2) == can_frame_bits(8) + can_frame_bits(1), "9字节的包应为两帧"
+    assert command_bits(HAND_CMD_GET_BEEP_SWITCH, b"") == packet_bits(0) + packet_bits(1), "读命令位数错误"
+    assert command_bits(HAND_CMD_GET_FINGER_POS_ALL, b"") == packet_bits(0) + packet_bits(24), "读全部位置位数错误"
+    assert command_bits(HAND_CMD_SET_NODE_ID, b"\x03") == packet_bits(1) + packet_bits(0), "写命令位数错误"
+    for cmd, data in ((HAND_CMD_GET_FINGER_FORCE, b"\x00"), (HAND_CMD_GET_CALI_DATA, b""), (HAND_CMD_SET_CUSTOM, b"\x01")):
+        assert command_bits(cmd, data) == packet_bits(len(data)) + packet_bits(MAX_PROTOCOL_DATA_SIZE), f"变长应答0x{cmd:02X}应按最大长度计算"
+
+
+def test_poll_scheduler():
+    # 不同手的单帧应答并行轮询，多帧应答逐个轮询，避免在总线上交错
+    api, bus, _ = make_api((HAND_ID, 0x03))
+    scheduler = PollScheduler(api)
+    results = []
+    scheduler.subscribe(lambda hand_id, cmd, values, err, result, t: results.append((hand_id, cmd, err, result)))
+    for hand_id in (HAND_ID, 0x03):
+        assert scheduler.add(hand_id, HAND_CMD_GET_FINGER_POS_ALL, 1), "轮询未被接纳"
+    assert scheduler.run_once(), "没有到期的轮询"
+    for hand_id in (HAND_ID, 0x03):
+        assert scheduler.add(hand_id, HAND_CMD_GET_BEEP_SWITCH, 1), "轮询未被接纳"
+    assert scheduler.run_once(), "没有到期的轮询"
+
+    assert sorted(results) == [
+        (HAND_ID, HAND_CMD_GET_FINGER_POS_ALL, HAND_RESP_SUCCESS, (0, 100, 200, 300, 400, 500) * 2),
+        (HAND_ID, HAND_CMD_GET_BEEP_SWITCH, HAND_RESP_SUCCESS, (0,)),
+        (0x03, HAND_CMD_GET_FINGER_POS_ALL, HAND_RESP_SUCCESS, (0, 100, 200, 300, 400, 500) * 2),
+        (0x03, HAND_CMD_GET_BEEP_SWITCH, HAND_RESP_SUCCESS, (0,)),
+    ], f"轮询结果错误: {results}"
+
+
+def test_poll_scheduler_with_commands():
+    # 后台轮询时其他线程的同步命令正常完成：同一(手, 命令)的应答不被轮询取走，多帧应答不与轮询的应答交错
+    api, bus, _ = make_api((HAND_ID, 0x03, 0x04))
+    scheduler = PollScheduler(api)
+    errors = []
+
+    def check(hand_id, cmd, values, err, result, t):
+        if err != HAND_RESP_SUCCESS:
+            errors.append((hand_id, cmd, err))
+
+    scheduler.subscribe(check)
+    for hand_id in (HAND_ID, 0x03):
+        assert scheduler.add(hand_id, HAND_CMD_GET_FINGER_POS_ALL, 200), "轮询未被接纳"
+    assert scheduler.add(0x04, HAND_CMD_GET_BEEP_SWITCH, 200), "轮询未被接纳"
+
+    def read_pos(hand_id):
+        for _ in range(50):
+            err, pos, _ = api.HAND_GetFingerPosAll(hand_id, [0] * MAX_MOTOR_CNT, [0] * MAX_MOTOR_CNT, [MAX_MOTOR_CNT], [])
+            if (err, pos) != (HAND_RESP_SUCCESS, [0, 100, 200, 300, 400, 500]):
+                errors.append((hand_id, HAND_CMD_GET_FINGER_POS_ALL, err))
+
+    bus.start(api)
+    scheduler.start()
+    try:
+        threads = [threading.Thread(target=read_pos, args=(hand_id,)) for hand_id in (HAND_ID, 0x04)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        scheduler.stop()
+        bus.stop()
+    assert all(count for _, _, _, _, count, _, _ in scheduler.stats()), f"轮询未运行: {scheduler.stats()}"
+    assert not errors, f"轮询与同步命令冲突: {errors[:5]}"
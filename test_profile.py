@@ -0,0 +1,28 @@
+from OHandSerialAPI import (
+    HAND_CMD_SET_CALI_DATA,
+    HAND_CMD_SET_FINGER_CURRENT_LIMIT,
+    HAND_RESP_SUCCESS,
+    MAX_MOTOR_CNT,
+    Profile,
+)
+from simulated_bus import HAND_ID, make_api
+
+
+def test_snapshot_restore():
+    # 快照读取全部参数和校准数据，恢复时只写入不同的参数，校准数据最先写入
+    api, bus, hands = make_api()
+    err, profile = api.snapshot(HAND_ID)
+    assert err == HAND_RESP_SUCCESS, f"读取快照失败: err={err}"
+    assert Profile.from_json(profile.to_json()) == profile, "快照序列化前后不一致"
+    assert (HAND_CMD_SET_CALI_DATA, b"") in profile.params, "快照缺少校准数据"
+
+    err, written = api.restore(HAND_ID, profile)
+    assert (err, written) == (HAND_RESP_SUCCESS, []), f"配置未变化时不应写入: {written}"
+
+    api.HAND_SetFingerCurrentLimit(HAND_ID, 1, 777, [])
+    hands[0].cali_data = hands[0].cali_data[:2] + bytes(4 * MAX_MOTOR_CNT) + hands[0].cali_data[2 + 4 * MAX_MOTOR_CNT :]
+    del bus.sent[:]
+    err, written = api.restore(HAND_ID, profile)
+    assert err == HAND_RESP_SUCCESS, f"恢复配置失败: err={err}"
+    assert written == [(HAND_CMD_SET_CALI_DATA, b""), (HAND_CMD_SET_FINGER_CURRENT_LIMIT, b"\x01")], f"写入的参数错误: {written}"
+    assert api.snapshot(HAND_ID) == (HAND_RESP_SUCCESS, profile), "恢复后配置不一致"
@@ -0,0 +1,43 @@
+import threading
+
+from OHandSerialAPI import HAND_CMD_GET_PROTOCOL_VERSION, HAND_RESP_SUCCESS, HAND_RESP_TIMEOUT
+from simulated_bus import HAND_ID, make_api
+
+
+def test_concurrent_polling_callers():
+    # 轮询接收时多个线程共用解码器：同一时刻只有一个线程接收，超时的等待不重置其他线程正在接收的包
+    api, bus, _ = make_api()
+    bus.frame_time = 0.0005
+    api.timeout_overrides[(0x09, HAND_CMD_GET_PROTOCOL_VERSION)] = 2
+    errors = []
+
+    def read_version():
+        for _ in range(100):
+            err, _, _ = api.HAND_GetProtocolVersion(HAND_ID, [0], [0], [])
+            if err != HAND_RESP_SUCCESS:
+                errors.append(err)
+
+    def read_absent():
+        for _ in range(50):
+            if api.HAND_GetProtocolVersion(0x09, [0], [0], [])[0] != HAND_RESP_TIMEOUT:
+                errors.append("absent")
+
+    threads = [threading.Thread(target=read_version), threading.Thread(target=read_absent), threading.Thread(target=read_absent)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, f"并发命令失败: {errors}"
+
+
+def test_submit_with_background_receiver():
+    # 后台接收时请求自行完成
+    api, bus, _ = make_api()
+    bus.start(api)
+    try:
+        future = api.HAND_SubmitCmd(HAND_ID, HAND_CMD_GET_PROTOCOL_VERSION, None, 0)
+        assert future.result(1) == (HAND_RESP_SUCCESS, b"\x03\x01"), "后台接收未完成请求"
+        err, major, minor = api.HAND_GetProtocolVersion(HAND_ID, [0], [0], [])
+        assert (err, major, minor) == (HAND_RESP_SUCCESS, 1, 3), f"后台接收时同步命令失败: {err}"
+    finally:
+        bus.stop()
@@ -0,0 +1,20 @@
+from OHandSerialAPI import HAND_CMD_GET_PROTOCOL_VERSION, HAND_RESP_SUCCESS
+from simulated_bus import HAND_ID, make_api
+
+
+def test_response_cache():
+    # 静态信息缓存命中后不再发送，校准等命令后失效
+    api, bus, _ = make_api()
+    api.HAND_EnableResponseCache()
+    for _ in range(3):
+        err, major, minor = api.HAND_GetProtocolVersion(HAND_ID, [0], [0], [])
+        assert (err, major, minor) == (HAND_RESP_SUCCESS, 1, 3), f"缓存读取错误: {err}"
+    assert (api.cache_hits, api.cache_misses) == (2, 1), f"缓存计数错误: {api.cache_hits}, {api.cache_misses}"
+    assert len(bus.requests(HAND_CMD_GET_PROTOCOL_VERSION)) == 1, "缓存命中后仍发送了请求"
+
+    assert api.HAND_Calibrate(HAND_ID, 0, []) == HAND_RESP_SUCCESS, "校准失败"
+    api.HAND_GetProtocolVersion(HAND_ID, [0], [0], [])
+    assert len(bus.requests(HAND_CMD_GET_PROTOCOL_VERSION)) == 2, "校准后缓存未失效"
+
+    api.HAND_SetID(HAND_ID, 0x03, [])
+    assert not api._response_cache, f"修改节点ID后缓存未清空: {api._response_cache}"
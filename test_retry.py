@@ -0,0 +1,43 @@
+import pytest
+
+from OHandSerialAPI import HAND_CMD_BEEP, HAND_RESP_SUCCESS, HAND_RESP_TIMEOUT, RETRY_BUDGET
+from simulated_bus import HAND_ID, make_api
+
+
+def test_retry_policy():
+    # 只读命令超时后重试；写命令需retry_writes，非幂等命令从不重试
+    api, bus, hands = make_api()
+    api.HAND_SetRetryPolicy(backoff=0)
+    hands[0].drop = 1
+    err, _, _ = api.HAND_GetProtocolVersion(HAND_ID, [0], [0], [])
+    assert err == HAND_RESP_SUCCESS and api.retry_cnt == 1, f"只读命令未重试: err={err}, retries={api.retry_cnt}"
+
+    hands[0].drop = 1
+    err = api.HAND_SetFingerCurrentLimit(HAND_ID, 0, 100, [])
+    assert err == HAND_RESP_TIMEOUT and api.retry_cnt == 1, f"写命令不应重试: err={err}"
+
+    api.HAND_SetRetryPolicy(backoff=0, retry_writes=True)
+    hands[0].drop = 1
+    err = api.HAND_SetFingerCurrentLimit(HAND_ID, 0, 100, [])
+    assert err == HAND_RESP_SUCCESS and api.retry_cnt == 2, f"retry_writes时写命令未重试: err={err}"
+
+    hands[0].drop = 1
+    err = api.HAND_Beep(HAND_ID, 10, [])
+    assert err == HAND_RESP_TIMEOUT and api.retry_cnt == 2, f"非幂等命令不应重试: err={err}"
+    assert len(bus.requests(HAND_CMD_BEEP)) == 1, "非幂等命令被重复发送"
+
+
+def test_retry_budget():
+    # 连续失败耗尽重试预算后不再重试，成功的事务逐步补充预算
+    api, _, _ = make_api()
+    api.HAND_SetRetryPolicy(max_retries=2, backoff=0)
+    api.HAND_SetCommandTimeOut(2)
+    for _ in range(RETRY_BUDGET // 2 + 1):
+        err, _, _ = api.HAND_GetProtocolVersion(0x09, [0], [0], [])
+        assert err == HAND_RESP_TIMEOUT, f"不在线节点应超时: err={err}"
+    assert api.retry_cnt == RETRY_BUDGET, f"重试次数超出预算: {api.retry_cnt}"
+    assert api.retry_denied_cnt == 1, f"预算耗尽后的拒绝次数错误: {api.retry_denied_cnt}"
+
+    for _ in range(10):
+        api.HAND_GetProtocolVersion(HAND_ID, [0], [0], [])
+    assert api._retry_budget == pytest.approx(1), f"成功事务未补充预算: {api._retry_budget}"
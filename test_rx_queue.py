@@ -0,0 +1,42 @@
+import threading
+import time
+
+from OHandSerialAPI import HAND_CMD_GET_BEEP_SWITCH, HAND_RESP_TIMEOUT, HAND_RESP_UNMATCHED_CMD, RX_QUEUE_SIZE
+from simulated_bus import ADDRESS_MASTER, HAND_ID, build_packet, make_api
+
+
+def test_rx_queue_bounded():
+    # 接收队列满时丢弃最旧的包并计数
+    api, _, _ = make_api()
+    packets = [build_packet(ADDRESS_MASTER, HAND_ID, cmd, b"") for cmd in range(RX_QUEUE_SIZE + 3)]
+    for packet in packets:
+        api.HAND_OnDataBytes(packet)
+    assert len(api.rx_queue) == RX_QUEUE_SIZE, f"接收队列长度错误: {len(api.rx_queue)}"
+    assert api.rx_overflow_cnt == 3, f"溢出计数错误: {api.rx_overflow_cnt}"
+    assert api.rx_queue[0] == packets[3][2:], "未丢弃最旧的包"
+
+
+def test_get_response_timeout_and_unmatched():
+    # 其他线程丢弃的包不会把超时误报为UNMATCHED_CMD，本次等待丢弃的错误命令应答才报UNMATCHED_CMD
+    api, _, hands = make_api((HAND_ID, 0x03))
+    hands[0].drop = 1
+    running = True
+
+    def stray_packets():
+        while running:
+            api.HAND_OnDataBytes(build_packet(ADDRESS_MASTER, 0x03, HAND_CMD_GET_BEEP_SWITCH, b"\x01"))
+            api._flush_packets(0x03)
+            time.sleep(0.0005)
+
+    thread = threading.Thread(target=stray_packets)
+    thread.start()
+    try:
+        err, _, _ = api.HAND_GetProtocolVersion(HAND_ID, [0], [0], [])
+    finally:
+        running = False
+        thread.join()
+    assert err == HAND_RESP_TIMEOUT, f"丢包应报超时: err={err}"
+
+    hands[0].wrong_cmd = 1
+    err, _, _ = api.HAND_GetProtocolVersion(HAND_ID, [0], [0], [])
+    assert err == HAND_RESP_UNMATCHED_CMD, f"错误命令的应答应报UNMATCHED_CMD: err={err}"
@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+
+from OHandSerialAPI import HAND_CMD_SET_CUSTOM, HAND_RESP_SUCCESS, MAX_MOTOR_CNT, SUB_CMD_GET_POS
+from simulated_bus import HAND_ID, make_api
+
+
+class CountingStateAPI:
+    """read_state()的模拟：每次读取返回递增的位置，所有手指相同"""
+
+    def __init__(self):
+        self.value = 0
+
+    def read_state(self, hand_id, sub_cmd, state):
+        self.value += 1
+        state.pos = [self.value % 0x10000] * MAX_MOTOR_CNT
+        return HAND_RESP_SUCCESS, state
+
+
+def test_telemetry_recorder():
+    # 环形缓冲按时间顺序返回最近的样本，录制时复制的样本没有写了一半的行
+    np = pytest.importorskip("numpy")
+    from TelemetryRecorder import TelemetryRecorder
+
+    recorder = TelemetryRecorder(CountingStateAPI(), [HAND_ID], capacity=8, fields=("pos",))
+    for _ in range(11):
+        recorder.poll()
+    older, newer = recorder.segments(HAND_ID)
+    assert len(older) + len(newer) == 8 and recorder.dropped(HAND_ID) == 3, "环形缓冲大小错误"
+    assert recorder.samples(HAND_ID)["pos"][:, 0].tolist() == list(range(4, 12)), "样本顺序错误"
+    assert recorder.samples(HAND_ID, last=3)["pos"][:, 0].tolist() == [9, 10, 11], "最近样本错误"
+
+    running = True
+
+    def record():
+        while running:
+            recorder.poll()
+
+    thread = threading.Thread(target=record)
+    thread.start()
+    try:
+        for _ in range(2000):
+            pos = recorder.samples(HAND_ID)["pos"].astype(int)
+            assert (pos == pos[:, :1]).all(), f"样本行写了一半: {pos}"
+            assert (np.diff(pos[:, 0]) % 0x10000 == 1).all(), f"样本不连续: {pos[:, 0]}"
+    finally:
+        running = False
+        thread.join()
+
+
+def test_telemetry_recorder_with_commands():
+    # 录制与其他线程的同步命令和流水线轮询共用API，互不取走应答
+    pytest.importorskip("numpy")
+    from TelemetryRecorder import TelemetryRecorder
+
+    api, bus, _ = make_api((HAND_ID, 0x03))
+    recorder = TelemetryRecorder(api, [HAND_ID, 0x03], rate_hz=1000, capacity=1000, fields=("pos",))
+    errors = []
+
+    def read_pos():
+        for _ in range(50):
+            err, pos, _ = api.HAND_GetFingerPosAll(HAND_ID, [0] * MAX_MOTOR_CNT, [0] * MAX_MOTOR_CNT, [MAX_MOTOR_CNT], [])
+            if (err, pos) != (HAND_RESP_SUCCESS, [0, 100, 200, 300, 400, 500]):
+                errors.append(err)
+
+    def poll_state():
+        for _ in range(50):
+            with api.lock_hands([0x03], [HAND_CMD_SET_CUSTOM]):
+                data = bytes([SUB_CMD_GET_POS])
+                results = api.HAND_WaitCmds([api.HAND_SubmitCmd(0x03, HAND_CMD_SET_CUSTOM, data, len(data))])
+            if results[0][0] != HAND_RESP_SUCCESS:
+                errors.append(results[0][0])
+
+    bus.start(api)
+    recorder.start()
+    try:
+        threads = [threading.Thread(target=read_pos), threading.Thread(target=poll_state)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        recorder.stop()
+        bus.stop()
+    assert recorder.count[HAND_ID] and recorder.count[0x03], f"录制未运行: {recorder.count}"
+    assert recorder.errors == {HAND_ID: 0, 0x03: 0} and not errors, f"录制与其他命令冲突: {recorder.errors}, {errors[:5]}"
@@ -0,0 +1,36 @@
+import time
+
+import pytest
+
+from OHandSerialAPI import HAND_CMD_GET_PROTOCOL_VERSION, HAND_RESP_SUCCESS, HAND_RESP_TIMEOUT, MAX_MOTOR_CNT
+from simulated_bus import HAND_ID, TIME_OUT, make_api
+
+
+def test_cancel_cmd():
+    # 限时等待返回未完成的请求为None，取消后同一(地址, 命令)的下一个请求不再等待
+    api, bus, _ = make_api((HAND_ID,))
+    first = api.HAND_SubmitCmd(0x09, HAND_CMD_GET_PROTOCOL_VERSION, None, 0)
+    assert api.HAND_WaitCmds([first], 10) == [None], "限时等待应返回None"
+    api.HAND_CancelCmd(first)
+    assert first.result(0) == (HAND_RESP_TIMEOUT, b"") and not api._pending, "取消的请求未超时完成"
+    start = time.perf_counter()
+    second = api.HAND_SubmitCmd(0x09, HAND_CMD_GET_PROTOCOL_VERSION, None, 0)
+    assert time.perf_counter() - start < TIME_OUT / 2000.0, "取消后下一个请求仍在等待"
+    api.HAND_CancelCmd(second)
+    future = api.HAND_SubmitCmd(HAND_ID, HAND_CMD_GET_PROTOCOL_VERSION, None, 0)
+    assert api.HAND_WaitCmds([future], TIME_OUT) == [(HAND_RESP_SUCCESS, b"\x03\x01")], "限时等待结果错误"
+
+
+def test_trajectory_streamer():
+    # 丢失的应答只等到下一帧到期，不拖住后续帧
+    np = pytest.importorskip("numpy")
+    from TrajectoryStreamer import TrajectoryStreamer
+
+    api, _, hands = make_api()
+    trajectory = np.arange(20 * MAX_MOTOR_CNT).reshape(20, MAX_MOTOR_CNT) * 10
+    hands[0].drop = 3
+    stats = TrajectoryStreamer(api, HAND_ID, trajectory, rate_hz=50).run()
+    assert stats["sent"] + stats["skipped"] == 20 and stats["skipped"] < 3, f"丢包拖住了后续帧: {stats}"
+    assert stats["unacked"] == 3 and stats["errors"] == 0, f"应答计数错误: {stats}"
+    assert hands[0].targets == trajectory[-1].tolist(), "最后一帧未送达"
+    assert not api._pending, "播放结束后仍有待处理项"